@@ -0,0 +1,168 @@
+# app/archive.py
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from . import settings, utils
+
+# Segundos que se reutiliza el listado de una carpeta al comprobar nombres:
+# un lote de descargas a la misma carpeta la lista una sola vez
+LISTING_TTL = 30.0
+
+
+def archive_key(extractor: str, video_id: str, mode: str, fmt: Optional[str] = None) -> str:
+    """Clave de una descarga: extractor, ID del video, modo y formato elegido (si lo hay)."""
+    key = f"{extractor.lower()} {video_id} {mode}"
+    return f"{key} {fmt}" if fmt else key
+
+
+def info_identity(info: dict):
+    """(extractor, id) de una información extraída, como los usa el archivo."""
+    extractor = info.get("extractor_key") or info.get("extractor") or "generic"
+    return extractor.lower(), str(info.get("id"))
+
+
+def url_identity(url: str):
+    """(extractor, id) deducido de la URL sin conexión, o None si no se puede."""
+    if utils.is_playlist_url(url):
+        return None
+    video_id = utils.extract_video_id(url)
+    return ("youtube", video_id) if video_id else None
+
+
+class DownloadArchive:
+    """
+    Registro persistente (SQLite) de lo ya descargado.
+
+    Todas las claves se cargan en memoria al abrir, así comprobar si algo
+    ya se descargó no toca la base de datos ni la red, aunque haya decenas
+    de miles de entradas. Cada entrada guarda el archivo que produjo: si ese
+    archivo ya no existe, la entrada se considera caducada y se borra; si
+    se pide otra carpeta de destino, no cuenta como descargado. También
+    recuerda a qué video pertenece cada nombre de archivo para no pisar un
+    archivo de otro video con el mismo título.
+    """
+
+    def __init__(self, db_path):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS archive ("
+            " key TEXT PRIMARY KEY,"
+            " title TEXT,"
+            " filepath TEXT,"
+            " downloaded_at REAL NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS names ("
+            " stem TEXT PRIMARY KEY,"
+            " owner TEXT NOT NULL)"
+        )
+        self._db.commit()
+        # clave -> archivo resultante (None en entradas sin ruta conocida)
+        self._paths = dict(self._db.execute("SELECT key, filepath FROM archive"))
+        self._listings = {}  # carpeta -> (momento, nombres sin extensión)
+
+    @classmethod
+    def from_settings(cls) -> "DownloadArchive":
+        return cls(settings.get_data_dir() / "archive.sqlite3")
+
+    def __len__(self):
+        return len(self._paths)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._paths
+
+    def has_url(self, url: str, mode: str, fmt: Optional[str] = None, folder: Optional[str] = None) -> bool:
+        """Comprobación previa a la extracción, solo con la URL."""
+        identity = url_identity(url)
+        return identity is not None and self._has(archive_key(*identity, mode, fmt), folder)
+
+    def has_info(self, info: dict, mode: str, fmt: Optional[str] = None, folder: Optional[str] = None) -> bool:
+        return self._has(archive_key(*info_identity(info), mode, fmt), folder)
+
+    def _has(self, key: str, folder: Optional[str]) -> bool:
+        """
+        True si la descarga está registrada y su archivo sigue ahí. Con
+        `folder`, además tiene que estar en esa carpeta.
+        """
+        if key not in self._paths:
+            return False
+        filepath = self._paths[key]
+        if filepath is None:
+            return True  # entrada antigua sin ruta: no se puede comprobar
+        if not os.path.exists(filepath):
+            self.remove(key)  # el archivo se borró o se movió
+            return False
+        return folder is None or os.path.normcase(os.path.abspath(os.path.dirname(filepath))) == \
+            os.path.normcase(os.path.abspath(folder))
+
+    def add(self, info: dict, mode: str, fmt: Optional[str] = None, filepath: Optional[str] = None):
+        key = archive_key(*info_identity(info), mode, fmt)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO archive (key, title, filepath, downloaded_at) VALUES (?, ?, ?, ?)",
+                (key, info.get("title"), filepath, time.time()),
+            )
+            self._db.commit()
+            self._paths[key] = filepath
+
+    def remove(self, key: str):
+        with self._lock:
+            self._db.execute("DELETE FROM archive WHERE key = ?", (key,))
+            self._db.commit()
+            self._paths.pop(key, None)
+
+    # --- Nombres de archivo ---
+
+    def owner(self, stem: str) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute("SELECT owner FROM names WHERE stem = ?", (stem,)).fetchone()
+        return row[0] if row else None
+
+    def claim(self, stem: str, owner: str) -> bool:
+        """
+        Intenta reservar `stem.*` para el video `owner` ("extractor id").
+        Devuelve False si es de otro video: otro lo reclamó antes, o ya hay
+        archivos con ese nombre que nadie reclamó. Comprobar y reservar es un
+        solo paso, así dos trabajos simultáneos no se quedan con el mismo.
+        """
+        folder, name = os.path.split(stem)
+        on_disk = name in self._listing(folder or ".")
+        with self._lock:
+            row = self._db.execute("SELECT owner FROM names WHERE stem = ?", (stem,)).fetchone()
+            if row is None:
+                if on_disk:
+                    return False
+                self._db.execute("INSERT OR IGNORE INTO names (stem, owner) VALUES (?, ?)", (stem, owner))
+                self._db.commit()
+                row = self._db.execute("SELECT owner FROM names WHERE stem = ?", (stem,)).fetchone()
+        return row is not None and row[0] == owner
+
+    def _listing(self, folder: str) -> set:
+        """Nombres sin extensión de la carpeta, reutilizados durante LISTING_TTL segundos."""
+        now = time.monotonic()
+        with self._lock:
+            cached = self._listings.get(folder)
+            if cached is not None and now - cached[0] < LISTING_TTL:
+                return cached[1]
+        try:
+            names = {os.path.splitext(f)[0] for f in os.listdir(folder)}
+        except OSError:
+            names = set()
+        with self._lock:
+            self._listings[folder] = (now, names)
+        return names
+
+
+_archive: Optional[DownloadArchive] = None
+
+
+def get_archive() -> Optional[DownloadArchive]:
+    """Archivo compartido en la carpeta de datos, o None si está desactivado."""
+    global _archive
+    if _archive is None and settings.load_settings().get("download_archive", True):
+        _archive = DownloadArchive.from_settings()
+    return _archive
@@ -0,0 +1,236 @@
+# app/auth.py
+import os
+import queue
+import re
+import threading
+import time
+from contextlib import nullcontext
+from typing import TYPE_CHECKING, Callable, ContextManager, Dict, List, Optional
+
+# yt-dlp se importa al primer uso: es lo más pesado del arranque
+if TYPE_CHECKING:
+    import yt_dlp
+    from .ydl_pool import YdlPool
+
+# Orden por defecto: cookies de Firefox, luego app/cookies.txt, luego sin cookies
+STRATEGIES = ("firefox", "cookiefile", "none")
+
+# Errores que indican que YouTube rechazó la sesión (vale la pena recargar cookies)
+AUTH_ERROR_REGEX = re.compile(
+    r"sign in|log ?in|cookies|confirm (you|your age)|members-only|private video|"
+    r"\b403\b|forbidden|unauthorized|\b401\b",
+    re.IGNORECASE,
+)
+
+_FAILED = object()  # marca de que la carga del cookie jar falló en esta sesión
+
+# Con una estrategia preferida conocida, la siguiente solo se lanza si la
+# preferida tarda este múltiplo de lo que suele tardar
+HEDGE_LATENCY_FACTOR = 3.0
+# Peso de la última extracción en la media móvil de la latencia
+LATENCY_SMOOTHING = 0.3
+
+
+def is_auth_error(error: Exception) -> bool:
+    return bool(AUTH_ERROR_REGEX.search(str(error)))
+
+
+class CredentialManager:
+    """
+    Gestiona las cookies durante toda la sesión.
+
+    Cada cookie jar (Firefox o cookies.txt) se carga una sola vez y se
+    comparte en memoria entre todas las instancias de YoutubeDL. Además se
+    recuerda la estrategia que funcionó la última vez para probarla primero;
+    las cookies solo se vuelven a leer si el sitio responde con un error de
+    autenticación o 403.
+
+    Con un `pool` (ver ydl_pool) las instancias de YoutubeDL se piden
+    prestadas al pool en lugar de crear una por intento.
+    """
+
+    def __init__(self, cookiefile_path: str, pool: Optional["YdlPool"] = None):
+        self.cookiefile_path = cookiefile_path
+        self.pool = pool
+        self.preferred = None
+        self.latency: Dict[str, float] = {}  # media móvil de las extracciones correctas
+        self._jars = {}
+        self._lock = threading.Lock()
+
+    def strategies(self) -> List[str]:
+        """Estrategias disponibles, empezando por la que funcionó la última vez."""
+        available = [
+            s for s in STRATEGIES
+            if s != "cookiefile" or os.path.exists(self.cookiefile_path)
+        ]
+        if self.preferred in available:
+            available.remove(self.preferred)
+            available.insert(0, self.preferred)
+        return available
+
+    def cookiejar(self, strategy: str):
+        """Devuelve el cookie jar de la estrategia, cargándolo solo la primera vez."""
+        if strategy == "none":
+            return None
+        from yt_dlp.cookies import load_cookies
+        with self._lock:
+            jar = self._jars.get(strategy)
+            if jar is None:
+                try:
+                    if strategy == "firefox":
+                        jar = load_cookies(None, ("firefox",), None)
+                    else:
+                        jar = load_cookies(self.cookiefile_path, None, None)
+                except Exception:
+                    jar = _FAILED
+                self._jars[strategy] = jar
+        if jar is _FAILED:
+            raise Exception(f"No se pudieron cargar las cookies ({strategy}).")
+        return jar
+
+    def open(self, strategy: str, opts: dict) -> "yt_dlp.YoutubeDL":
+        """Crea un YoutubeDL que usa el cookie jar ya cargado de la estrategia."""
+        import yt_dlp
+        jar = self.cookiejar(strategy)
+        ydl = yt_dlp.YoutubeDL(opts)
+        if jar is not None:
+            # 'cookiejar' es una cached_property: asignarla evita que yt-dlp relea las cookies
+            ydl.cookiejar = jar
+        return ydl
+
+    def session(self, strategy: str, opts: dict) -> ContextManager["yt_dlp.YoutubeDL"]:
+        """YoutubeDL para usar con `with`: prestado por el pool si hay uno, o uno nuevo."""
+        if self.pool is None:
+            return self.open(strategy, opts)
+        return self.pool.checkout(strategy, opts, self.cookiejar(strategy))
+
+    def refresh(self, strategy: str, settled: Optional[threading.Event] = None):
+        """
+        Descarta el cookie jar para que se vuelva a leer en el próximo uso.
+        Si `settled` está activado (run_hedged ya devolvió un resultado), la
+        estrategia preferida no se toca: la eligió el intento ganador.
+        """
+        with self._lock:
+            self._jars.pop(strategy, None)
+            if self.preferred == strategy and not (settled is not None and settled.is_set()):
+                self.preferred = None
+        if self.pool is not None:
+            self.pool.discard(strategy)
+
+    def _attempt(self, strategy: str, opts: dict, action, profile: Optional[str] = None,
+                 settled: Optional[threading.Event] = None):
+        """
+        Ejecuta action con una estrategia. Devuelve (ok, resultado_o_error,
+        segundos). Con `profile`, el intento se perfila en este hilo (ver
+        metrics.profiled) como "<profile>-<estrategia>"; `settled` se pasa a
+        refresh.
+        """
+        from .metrics import profiled
+        start = time.perf_counter()
+        try:
+            session = self.session(strategy, opts)
+        except Exception as e:
+            return False, e, time.perf_counter() - start
+        try:
+            with session as ydl, (profiled(f"{profile}-{strategy}") if profile else nullcontext()):
+                result = action(ydl)
+        except Exception as e:
+            if is_auth_error(e):
+                self.refresh(strategy, settled)
+            return False, e, time.perf_counter() - start
+        return True, result, time.perf_counter() - start
+
+    def run(self, opts: dict, action: Callable[["yt_dlp.YoutubeDL"], object],
+            timings: Optional[Dict[str, Optional[float]]] = None, profile: Optional[str] = None):
+        """
+        Ejecuta action(ydl) probando las estrategias en orden y recuerda la
+        que funcionó. Solo se pasa a la siguiente estrategia si el fallo es
+        de carga de cookies o de autenticación; cualquier otro error se propaga.
+        Si se pasa `timings`, se rellena con los segundos de cada intento;
+        con `profile`, cada intento se perfila (ver _attempt).
+        """
+        timings = {} if timings is None else timings
+        last_error: Optional[Exception] = None
+        for strategy in self.strategies():
+            ok, value, elapsed = self._attempt(strategy, opts, action, profile)
+            timings[strategy] = elapsed
+            if ok:
+                self.preferred = strategy
+                return value
+            last_error = value
+            if not is_auth_error(value):
+                raise value
+        raise last_error or Exception("No hay estrategias de autenticación disponibles.")
+
+    def _observe(self, strategy: str, elapsed: float):
+        previous = self.latency.get(strategy)
+        self.latency[strategy] = elapsed if previous is None else (
+            LATENCY_SMOOTHING * elapsed + (1 - LATENCY_SMOOTHING) * previous)
+
+    def run_hedged(self, opts: dict, action: Callable[["yt_dlp.YoutubeDL"], object],
+                   delay: float = 1.0, timings: Optional[Dict[str, Optional[float]]] = None,
+                   profile: Optional[str] = None):
+        """
+        Variante concurrente de run(): lanza la estrategia preferida y, si no
+        ha respondido tras `delay` segundos (o si falla), lanza la siguiente
+        sin esperar a que termine la anterior. Gana el primer resultado
+        correcto y las estrategias que aún no empezaron se cancelan. Como en
+        run(), solo se pasa a otra estrategia si el fallo es de cookies o de
+        autenticación; cualquier otro error (video no disponible, bloqueo
+        por país...) se propaga sin lanzar más intentos.
+
+        Si ya hay una estrategia preferida con latencia conocida, la espera
+        es al menos HEDGE_LATENCY_FACTOR veces lo que suele tardar: solo se
+        lanza otra cuando la preferida va claramente lenta, no en cada
+        extracción (cada intento extra es otra petición a YouTube y, con
+        Firefox, descifrar sus cookies).
+
+        Los intentos que ya están en curso no se pueden interrumpir (yt-dlp
+        no lo permite); siguen en un hilo daemon, su resultado se descarta y
+        ya no cambian la estrategia preferida.
+        En `timings` queda el tiempo de cada estrategia terminada y None para
+        las que no llegaron a terminar.
+        """
+        timings = {} if timings is None else timings
+        pending = self.strategies()
+        if self.preferred in self.latency:
+            delay = max(delay, HEDGE_LATENCY_FACTOR * self.latency[self.preferred])
+        results = queue.Queue()
+        settled = threading.Event()
+        running = 0
+        last_error: Optional[Exception] = None
+
+        def launch():
+            nonlocal running
+            strategy = pending.pop(0)
+            timings[strategy] = None
+            running += 1
+            threading.Thread(
+                target=lambda: results.put((strategy,) + self._attempt(strategy, opts, action, profile, settled)),
+                daemon=True,
+            ).start()
+
+        if pending:
+            launch()
+        while running:
+            try:
+                strategy, ok, value, elapsed = results.get(timeout=delay if pending else None)
+            except queue.Empty:
+                launch()
+                continue
+            running -= 1
+            timings[strategy] = elapsed
+            if ok:
+                with self._lock:
+                    settled.set()
+                    self.preferred = strategy
+                self._observe(strategy, elapsed)
+                return value
+            last_error = value
+            if not is_auth_error(value):
+                settled.set()
+                raise value
+            if pending:
+                launch()
+        settled.set()
+        raise last_error or Exception("No hay estrategias de autenticación disponibles.")
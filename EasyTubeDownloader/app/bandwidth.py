@@ -0,0 +1,232 @@
+# app/bandwidth.py
+import datetime
+import threading
+import time
+from typing import List, Optional, Sequence, Tuple
+
+from . import settings
+
+# Segundos sin consumir tras los que un trabajo deja de contar para el reparto
+ACTIVE_WINDOW = 2.0
+# Ráfaga máxima acumulable, en segundos de la cuota de cada trabajo
+BURST_SECONDS = 1.0
+# Espera máxima antes de recalcular la cuota
+MAX_WAIT = 0.25
+# Cada cuánto se vuelve a mirar el horario
+SCHEDULE_CHECK = 30.0
+
+
+def _minutes(hhmm: str) -> int:
+    hours, minutes = (int(part) for part in hhmm.split(":"))
+    if not (0 <= hours <= 24 and 0 <= minutes < 60):
+        raise ValueError(f"hora fuera de rango: {hhmm}")
+    return hours * 60 + minutes
+
+
+def kb_to_bytes(value) -> int:
+    """KB/s de la configuración a bytes/s (vacío o null = sin límite)."""
+    if value is None or value == "":
+        return 0
+    return max(0, int(float(value) * 1024))
+
+
+def _parse_window(window) -> Optional[Tuple[int, int, int]]:
+    """(inicio, fin, límite en bytes/s) de una franja, o None si no es válida."""
+    try:
+        return _minutes(window["start"]), _minutes(window["end"]), kb_to_bytes(window.get("limit_kb"))
+    except (KeyError, ValueError, TypeError, AttributeError):
+        return None
+
+
+def valid_schedule(schedule) -> List[dict]:
+    """Franjas del horario que se pueden usar; avisa de las que se descartan."""
+    if not isinstance(schedule, (list, tuple)):
+        if schedule:
+            print("Error en bandwidth_schedule: se esperaba una lista de franjas")
+        return []
+    valid = []
+    for window in schedule:
+        if _parse_window(window) is None:
+            print("Franja de ancho de banda no válida, se ignora:", window)
+        else:
+            valid.append(window)
+    return valid
+
+
+def limit_for(schedule: Sequence[dict], default: int, now: Optional[datetime.datetime] = None) -> int:
+    """
+    Límite (bytes/s) vigente según el horario. Cada franja es
+    {"start": "09:00", "end": "18:00", "limit_kb": 512}; una franja cuyo fin
+    es anterior a su inicio cruza la medianoche. Fuera de las franjas rige
+    `default`. 0 = sin límite. Las franjas mal escritas se ignoran.
+    """
+    now = now or datetime.datetime.now()
+    current = now.hour * 60 + now.minute
+    for window in schedule:
+        parsed = _parse_window(window)
+        if parsed is None:
+            continue
+        start, end, limit = parsed
+        inside = start <= current < end if start <= end else (current >= start or current < end)
+        if inside:
+            return limit
+    return default
+
+
+class Lease:
+    """
+    Cubeta de fichas de un trabajo. Se llena a la velocidad de su cuota
+    (límite global × peso / suma de pesos activos) y cada bloque descargado
+    la vacía; si queda en negativo, el hilo de descarga espera.
+
+    Con bind(ydl.params) la cuota se copia además a 'ratelimit', que yt-dlp
+    lee en cada bloque: así sus bloques se mantienen pequeños y el ritmo es
+    regular en lugar de ir a ráfagas.
+    """
+
+    def __init__(self, governor: "BandwidthGovernor", weight: float = 1.0):
+        self.governor = governor
+        self.weight = max(0.1, float(weight))
+        self.tokens = 0.0
+        self.last = time.monotonic()
+        self.active_at = 0.0
+        self.params = None
+        self._seen = {}
+
+    def bind(self, params: dict):
+        self.params = params
+
+    def consume(self, size: int):
+        self.governor._consume(self, size)
+
+    def hook(self, d: dict):
+        """Hook de progreso de yt-dlp: cobra los bytes nuevos de cada archivo."""
+        if d.get("status") != "downloading" or d.get("segmented"):
+            return  # la descarga por segmentos cobra cada bloque por su cuenta
+        filename = d.get("filename")
+        downloaded = d.get("downloaded_bytes") or 0
+        delta = downloaded - self._seen.get(filename, 0)
+        self._seen[filename] = downloaded
+        if delta > 0:
+            self.consume(delta)
+
+    def set_weight(self, weight: float):
+        self.weight = max(0.1, float(weight))
+
+    @property
+    def rate(self) -> int:
+        """Cuota actual en bytes/s (0 = sin límite)."""
+        return self.governor.share(self)
+
+    def release(self):
+        self.governor.release(self)
+
+
+class BandwidthGovernor:
+    """
+    Reparto del ancho de banda entre todas las descargas del proceso.
+
+    Cada trabajo activo recibe una Lease; las cuotas se recalculan en cada
+    consumo, así que cambiar el límite (a mano o por horario) o que un
+    trabajo empiece o termine ajusta a los demás sin reiniciar nada. Los
+    trabajos que llevan un rato sin descargar (p. ej. posprocesando) no
+    cuentan, y su parte se reparte entre los que sí descargan.
+    """
+
+    def __init__(self, limit: int = 0, schedule: Sequence[dict] = ()):
+        self._lock = threading.Lock()
+        self._leases: List[Lease] = []
+        self.base_limit = limit
+        self.schedule = list(schedule)
+        self._limit = limit
+        self._checked = 0.0
+
+    @classmethod
+    def from_settings(cls) -> "BandwidthGovernor":
+        governor = cls()
+        governor.apply_settings()
+        return governor
+
+    def apply_settings(self):
+        """Vuelve a leer límite y horario de la configuración."""
+        conf = settings.load_settings()
+        try:
+            limit = kb_to_bytes(conf.get("bandwidth_limit_kb"))
+        except (ValueError, TypeError):
+            print("Error en bandwidth_limit_kb, se usa sin límite:", conf.get("bandwidth_limit_kb"))
+            limit = 0
+        self.set_limit(limit, conf.get("bandwidth_schedule", []))
+
+    def set_limit(self, limit: int, schedule: Optional[Sequence[dict]] = None):
+        """Límite global en bytes/s (0 = sin límite), efectivo desde el siguiente bloque."""
+        with self._lock:
+            self.base_limit = max(0, int(limit))
+            if schedule is not None:
+                self.schedule = valid_schedule(schedule)
+            self._checked = 0.0
+
+    @property
+    def limit(self) -> int:
+        """Límite vigente (el del horario si hay una franja activa)."""
+        now = time.monotonic()
+        if now - self._checked >= SCHEDULE_CHECK:
+            self._limit = limit_for(self.schedule, self.base_limit)
+            self._checked = now
+        return self._limit
+
+    def lease(self, weight: float = 1.0) -> Lease:
+        lease = Lease(self, weight)
+        with self._lock:
+            self._leases.append(lease)
+        return lease
+
+    def release(self, lease: Lease):
+        with self._lock:
+            if lease in self._leases:
+                self._leases.remove(lease)
+
+    def share(self, lease: Lease) -> int:
+        limit = self.limit
+        if not limit:
+            return 0
+        now = time.monotonic()
+        with self._lock:
+            total = sum(l.weight for l in self._leases
+                        if l is lease or now - l.active_at < ACTIVE_WINDOW)
+        return int(limit * lease.weight / (total or lease.weight))
+
+    def _consume(self, lease: Lease, size: int):
+        """
+        Cobra `size` bytes a la cubeta del trabajo y espera mientras quede en
+        negativo. La espera va en tramos cortos recalculando la cuota, así
+        un cambio de límite o de reparto se nota enseguida.
+        """
+        pending = size
+        while True:
+            rate = self.share(lease)
+            now = time.monotonic()
+            with self._lock:
+                lease.active_at = now
+                if lease.params is not None:
+                    lease.params['ratelimit'] = rate or None
+                if not rate:
+                    lease.tokens, lease.last = 0.0, now
+                    return
+                lease.tokens = min(rate * BURST_SECONDS, lease.tokens + (now - lease.last) * rate) - pending
+                lease.last = now
+                pending = 0
+                if lease.tokens >= 0:
+                    return
+                wait = min(-lease.tokens / rate, MAX_WAIT)
+            time.sleep(wait)
+
+
+_governor: Optional[BandwidthGovernor] = None
+
+
+def get_governor() -> BandwidthGovernor:
+    """Regulador compartido por todas las descargas del proceso."""
+    global _governor
+    if _governor is None:
+        _governor = BandwidthGovernor.from_settings()
+    return _governor
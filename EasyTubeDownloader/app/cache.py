@@ -0,0 +1,117 @@
+# app/cache.py
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Optional
+
+from . import settings, utils
+
+
+class MetadataCache:
+    """
+    Caché de dos niveles para la información extraída de los videos.
+
+    - Memoria: LRU acotado por número de entradas.
+    - Disco: SQLite con el JSON comprimido (zlib), acotado por número de
+      entradas; se eliminan primero las menos usadas recientemente.
+
+    Las entradas se guardan por la clave canónica de la URL (ver
+    utils.canonical_key) y caducan pasados `ttl` segundos. Cada lectura
+    devuelve un dict nuevo, así que el llamador puede modificarlo.
+    """
+
+    def __init__(self, db_path, ttl: int = 3600, memory_entries: int = 64, disk_entries: int = 1000):
+        self.ttl = ttl
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self._memory = OrderedDict()  # clave -> (guardado_en, json_str)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS info ("
+            " key TEXT PRIMARY KEY,"
+            " stored_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL,"
+            " data BLOB NOT NULL)"
+        )
+        self._db.commit()
+
+    @classmethod
+    def from_settings(cls) -> "MetadataCache":
+        conf = settings.load_settings()
+        return cls(
+            settings.get_data_dir() / "metadata_cache.sqlite3",
+            ttl=conf.get("cache_ttl", 3600),
+            memory_entries=conf.get("cache_memory_entries", 64),
+            disk_entries=conf.get("cache_disk_entries", 1000),
+        )
+
+    def get(self, url: str) -> Optional[dict]:
+        key = utils.canonical_key(url)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                stored_at, raw = entry
+                if now - stored_at <= self.ttl:
+                    self._memory.move_to_end(key)
+                    return json.loads(raw)
+                del self._memory[key]
+
+            row = self._db.execute(
+                "SELECT stored_at, data FROM info WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            stored_at, blob = row
+            if now - stored_at > self.ttl:
+                self._db.execute("DELETE FROM info WHERE key = ?", (key,))
+                self._db.commit()
+                return None
+            raw = zlib.decompress(blob).decode("utf-8")
+            self._db.execute("UPDATE info SET accessed_at = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            self._remember(key, stored_at, raw)
+        return json.loads(raw)
+
+    def put(self, url: str, info: dict):
+        key = utils.canonical_key(url)
+        now = time.time()
+        raw = json.dumps(info, ensure_ascii=False, default=str)
+        blob = zlib.compress(raw.encode("utf-8"), 6)
+        with self._lock:
+            self._remember(key, now, raw)
+            self._db.execute(
+                "INSERT OR REPLACE INTO info (key, stored_at, accessed_at, data) VALUES (?, ?, ?, ?)",
+                (key, now, now, blob),
+            )
+            # Expulsar las entradas menos usadas si se supera el límite
+            self._db.execute(
+                "DELETE FROM info WHERE key IN ("
+                " SELECT key FROM info ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.disk_entries,),
+            )
+            self._db.commit()
+
+    def invalidate(self, url: str):
+        """Elimina un video de ambos niveles de la caché."""
+        key = utils.canonical_key(url)
+        with self._lock:
+            self._memory.pop(key, None)
+            self._db.execute("DELETE FROM info WHERE key = ?", (key,))
+            self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._db.execute("DELETE FROM info")
+            self._db.commit()
+
+    def _remember(self, key: str, stored_at: float, raw: str):
+        self._memory[key] = (stored_at, raw)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
@@ -0,0 +1,164 @@
+# app/cli.py
+"""
+Modo por línea de comandos (sin interfaz gráfica).
+
+    python -m app.cli URL [URL ...]
+    python -m app.cli -f lista.txt --mode mp3 -o ~/Musica -j 4
+    cat lista.txt | python -m app.cli
+    python -m app.cli --resume
+    python -m app.cli -f lista.txt --force   (aunque ya estén descargados)
+
+Cada evento se escribe en stdout como una línea JSON. Las URLs se leen de
+forma incremental, así que la entrada puede tener miles de líneas.
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from typing import Iterator
+
+from . import settings
+
+PROGRESS_INTERVAL = 1.0  # segundos mínimos entre eventos de progreso de un mismo trabajo
+
+
+def iter_urls(args) -> Iterator[str]:
+    """URLs de los argumentos, del archivo y/o de stdin, una a una."""
+    yield from args.urls
+    if args.file == "-" or (not args.urls and not args.file and not args.resume and not sys.stdin.isatty()):
+        yield from _iter_lines(sys.stdin)
+    elif args.file:
+        with open(args.file, "r", encoding="utf-8") as f:
+            yield from _iter_lines(f)
+
+
+def _iter_lines(source) -> Iterator[str]:
+    for line in source:
+        line = line.strip()
+        if line and not line.startswith("#"):
+            yield line
+
+
+class JsonLinesReporter:
+    """Escribe eventos JSON en stdout desde varios hilos sin mezclar líneas."""
+
+    def __init__(self, stream=sys.stdout):
+        self.stream = stream
+        self._lock = threading.Lock()
+
+    def emit(self, event: str, **data):
+        data = {"event": event, "time": round(time.time(), 3), **data}
+        line = json.dumps(data, ensure_ascii=False)
+        with self._lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+
+def parse_args(argv=None):
+    conf = settings.load_settings()
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="EasyTube sin interfaz gráfica.")
+    parser.add_argument("urls", nargs="*", help="Enlaces de YouTube (videos, listas o canales).")
+    parser.add_argument("-f", "--file", help="Archivo con una URL por línea ('-' para stdin).")
+    parser.add_argument("-m", "--mode", choices=("mp3", "mp4"), default=conf.get("default_format", "mp3"))
+    parser.add_argument("--format", dest="format_id", help="ID de formato de yt-dlp a descargar.")
+    parser.add_argument("-o", "--output", help="Carpeta de destino (por defecto la de la configuración).")
+    parser.add_argument("-j", "--concurrency", type=int, default=conf.get("max_concurrent_downloads", 2),
+                        help="Descargas simultáneas.")
+    parser.add_argument("--resume", action="store_true",
+                        help="Reanudar las descargas que quedaron sin terminar.")
+    parser.add_argument("--force", action="store_true",
+                        help="Descargar de nuevo aunque ya figure en el archivo de descargas.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    # Importar el planificador (y yt-dlp) solo después de validar los argumentos
+    from . import archive, downloader, journal, metrics, scheduler, utils
+
+    output = args.output or settings.get_download_path()
+    reporter = JsonLinesReporter(sys.stdout)
+    # stdout queda reservado para el JSON: los mensajes de yt-dlp van a stderr
+    sys.stdout = sys.stderr
+    diary = journal.get_journal()
+    sched = scheduler.Scheduler(args.concurrency, journal=diary, archive=archive.get_archive(),
+                                metrics=metrics.get_recorder())
+    # Limitar los trabajos en memoria: la entrada se consume al ritmo de la cola
+    slots = threading.Semaphore(max(1, args.concurrency) * 2)
+    last_progress = {}
+    totals = {"done": 0, "failed": 0, "cancelled": 0, "skipped": 0}
+    totals_lock = threading.Lock()
+
+    def on_state(job):
+        reporter.emit("state", job=job.id, url=job.url, state=job.state)
+
+    def on_finish(job):
+        with totals_lock:
+            key = "done" if job.state == scheduler.DONE else job.state
+            totals[key] = totals.get(key, 0) + 1
+        reporter.emit("result", job=job.id, url=job.url, title=job.title,
+                      status=job.state, error=job.error,
+                      metrics=job.metrics.record()["phases"] if job.metrics else None)
+        sched.forget(job.id)
+        last_progress.pop(job.id, None)
+        slots.release()
+
+    def progress_for(job):
+        def hook(d):
+            if d.get("status") != "downloading":
+                return
+            now = time.monotonic()
+            if now - last_progress.get(job.id, 0) < PROGRESS_INTERVAL:
+                return
+            last_progress[job.id] = now
+            reporter.emit("progress", job=job.id, downloaded=d.get("downloaded_bytes"),
+                          total=d.get("total_bytes") or d.get("total_bytes_estimate"),
+                          speed=d.get("speed"), eta=d.get("eta"))
+        return hook
+
+    sched.add_listener(on_state)
+
+    def submit(url=None, record=None):
+        slots.acquire()
+        if record is not None:
+            job = scheduler.Job.from_journal(record, force=args.force, on_finish=on_finish)
+        else:
+            job = scheduler.Job(url, args.mode, output, selected_format=args.format_id, force=args.force,
+                                on_finish=on_finish)
+        job.on_progress = progress_for(job)
+        sched.submit(job)
+
+    submitted = 0
+    if args.resume and diary is not None:
+        for record in diary.pending():
+            reporter.emit("resumed", url=record["url"], title=record.get("title"))
+            submit(record=record)
+            submitted += 1
+    for url in iter_urls(args):
+        if not utils.is_youtube_url(url):
+            reporter.emit("skipped", url=url, reason="no es un enlace de YouTube")
+            continue
+        if utils.is_playlist_url(url):
+            try:
+                playlist, entries = downloader.list_entries(url)
+            except Exception as e:
+                reporter.emit("skipped", url=url, reason=str(e))
+                continue
+            reporter.emit("playlist", url=url, title=playlist.get("title"), entries=len(entries))
+            for entry in entries:
+                submit(entry["url"])
+                submitted += 1
+        else:
+            submit(url)
+            submitted += 1
+
+    # Esperar a que terminen los trabajos en curso
+    for _ in range(max(1, args.concurrency) * 2):
+        slots.acquire()
+    reporter.emit("summary", submitted=submitted, **totals)
+    return 0 if totals["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
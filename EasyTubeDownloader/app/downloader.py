@@ -1,47 +1,148 @@
 # app/downloader.py
-import yt_dlp
+import copy
 import os
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Tuple, Optional, List, Dict
+from . import archive, bandwidth, postprocess, segmented, selection, settings, utils, ydl_pool
+from .auth import CredentialManager, is_auth_error
+from .cache import MetadataCache
+from .formats import FormatRecord
 
+HTTP_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/119.0',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'es-ES,es;q=0.8,en-US;q=0.5,en;q=0.3',
+}
 
-def get_video_info(url: str) -> dict:
-    """Extrae información del video intentando usar cookies (firefox) y fallback a cookiefile."""
-    base_opts = {
-        'quiet': True,
-        'no_warnings': True,
-        'http_headers': {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/119.0',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-            'Accept-Language': 'es-ES,es;q=0.8,en-US;q=0.5,en;q=0.3',
-        }
-    }
+EXPIRE_REGEX = re.compile(r'[?&/]expire[=/](\d+)')
+# Niveles de listas dentro de listas que list_entries abre (pestañas de un canal)
+MAX_NESTING = 2
+
+_cache = None
+_credentials = None
+# Extracciones en curso por clave canónica: quien pide el mismo video espera a esa
+_inflight: Dict[str, Future] = {}
+_inflight_lock = threading.Lock()
+
+
+def get_cache() -> MetadataCache:
+    """Caché de metadatos compartida por toda la aplicación (se crea al primer uso)."""
+    global _cache
+    if _cache is None:
+        _cache = MetadataCache.from_settings()
+    return _cache
+
+
+def get_credentials() -> CredentialManager:
+    """Gestor de cookies de la sesión, compartido por extracción y descargas."""
+    global _credentials
+    if _credentials is None:
+        _credentials = CredentialManager(os.path.join(os.path.dirname(__file__), 'cookies.txt'),
+                                         pool=ydl_pool.get_pool())
+    return _credentials
+
+
+def warm_up():
+    """
+    Importa yt-dlp y carga su registro de extractores. Pensado para llamarse
+    en segundo plano al abrir la ventana, así la primera descarga no paga
+    ese coste y el arranque tampoco. Con el pool de instancias activado, la
+    instancia (y el cookie jar de la estrategia preferida) queda preparada
+    para la primera extracción.
+    """
+    credentials = get_credentials()
+    if credentials.pool is not None:
+        # Mismas opciones de sesión que _extract_info: la instancia le sirve tal cual
+        credentials.run({'quiet': True, 'http_headers': HTTP_HEADERS},
+                        lambda ydl: ydl.get_info_extractor('Youtube'))
+        return
+    import yt_dlp
+    with yt_dlp.YoutubeDL({'quiet': True}) as ydl:
+        ydl.get_info_extractor('Youtube')
+
+
+def invalidate_cache(url: str):
+    """Olvida la información guardada de un video para forzar una nueva extracción."""
+    get_cache().invalidate(url)
 
-    cookiefile_path = os.path.join(os.path.dirname(__file__), 'cookies.txt')
 
-    # 1) Intentar con cookies desde Firefox
-    opts = base_opts.copy()
-    opts['cookies_from_browser'] = 'firefox'
+def get_video_info(url: str, refresh: bool = False) -> dict:
+    """
+    Devuelve la información del video, usando la caché de metadatos si hay
+    una entrada vigente. Con refresh=True se ignora la caché y se vuelve a extraer.
+    """
+    return get_video_info_timed(url, refresh=refresh)[0]
+
+
+def get_video_info_timed(url: str, refresh: bool = False,
+                         profile: Optional[str] = None) -> Tuple[dict, Dict[str, Optional[float]]]:
+    """
+    Igual que get_video_info, pero devuelve también los segundos que tardó
+    cada estrategia de cookies (None si no llegó a terminar). Si la
+    información salió de la caché, los tiempos son {'cache': segundos}; si
+    se esperó a una extracción que ya estaba en curso (p. ej. la de
+    prefetch), {'inflight': segundos}. Con `profile` se perfila la
+    extracción, si la hay (ver metrics.profiled).
+    """
+    cache = get_cache()
+    if not refresh:
+        start = time.perf_counter()
+        info = cache.get(url)
+        if info is not None:
+            return info, {'cache': time.perf_counter() - start}
+    key = utils.canonical_key(url)
+    with _inflight_lock:
+        future = _inflight.get(key)
+        leader = future is None
+        if leader:
+            future = _inflight[key] = Future()
+    if not leader:
+        start = time.perf_counter()
+        info = future.result()
+        # La caché devuelve un dict nuevo; el de la extracción es de quien la lanzó
+        return cache.get(url) or copy.deepcopy(info), {'inflight': time.perf_counter() - start}
     try:
-        with yt_dlp.YoutubeDL(opts) as ydl:
-            return ydl.extract_info(url, download=False)
-    except Exception:
-        pass
-
-    # 2) Fallback: usar cookiefile si existe
-    if os.path.exists(cookiefile_path):
-        opts = base_opts.copy()
-        opts['cookiefile'] = cookiefile_path
-        try:
-            with yt_dlp.YoutubeDL(opts) as ydl:
-                return ydl.extract_info(url, download=False)
-        except Exception:
-            pass
+        from yt_dlp import YoutubeDL
+        timings = {}
+        info = YoutubeDL.sanitize_info(_extract_info(url, timings, profile=profile))
+        cache.put(url, info)
+        future.set_result(info)
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+    return info, timings
 
-    # 3) Último intento sin cookies (puede fallar si YouTube exige login)
-    opts = base_opts.copy()
+
+def extracting(url: str) -> bool:
+    """True si ya hay una extracción en curso de este video."""
+    with _inflight_lock:
+        return utils.canonical_key(url) in _inflight
+
+
+def _extract_info(url: str, timings: Optional[dict] = None, profile: Optional[str] = None) -> dict:
+    """
+    Extrae información del video con la estrategia de cookies que funcionó
+    la última vez. En modo escalonado ('hedged_extraction') las demás
+    estrategias arrancan en paralelo si la primera tarda más de 'hedge_delay'.
+    """
+    opts = {
+        'quiet': True,
+        'no_warnings': True,
+        'http_headers': HTTP_HEADERS,
+    }
+    conf = settings.load_settings()
+    action = lambda ydl: ydl.extract_info(url, download=False)
     try:
-        with yt_dlp.YoutubeDL(opts) as ydl:
-            return ydl.extract_info(url, download=False)
+        if conf.get("hedged_extraction", True):
+            return get_credentials().run_hedged(opts, action, delay=conf.get("hedge_delay", 4.0), timings=timings,
+                                                profile=profile)
+        return get_credentials().run(opts, action, timings=timings, profile=profile)
     except Exception as e:
         raise Exception(
             "No se pudo obtener info del video. YouTube solicita autenticación.\n"
@@ -52,81 +153,385 @@ def get_video_info(url: str) -> dict:
         )
 
 
-def get_formats(url: str) -> List[Dict]:
-    """Retorna una lista de formatos disponibles con información relevante."""
-    info = get_video_info(url)
-    formats = info.get('formats', [])
-    result = []
-    for f in formats:
-        result.append({
-            'format_id': f.get('format_id'),
-            'ext': f.get('ext'),
-            'resolution': (
-                f.get('resolution')
-                or (f"{f.get('width')}x{f.get('height')}" if f.get('width') else 'audio only')
-            ),
-            'fps': f.get('fps'),
-            'acodec': f.get('acodec'),
-            'vcodec': f.get('vcodec'),
-            'filesize': f.get('filesize') or f.get('filesize_approx'),
-            'tbr': f.get('tbr'),
-            'format_note': f.get('format_note'),
+def list_entries(url: str) -> Tuple[dict, List[Dict]]:
+    """
+    Listado rápido (extract_flat) de una lista de reproducción o canal.
+    Devuelve la información de la lista y sus entradas con id, título,
+    duración y URL, sin resolver los formatos de cada video.
+
+    La raíz de un canal se lista por su pestaña de videos, y las entradas
+    que son a su vez listas (pestañas Videos/Shorts/Directos) se abren para
+    que cada entrada devuelta sea un video.
+    """
+    opts = {
+        'quiet': True,
+        'no_warnings': True,
+        'extract_flat': 'in_playlist',
+        'http_headers': HTTP_HEADERS,
+    }
+
+    def collect(ydl):
+        info = ydl.extract_info(utils.channel_videos_url(url), download=False)
+        return info, list(_flat_videos(ydl, info.get('entries') or [], MAX_NESTING))
+
+    info, flat = get_credentials().run(opts, collect)
+    entries = []
+    seen = set()
+    for entry in flat:
+        if entry.get('id'):
+            if entry['id'] in seen:
+                continue  # el mismo video en dos pestañas
+            seen.add(entry['id'])
+        entry_url = entry.get('url') or entry.get('webpage_url')
+        if entry_url and not entry_url.startswith('http'):
+            entry_url = f"https://www.youtube.com/watch?v={entry.get('id')}"
+        entries.append({
+            'id': entry.get('id'),
+            'title': entry.get('title') or entry.get('id'),
+            'duration': entry.get('duration'),
+            'url': entry_url,
         })
-    return result
+    return info, entries
+
+
+def _flat_videos(ydl, entries, depth: int):
+    """Entradas de video de un listado plano, abriendo las que son listas."""
+    for entry in entries:
+        if not entry:
+            continue
+        if entry.get('_type') == 'playlist' or entry.get('ie_key') == 'YoutubeTab':
+            if depth <= 0:
+                continue
+            nested = entry.get('entries')
+            if nested is None and entry.get('url'):
+                nested = (ydl.extract_info(entry['url'], download=False) or {}).get('entries')
+            yield from _flat_videos(ydl, nested or [], depth - 1)
+        else:
+            yield entry
+
+
+def resolve_entries(entries: List[Dict], on_entry, workers: int = 4, cancel_event=None):
+    """
+    Obtiene la información completa de cada entrada en paralelo (con un
+    máximo de `workers` extracciones a la vez) y llama a
+    on_entry(indice, info, error) a medida que cada una termina, sin esperar
+    al resto. Las entradas pendientes se descartan si se activa cancel_event.
+    """
+    def resolve(index, entry):
+        if cancel_event is not None and cancel_event.is_set():
+            return
+        try:
+            info, error = get_video_info(entry['url']), None
+        except Exception as e:
+            info, error = None, str(e)
+        if cancel_event is None or not cancel_event.is_set():
+            on_entry(index, info, error)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for index, entry in enumerate(entries):
+            pool.submit(resolve, index, entry)
+
+
+def get_formats(url: str, refresh: bool = False) -> List[FormatRecord]:
+    """Retorna una lista de formatos disponibles con información relevante."""
+    return formats_from_info(get_video_info(url, refresh=refresh))
+
+
+def formats_from_info(info: dict) -> List[FormatRecord]:
+    """Igual que get_formats, pero a partir de una información ya extraída."""
+    return [FormatRecord(f) for f in info.get('formats', [])]
+
+
+def select_best_audio_format(info: dict) -> Optional[str]:
+    """
+    Mejor formato de audio según el motor de selección y la configuración.
+    Retorna el 'format_id' más adecuado o None si no hay audio.
+    """
+    record = selection.best(formats_from_info(info), selection.Constraints.from_settings('mp3'))
+    return record.format_id if record else None
 
 
-def select_best_audio_format(info: dict) -> str:
+def build_format_spec(info: dict, mode: str, selected_format: Optional[str] = None) -> str:
     """
-    Selecciona el mejor formato de audio con prioridad por compatibilidad.
-    Retorna el 'format_id' más adecuado.
+    Construye la expresión de formato de yt-dlp. Sin formato elegido, lo
+    decide el motor de selección con las restricciones de la configuración;
+    si ningún formato las cumple lanza selection.NoFormatError (descargar
+    otro sería saltarse la restricción). Sin restricciones ni formatos
+    conocidos se deja decidir a yt-dlp. Si el formato elegido es de solo
+    video, se combina con el mejor audio disponible.
     """
-    preferred_exts = ['mp3', 'm4a', 'aac', 'ogg', 'opus', 'webm']
-    audio_formats = [
-        f for f in info.get('formats', [])
-        if f.get('vcodec') == 'none' and f.get('acodec') != 'none'
-    ]
+    if not selected_format:
+        records = formats_from_info(info)
+        constraints = selection.Constraints.from_settings(mode)
+        spec = selection.format_spec(records, constraints)
+        if spec:
+            return spec
+        if records and constraints.limiting:
+            raise selection.NoFormatError(selection.unmet(records, constraints))
+        return 'bestaudio/best' if mode == 'mp3' else 'bestvideo+bestaudio/best'
+    chosen = next((f for f in info.get('formats', []) if f.get('format_id') == selected_format), None)
+    if mode != 'mp3' and chosen and chosen.get('vcodec') != 'none' and chosen.get('acodec') == 'none':
+        return f"{selected_format}+bestaudio/{selected_format}"
+    return selected_format
 
-    # Filtrar por preferencia de extensión
-    for ext in preferred_exts:
-        best = next((f for f in sorted(audio_formats, key=lambda x: x.get('abr', 0), reverse=True)
-                     if f.get('ext') == ext), None)
-        if best:
-            return best.get('format_id')
 
-    # Fallback al mejor audio general
-    if audio_formats:
-        return max(audio_formats, key=lambda f: f.get('abr', 0) or 0).get('format_id')
+def _info_expired(info: dict, margin: int = 60) -> bool:
+    """Las URLs de YouTube llevan 'expire=<timestamp>'; detecta si ya no sirven."""
+    for f in info.get('formats', []):
+        match = EXPIRE_REGEX.search(f.get('url') or '')
+        if match:
+            return int(match.group(1)) < time.time() + margin
+    return False
 
-    return None
 
+def _format_context(formats: List[dict]) -> dict:
+    """Contexto que espera un selector de build_format_selector (lo que arma yt-dlp al procesar un video)."""
+    return {
+        'formats': formats,
+        'has_merged_format': any('none' not in (f.get('acodec'), f.get('vcodec')) for f in formats),
+        'incomplete_formats': (all(f.get('vcodec') == 'none' for f in formats)
+                               or all(f.get('acodec') == 'none' for f in formats)),
+    }
+
+
+class _RangedSource:
+    """
+    Lectura secuencial de una URL a través de ydl.urlopen. Con `chunk_size`
+    se pide en rangos de ese tamaño (una petición nueva al agotar cada uno);
+    sin él, en una sola petición. La primera se hace al crearla.
+    """
+
+    def __init__(self, ydl, url: str, headers: dict, chunk_size: Optional[int] = None,
+                 total: Optional[int] = None):
+        self.ydl = ydl
+        self.url = url
+        self.headers = dict(headers)
+        self.chunk_size = int(chunk_size or 0)
+        self.total = total
+        self.offset = 0
+        self.resp = self._open()
+
+    def _open(self):
+        from yt_dlp.networking import Request
+        headers = dict(self.headers)
+        if self.chunk_size:
+            headers['Range'] = f'bytes={self.offset}-{self.offset + self.chunk_size - 1}'
+        resp = self.ydl.urlopen(Request(self.url, headers=headers))
+        content_range = resp.headers.get('Content-Range') or ''
+        if resp.status == 206 and '/' in content_range:
+            size = content_range.rsplit('/', 1)[1]
+            self.total = int(size) if size.isdigit() else self.total
+        elif resp.status == 200:
+            # Sin rangos: el servidor manda el archivo entero en esta respuesta
+            self.chunk_size = 0
+            self.total = int(resp.headers.get('Content-Length') or 0) or self.total
+        return resp
 
-def download(url: str, mode: str, target_folder: str, selected_format: str = None, progress_callback=None):
-    """Descarga el video/audio."""
+    def read(self, size: int) -> bytes:
+        while self.resp is not None:
+            data = self.resp.read(size)
+            if data:
+                self.offset += len(data)
+                return data
+            self.resp.close()
+            self.resp = None
+            if self.chunk_size and self.total and self.offset < self.total:
+                self.resp = self._open()
+        return b''
+
+    def close(self):
+        if self.resp is not None:
+            self.resp.close()
+            self.resp = None
+
+
+def stream_audio(url: str, target_folder: str, selected_format: str = None, progress_callback=None,
+                 info: Optional[dict] = None, throttle: Optional[bandwidth.Lease] = None,
+                 cancel_event=None, timings: Optional[Dict[str, Optional[float]]] = None,
+                 profile: Optional[str] = None) -> Tuple[bool, Optional[str], Optional[dict]]:
+    """
+    Modo MP3 en una sola pasada: el audio elegido se descarga y se convierte
+    a la vez (ver postprocess.stream_audio), sin archivo intermedio. Pasa
+    por el gestor de cookies igual que download_file (mismas estrategias,
+    instancias del pool y `timings`), y la petición lleva las cookies de la
+    estrategia.
+
+    El audio se pide con ydl.urlopen (proxy, cookies y manejadores de
+    yt-dlp) y, si el formato trae downloader_options.http_chunk_size (YouTube
+    lo fija para no ser limitado), por rangos de ese tamaño, como hace el
+    descargador HTTP de yt-dlp.
+
+    Retorna lo mismo que download_file. Si el formato no se puede convertir
+    en streaming (fragmentado, MP4/M4A...) lanza postprocess.StreamUnsupported
+    con el motivo: hay que usar download_file y después la conversión.
+    """
     os.makedirs(target_folder, exist_ok=True)
+    try:
+        info = _fresh_info(url, info)
+    except Exception as e:
+        return False, str(e), None
+
+    conf = settings.load_settings()
+    codec = conf.get('audio_codec', 'mp3')
+    opts = {
+        'quiet': True,
+        'http_headers': HTTP_HEADERS,
+        'outtmpl': os.path.join(target_folder, '%(title)s.%(ext)s'),
+    }
+
+    def stream(ydl):
+        selector = ydl.build_format_selector(build_format_spec(info, 'mp3', selected_format))
+        chosen = list(selector(_format_context(info.get('formats') or [])))
+        if len(chosen) != 1:
+            raise postprocess.StreamUnsupported(f"se eligieron {len(chosen)} formatos")
+        fmt = chosen[0]
+        if not postprocess.can_stream(fmt):
+            raise postprocess.StreamUnsupported(f"formato {fmt.get('ext')} por {fmt.get('protocol')}")
+        data = {**info, **fmt, 'ext': postprocess.AUDIO_CODECS[codec][2]}
+        _claim_filename(ydl, data, target_folder)
+        chunk_size = ((fmt.get('downloader_options') or {}).get('http_chunk_size')
+                      or ydl.params.get('http_chunk_size'))
+        source = _RangedSource(ydl, fmt['url'], fmt.get('http_headers') or {}, chunk_size,
+                               fmt.get('filesize'))
+        filepath = postprocess.stream_audio(
+            source, ydl.prepare_filename(data), codec,
+            str(conf.get('audio_quality', '192')), fmt.get('acodec'), progress=progress_callback,
+            throttle=throttle and throttle.consume, cancel_event=cancel_event,
+        )
+        return {'filepath': filepath, 'acodec': fmt.get('acodec')}
+
+    try:
+        return True, None, get_credentials().run(opts, stream, timings=timings, profile=profile)
+    except postprocess.StreamUnsupported:
+        raise
+    except Exception as e:
+        return False, str(e), None
 
+
+def download(url: str, mode: str, target_folder: str, selected_format: str = None, progress_callback=None,
+             info: Optional[dict] = None, throttle: Optional[bandwidth.Lease] = None):
+    """
+    Descarga el video/audio y, en modo MP3, lo convierte en este mismo hilo.
+    El planificador usa download_file y deja la conversión al pool de
+    postprocess para que el hilo pase enseguida al siguiente trabajo.
+    """
+    success, error, result = download_file(url, mode, target_folder, selected_format, progress_callback,
+                                           info, throttle)
+    if success and mode == 'mp3':
+        conf = settings.load_settings()
+        try:
+            postprocess.extract_audio(result['filepath'], conf.get('audio_codec', 'mp3'),
+                                      str(conf.get('audio_quality', '192')), result.get('acodec'))
+        except Exception as e:
+            return False, str(e)
+    return success, error
+
+
+def _fresh_info(url: str, info: Optional[dict]) -> dict:
+    """La información dada si sus URLs siguen vigentes; si no, la de la caché o una nueva extracción."""
+    if info is None or _info_expired(info):
+        info = get_video_info(url)
+        if _info_expired(info):
+            info = get_video_info(url, refresh=True)
+    return info
+
+
+def _downloaded_file(result: dict) -> dict:
+    """Ruta y códec de audio del archivo que dejó yt-dlp."""
+    entry = (result.get('requested_downloads') or [result])[-1]
+    return {
+        'filepath': entry.get('filepath') or entry.get('_filename') or result.get('_filename'),
+        'acodec': entry.get('acodec') or result.get('acodec'),
+    }
+
+
+def _claim_filename(ydl, info: dict, target_folder: str):
+    """
+    Evita que dos videos distintos con el mismo título se pisen: si el
+    nombre ya es de otro video (o hay un archivo que nadie reclamó), se
+    añade el ID al nombre. El nombre elegido queda anotado en el archivo.
+    """
+    names = archive.get_archive()
+    if names is None:
+        return
+    owner = ' '.join(archive.info_identity(info))
+    stem = os.path.splitext(ydl.prepare_filename(info))[0]
+    if not names.claim(stem, owner):
+        ydl.params['outtmpl']['default'] = os.path.join(target_folder, '%(title)s [%(id)s].%(ext)s')
+        names.claim(os.path.splitext(ydl.prepare_filename(info))[0], owner)
+
+
+def download_file(url: str, mode: str, target_folder: str, selected_format: str = None, progress_callback=None,
+                  info: Optional[dict] = None, throttle: Optional[bandwidth.Lease] = None,
+                  timings: Optional[Dict[str, Optional[float]]] = None, profile: Optional[str] = None
+                  ) -> Tuple[bool, Optional[str], Optional[dict]]:
+    """
+    Descarga el video/audio sin convertirlo.
+
+    Si se pasa `info` (la información ya extraída, p. ej. al detectar
+    formatos) o hay una entrada vigente en la caché, se descarga directamente
+    a partir de ella sin volver a extraer el video. `throttle` es la cuota
+    de ancho de banda del trabajo (ver bandwidth.BandwidthGovernor). En
+    `timings` quedan los segundos de cada estrategia de cookies; con
+    `profile` se perfila cada intento (ver metrics.profiled).
+
+    Retorna (éxito, error, archivo) donde archivo es {'filepath', 'acodec'}.
+    """
+    os.makedirs(target_folder, exist_ok=True)
+
+    try:
+        info = _fresh_info(url, info)
+        spec = build_format_spec(info, mode, selected_format)
+    except Exception as e:
+        return False, str(e), None
+
+    conf = settings.load_settings()
     ydl_opts = {
-        'format': 'bestaudio/best' if mode == 'mp3' else 'bestvideo+bestaudio/best',
+        'format': spec,
         'outtmpl': os.path.join(target_folder, '%(title)s.%(ext)s'),
-        'progress_hooks': [progress_callback] if progress_callback else None,
-        'cookies_from_browser': 'firefox',
-        'http_headers': {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/119.0',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-            'Accept-Language': 'es-ES,es;q=0.8,en-US;q=0.5,en;q=0.3',
-        }
+        'progress_hooks': [h for h in (throttle and throttle.hook, progress_callback) if h] or None,
+        'http_headers': HTTP_HEADERS,
+        # Fragmentos simultáneos en formatos DASH/HLS
+        'concurrent_fragment_downloads': conf.get('fragment_concurrency', 4),
+        # Reanudación tras un cierre: continuar los .part y no repetir
+        # posprocesados cuyo resultado ya existe
+        'continuedl': True,
+        'nopostoverwrites': True,
     }
 
-    # Agregar postprocessors según el modo
     if mode == 'mp3':
-        ydl_opts['postprocessors'] = [{
-            'key': 'FFmpegExtractAudio',
-            'preferredcodec': 'mp3',
-            'preferredquality': '192',
-        }]
-    
+        # La conversión la hace postprocess; si el resultado ya existe, yt-dlp
+        # no vuelve a descargar el audio
+        codec = conf.get('audio_codec', 'mp3')
+        ydl_opts['final_ext'] = postprocess.AUDIO_CODECS[codec][2]
+
+    # Formatos HTTP grandes de un solo archivo: varias conexiones por rangos
+    segments = segmented.SegmentedDownloader.from_settings() if conf.get('segmented_download', True) else None
+    if segments is not None and throttle is not None:
+        segments.throttle = throttle.consume
+
+    def fetch(ydl, data):
+        _claim_filename(ydl, data, target_folder)
+        if throttle is not None:
+            throttle.bind(ydl.params)
+        if segments is not None:
+            segmented.install(ydl, segments)
+        # process_ie_result modifica el dict, así que cada intento usa una copia
+        return ydl.process_ie_result(copy.deepcopy(data), download=True)
+
+    run = lambda data: get_credentials().run(ydl_opts, lambda ydl: fetch(ydl, data), timings=timings,
+                                             profile=profile)
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            ydl.download([url])
-        return True, None
-    except Exception as e:
-        return False, str(e)
+        try:
+            return True, None, _downloaded_file(run(info))
+        except Exception as e:
+            if not is_auth_error(e):
+                return False, str(e), None
+        # Las URLs guardadas pudieron caducar o quedar ligadas a otra sesión: extraer de nuevo
+        try:
+            return True, None, _downloaded_file(run(get_video_info(url, refresh=True)))
+        except Exception as e:
+            return False, str(e), None
+    finally:
+        if segments is not None:
+            segments.close()
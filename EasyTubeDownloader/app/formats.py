@@ -0,0 +1,173 @@
+# app/formats.py
+"""
+Registros de formato y modelo de las tablas del modo avanzado.
+
+get_formats devuelve FormatRecord: objetos compactos (con __slots__) con
+los valores numéricos ya interpretados (alto, fps, bitrate, tamaño). A
+partir de ellos las filas de la tabla calculan una sola vez sus valores de
+pantalla, su recomendación y sus claves de orden; filtrar u ordenar solo
+cambia qué filas se ven y en qué orden.
+"""
+from typing import Dict, List, Optional, Tuple
+
+from . import selection, utils
+
+COLUMNS = ("ID", "Tipo", "Resolución", "Códecs", "Tamaño", "Recomendado")
+QUALITIES = ("Alta", "Media", "Baja")
+
+
+def _number(value) -> float:
+    try:
+        return float(value) if value is not None else 0.0
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class FormatRecord:
+    """Un formato disponible, con los campos numéricos ya convertidos (0 si se desconocen)."""
+    __slots__ = ("format_id", "ext", "resolution", "width", "height", "fps",
+                 "vcodec", "acodec", "filesize", "tbr", "abr", "format_note", "protocol")
+
+    def __init__(self, f: dict):
+        self.format_id = str(f.get("format_id"))
+        self.ext = f.get("ext") or ""
+        self.width = int(_number(f.get("width")))
+        self.height = int(_number(f.get("height")))
+        self.resolution = (
+            f.get("resolution")
+            or (f"{self.width}x{self.height}" if self.width else "audio only")
+        )
+        self.fps = _number(f.get("fps"))
+        self.vcodec = f.get("vcodec") or "none"
+        self.acodec = f.get("acodec") or "none"
+        self.filesize = int(_number(f.get("filesize") or f.get("filesize_approx")))
+        self.tbr = _number(f.get("tbr"))
+        self.abr = _number(f.get("abr"))
+        self.format_note = f.get("format_note")
+        self.protocol = f.get("protocol") or ""
+
+    @property
+    def is_video(self) -> bool:
+        return self.vcodec != "none"
+
+    @property
+    def has_audio(self) -> bool:
+        return self.acodec != "none"
+
+    @property
+    def size_mb(self) -> float:
+        return self.filesize / (1024 * 1024)
+
+    def as_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        return f"FormatRecord({self.format_id!r}, {self.ext!r}, {self.resolution!r})"
+
+
+def tiers(candidates: List["selection.Candidate"]) -> Dict[str, Tuple[str, int]]:
+    """
+    Calidad recomendada y posición de cada formato según el motor de
+    selección: el primer tercio de los que cumplen las restricciones es
+    "Alta", el segundo "Media" y el resto (y los descartados) "Baja".
+    """
+    accepted = sum(1 for c in candidates if not c.rejected)
+    third = max(1, -(-accepted // 3))
+    result = {}
+    for position, candidate in enumerate(candidates):
+        if candidate.rejected:
+            quality = "Baja"
+        else:
+            quality = QUALITIES[min(position // third, 2)]
+        result[candidate.record.format_id] = (quality, position)
+    return result
+
+
+class FormatRow:
+    """Una fila de la tabla con sus valores de pantalla y claves de orden ya calculados."""
+    __slots__ = ("iid", "record", "values", "quality", "reasons", "sort_keys")
+
+    def __init__(self, iid: str, record: FormatRecord, quality: str = "Baja", position: int = 0,
+                 reasons: Optional[List[str]] = None):
+        self.iid = iid
+        self.record = record
+        self.quality = quality
+        self.reasons = reasons or []
+        if record.is_video:
+            tipo, codecs = "Video", f"{record.vcodec}/{record.acodec}"
+        else:
+            tipo, codecs = "Audio", record.acodec
+        size = utils.human_size(record.filesize) if record.filesize else "Desconocido"
+        label = f"{quality} ★" if position == 0 and quality != "Baja" else quality
+        self.values = (record.format_id, tipo, record.resolution or "-", codecs, size, label)
+        self.sort_keys = (
+            record.format_id, tipo, (record.height, record.fps, record.tbr), codecs,
+            record.filesize, -position,
+        )
+
+
+class FormatTable:
+    """
+    Filas de una pestaña (video o audio), el filtro activo y el orden actual.
+    El orden ascendente de cada columna se calcula una vez y se guarda; el
+    descendente es el mismo recorrido al revés.
+    """
+
+    def __init__(self, kind: str, rows: List[FormatRow]):
+        self.kind = kind
+        self.rows = rows
+        self.by_iid: Dict[str, FormatRow] = {row.iid: row for row in rows}
+        self.order: List[str] = [row.iid for row in rows]
+        self.filter = "Todos"
+        self._sorted: Dict[str, List[str]] = {}
+
+    def __len__(self):
+        return len(self.rows)
+
+    def records(self) -> List[FormatRecord]:
+        return [row.record for row in self.rows]
+
+    def sort(self, col: str, descending: bool = False):
+        ascending = self._sorted.get(col)
+        if ascending is None:
+            column = COLUMNS.index(col)
+            ascending = [row.iid for row in sorted(self.rows, key=lambda r: r.sort_keys[column])]
+            self._sorted[col] = ascending
+        self.order = ascending[::-1] if descending else list(ascending)
+
+    def visible(self) -> List[str]:
+        """iids que deben verse, en el orden actual."""
+        if self.filter == "Todos":
+            return list(self.order)
+        return [iid for iid in self.order if self.by_iid[iid].quality == self.filter]
+
+    def find(self, format_id: str) -> Optional[FormatRecord]:
+        return next((row.record for row in self.rows if row.record.format_id == format_id), None)
+
+
+def build_tables(records: List[FormatRecord],
+                 video_constraints: Optional["selection.Constraints"] = None,
+                 audio_constraints: Optional["selection.Constraints"] = None) -> Tuple[FormatTable, FormatTable]:
+    """
+    Separa los formatos en tablas de video y audio calculando cada fila una
+    vez. La columna "Recomendado" sale del motor de selección con las
+    restricciones dadas (por defecto, las de la configuración para MP4 y MP3).
+    """
+    video_constraints = video_constraints or selection.Constraints.from_settings("mp4")
+    audio_constraints = audio_constraints or selection.Constraints.from_settings("mp3")
+    video, audio = [], []
+    for index, record in enumerate(records):
+        (video if record.is_video else audio).append((str(index), record))
+
+    def rows_for(group, constraints, kind):
+        ranked = selection.rank([record for _, record in group], constraints, kind)
+        reasons = {c.record.format_id: c.reasons for c in ranked}
+        ranking = tiers(ranked)
+        return [
+            FormatRow(iid, record, *ranking.get(record.format_id, ("Baja", len(group))),
+                      reasons.get(record.format_id))
+            for iid, record in group
+        ]
+
+    return (FormatTable("video", rows_for(video, video_constraints, "video")),
+            FormatTable("audio", rows_for(audio, audio_constraints, "audio")))
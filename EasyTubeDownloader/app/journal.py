@@ -0,0 +1,249 @@
+# app/journal.py
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional
+
+from . import settings, utils
+
+# Campos de un trabajo que hacen falta para volver a lanzarlo
+JOB_FIELDS = ("url", "mode", "target_folder", "selected_format", "format_spec", "title", "priority", "weight")
+STILL_ACTIVE = 259  # código de salida de un proceso de Windows que sigue en marcha
+
+
+def _alive(pid) -> bool:
+    """True si el proceso `pid` sigue en marcha (un registro sin pid se da por huérfano)."""
+    if not pid:
+        return False
+    if pid == os.getpid():
+        return True
+    if os.name == "nt":
+        # En Windows os.kill(pid, 0) terminaría el proceso
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        code = ctypes.c_ulong()
+        ok = kernel32.GetExitCodeProcess(handle, ctypes.byref(code))
+        kernel32.CloseHandle(handle)
+        return bool(ok) and code.value == STILL_ACTIVE
+    try:
+        os.kill(pid, 0)
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+
+@contextmanager
+def _file_lock(path: str):
+    """Bloqueo exclusivo entre procesos sobre `path` (se crea si no existe)."""
+    with open(path, "a+b") as f:
+        if os.name == "nt":
+            import msvcrt
+            while True:
+                f.seek(0)
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass  # LK_LOCK se rinde a los 10 s: seguir esperando
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class JobJournal:
+    """
+    Registro de trabajos en un archivo JSONL de solo anexado.
+
+    Cada línea es un evento de un trabajo (identificado por `key`):
+      - "submit":   datos para relanzarlo (URL, modo, carpeta, formato).
+      - "update":   campos que se conocen después (formato resuelto, título).
+      - "progress": archivo en curso y bytes descargados.
+      - "finish":   estado final (hecho, fallido o cancelado).
+
+    Si la aplicación se cierra o se cae a mitad de una descarga, el trabajo
+    queda sin "finish" y `pending()` lo devuelve al arrancar. Una línea
+    cortada por la caída se ignora al leer.
+
+    La ventana y la línea de comandos comparten el archivo: cada trabajo
+    anota el pid del proceso que lo lleva, y `pending()` solo devuelve (y
+    pasa a este proceso) los de procesos que ya no existen. Toda escritura
+    se hace con el archivo bloqueado (`<diario>.lock`), así una compactación
+    no pierde las líneas que otro proceso añada mientras tanto.
+    """
+
+    def __init__(self, path, progress_interval: float = 2.0):
+        self.path = str(path)
+        self.progress_interval = progress_interval
+        self._lock = threading.Lock()
+        self._last_progress: Dict[str, float] = {}
+
+    # --- Escritura ---
+
+    @contextmanager
+    def _exclusive(self):
+        """Excluye a los demás hilos y procesos que usan el mismo diario (no reentrante)."""
+        with self._lock, _file_lock(self.path + ".lock"):
+            yield
+
+    def _write(self, records: Iterable[dict], sync: bool = False):
+        lines = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+            if sync:
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _append(self, record: dict, sync: bool = False):
+        with self._exclusive():
+            self._write([record], sync)
+
+    def submit(self, job) -> str:
+        """Registra un trabajo nuevo y le asigna su clave en el diario."""
+        if job.journal_key is None:
+            job.journal_key = uuid.uuid4().hex
+            record = {"op": "submit", "key": job.journal_key, "t": time.time(), "pid": os.getpid()}
+            record.update({name: getattr(job, name, None) for name in JOB_FIELDS})
+            self._append(record, sync=True)
+        return job.journal_key
+
+    def update(self, job, **fields):
+        if job.journal_key is not None:
+            self._append({"op": "update", "key": job.journal_key, **fields}, sync=True)
+
+    def progress(self, job, d: dict):
+        """Anota el byte por el que va la descarga (como mucho cada `progress_interval` s)."""
+        if job.journal_key is None:
+            return
+        now = time.monotonic()
+        if d.get("status") == "downloading" and now - self._last_progress.get(job.journal_key, 0) < self.progress_interval:
+            return
+        self._last_progress[job.journal_key] = now
+        self._append({
+            "op": "progress", "key": job.journal_key, "status": d.get("status"),
+            "filename": d.get("filename"), "downloaded": d.get("downloaded_bytes") or 0,
+            "total": d.get("total_bytes") or d.get("total_bytes_estimate"),
+        })
+
+    def finish(self, job):
+        if job.journal_key is not None:
+            self._last_progress.pop(job.journal_key, None)
+            self._append({"op": "finish", "key": job.journal_key, "state": job.state}, sync=True)
+
+    def discard(self, keys: Iterable[str]):
+        """Da por terminados trabajos pendientes que no se van a reanudar."""
+        for key in keys:
+            self._append({"op": "finish", "key": key, "state": "discarded"})
+
+    # --- Lectura ---
+
+    def _replay(self) -> Dict[str, dict]:
+        jobs: Dict[str, dict] = {}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return jobs
+        for line in lines:
+            try:
+                record = json.loads(line)
+                op, key = record.pop("op"), record.pop("key")
+            except (ValueError, KeyError, AttributeError):
+                continue  # línea incompleta por una caída
+            if op == "submit":
+                jobs[key] = dict(record, key=key, files={})
+            elif key not in jobs:
+                continue
+            elif op == "update":
+                jobs[key].update(record)
+            elif op == "progress" and record.get("filename"):
+                jobs[key]["files"][record["filename"]] = {
+                    "downloaded": record.get("downloaded"), "total": record.get("total"),
+                    "finished": record.get("status") == "finished",
+                }
+            elif op == "finish":
+                del jobs[key]
+        return jobs
+
+    def pending(self, compact: bool = True) -> List[dict]:
+        """
+        Trabajos sin terminar cuyo proceso ya no existe, en el orden en que
+        se enviaron. Pasan a ser de este proceso, así otro que arranque a la
+        vez no los reanuda también. Con `compact` el archivo se reescribe
+        dejando solo los trabajos sin terminar (de cualquier proceso).
+        """
+        with self._exclusive():
+            jobs = self._compact() if compact else self._replay()
+            orphans = [job for job in jobs.values() if not _alive(job.get("pid"))]
+            pid = os.getpid()
+            self._write(({"op": "update", "key": job["key"], "pid": pid} for job in orphans), sync=True)
+        for job in orphans:
+            job["pid"] = pid
+        return orphans
+
+    def compact(self) -> List[dict]:
+        """
+        Reescribe el archivo dejando solo los trabajos sin terminar y los
+        devuelve. Se puede llamar con trabajos en marcha, en este o en otro
+        proceso: el archivo está bloqueado mientras tanto.
+        """
+        with self._exclusive():
+            return list(self._compact().values())
+
+    def _compact(self) -> Dict[str, dict]:
+        jobs = self._replay()
+        self._rewrite(jobs.values())
+        return jobs
+
+    def _rewrite(self, jobs: Iterable[dict]):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for job in jobs:
+                f.write(json.dumps({"op": "submit", **{k: v for k, v in job.items() if k != "files"}},
+                                   ensure_ascii=False) + "\n")
+                for filename, state in job["files"].items():
+                    f.write(json.dumps({
+                        "op": "progress", "key": job["key"], "filename": filename,
+                        "status": "finished" if state["finished"] else "downloading",
+                        "downloaded": state["downloaded"], "total": state["total"],
+                    }, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+
+def describe(record: dict) -> str:
+    """Texto corto de un trabajo pendiente: título y bytes ya descargados."""
+    done = sum(f["downloaded"] or 0 for f in record.get("files", {}).values())
+    total = sum(f["total"] or 0 for f in record.get("files", {}).values())
+    title = record.get("title") or record.get("url")
+    if total:
+        return f"{title} ({utils.human_size(done)} de {utils.human_size(total)})"
+    return title
+
+
+_journal: Optional[JobJournal] = None
+
+
+def get_journal() -> Optional[JobJournal]:
+    """Diario compartido en la carpeta de datos, o None si está desactivado."""
+    global _journal
+    if _journal is None and settings.load_settings().get("job_journal", True):
+        _journal = JobJournal(settings.get_data_dir() / "jobs.jsonl")
+    return _journal
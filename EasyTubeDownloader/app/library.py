@@ -0,0 +1,288 @@
+# app/library.py
+import json
+import os
+import re
+import shutil
+import sqlite3
+import subprocess
+import threading
+from typing import Callable, Dict, List, Optional, Set
+
+from . import settings, utils
+
+MEDIA_EXTENSIONS = {
+    ".mp3", ".m4a", ".opus", ".ogg", ".flac", ".wav", ".aac",
+    ".mp4", ".mkv", ".webm", ".mov", ".avi", ".flv",
+}
+# Archivos a medio hacer de yt-dlp o de postprocess
+PARTIAL_SUFFIXES = (".part", ".ytdl", ".temp")
+# "Título [ID].ext", como los nombra downloader cuando hay choque de títulos
+FILENAME_ID_REGEX = re.compile(r"\[([0-9A-Za-z_-]{11})\]")
+PROBE_TIMEOUT = 10
+SCAN_BATCH = 200  # archivos por escritura en la base de datos durante un escaneo
+
+
+class LibraryEntry:
+    """Un archivo de la carpeta de descargas tal como está en el índice."""
+
+    __slots__ = ("path", "size", "mtime", "video_id", "duration", "name")
+
+    def __init__(self, path: str, size: int, mtime: float, video_id: Optional[str] = None,
+                 duration: Optional[float] = None):
+        self.path = path
+        self.size = size
+        self.mtime = mtime
+        self.video_id = video_id
+        self.duration = duration
+        self.name = os.path.splitext(os.path.basename(path))[0].lower()
+
+
+def is_media_file(name: str) -> bool:
+    if name.startswith(".") or any(s in name for s in PARTIAL_SUFFIXES):
+        return False
+    return os.path.splitext(name)[1].lower() in MEDIA_EXTENSIONS
+
+
+def id_from_filename(path: str) -> Optional[str]:
+    match = FILENAME_ID_REGEX.search(os.path.basename(path))
+    return match.group(1) if match else None
+
+
+def probe(path: str):
+    """
+    (ID del video, duración) leídos de las etiquetas del archivo con ffprobe.
+    Devuelve (None, None) si ffprobe no está o el archivo no se puede leer.
+    """
+    ffprobe = shutil.which("ffprobe")
+    if ffprobe is None:
+        return None, None
+    try:
+        out = subprocess.run(
+            [ffprobe, "-v", "quiet", "-print_format", "json", "-show_format", path],
+            stdin=subprocess.DEVNULL, capture_output=True, timeout=PROBE_TIMEOUT,
+        ).stdout
+        fmt = json.loads(out or b"{}").get("format", {})
+    except (OSError, ValueError, subprocess.TimeoutExpired):
+        return None, None
+    tags = {k.lower(): v for k, v in (fmt.get("tags") or {}).items()}
+    video_id = None
+    # yt-dlp guarda la URL del video en 'purl' o 'comment' al incrustar metadatos
+    for key in ("purl", "comment", "description"):
+        video_id = utils.extract_video_id(tags.get(key) or "")
+        if video_id:
+            break
+    try:
+        duration = float(fmt["duration"])
+    except (KeyError, TypeError, ValueError):
+        duration = None
+    return video_id, duration
+
+
+class LibraryIndex:
+    """
+    Índice de lo que ya hay en las carpetas de descargas.
+
+    La primera vez se recorre la carpeta entera; después, cada escaneo solo
+    compara tamaño y fecha de modificación con lo guardado, así que solo se
+    vuelven a leer (ffprobe) los archivos nuevos o cambiados. Las consultas
+    (¿está ya este video?, búsqueda por nombre) van contra memoria y no
+    tocan el disco.
+    """
+
+    def __init__(self, db_path, use_probe: bool = True):
+        self.use_probe = use_probe
+        self._lock = threading.Lock()
+        self._scanning: Set[str] = set()
+        self._db = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            " path TEXT PRIMARY KEY,"
+            " size INTEGER NOT NULL,"
+            " mtime REAL NOT NULL,"
+            " video_id TEXT,"
+            " duration REAL)"
+        )
+        self._db.commit()
+        self._entries: Dict[str, LibraryEntry] = {}
+        self._by_id: Dict[str, Set[str]] = {}
+        for row in self._db.execute("SELECT path, size, mtime, video_id, duration FROM files"):
+            self._put(LibraryEntry(*row))
+
+    @classmethod
+    def from_settings(cls) -> "LibraryIndex":
+        conf = settings.load_settings()
+        return cls(settings.get_data_dir() / "library.sqlite3", use_probe=conf.get("library_probe", True))
+
+    def __len__(self):
+        return len(self._entries)
+
+    # --- Consultas ---
+
+    def has(self, video_id: Optional[str], folder: Optional[str] = None) -> bool:
+        return bool(self.find(video_id, folder))
+
+    def find(self, video_id: Optional[str], folder: Optional[str] = None) -> List[LibraryEntry]:
+        """Archivos del video `video_id` (opcionalmente solo dentro de `folder`)."""
+        with self._lock:
+            paths = list(self._by_id.get(video_id, ())) if video_id else []
+            entries = [self._entries[p] for p in paths]
+        if folder:
+            prefix = os.path.join(os.path.abspath(folder), "")
+            entries = [e for e in entries if e.path.startswith(prefix)]
+        return entries
+
+    def search(self, text: str, folder: Optional[str] = None, limit: int = 200) -> List[LibraryEntry]:
+        """Archivos cuyo nombre contiene todas las palabras de `text` (o cuyo ID es `text`)."""
+        words = text.lower().split()
+        prefix = os.path.join(os.path.abspath(folder), "") if folder else ""
+        with self._lock:
+            entries = list(self._entries.values())
+        results = []
+        for entry in entries:
+            if prefix and not entry.path.startswith(prefix):
+                continue
+            if all(w in entry.name for w in words) or (text.strip() and entry.video_id == text.strip()):
+                results.append(entry)
+                if len(results) >= limit:
+                    break
+        return results
+
+    # --- Actualización ---
+
+    def add_file(self, path: str, video_id: Optional[str] = None, duration: Optional[float] = None):
+        """Registra un archivo recién descargado sin esperar al próximo escaneo."""
+        path = os.path.abspath(path)
+        try:
+            st = os.stat(path)
+        except OSError:
+            return
+        entry = LibraryEntry(path, st.st_size, st.st_mtime, video_id or id_from_filename(path), duration)
+        with self._lock:
+            self._put(entry)
+            self._db.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)",
+                             (entry.path, entry.size, entry.mtime, entry.video_id, entry.duration))
+            self._db.commit()
+
+    def scan(self, folder: str):
+        """
+        Escaneo incremental de `folder` (con subcarpetas). Devuelve
+        (nuevos, modificados, borrados).
+
+        Lo leído se guarda cada SCAN_BATCH archivos: en un primer escaneo
+        grande (con ffprobe por archivo) ya se puede buscar en lo indexado
+        y, si se interrumpe, el siguiente escaneo sigue donde quedó.
+        """
+        folder = os.path.abspath(folder)
+        prefix = os.path.join(folder, "")
+        with self._lock:
+            known = {p: (e.size, e.mtime) for p, e in self._entries.items() if p.startswith(prefix)}
+        seen = set()
+        changed = []
+        added = 0
+        for path, st in self._walk(folder):
+            seen.add(path)
+            old = known.get(path)
+            if old != (st.st_size, st.st_mtime):
+                changed.append((path, st))
+                added += old is None
+        removed = [p for p in known if p not in seen]
+
+        with self._lock:
+            for path in removed:
+                self._drop(path)
+            self._db.executemany("DELETE FROM files WHERE path = ?", ((p,) for p in removed))
+            self._db.commit()
+
+        entries = []
+        for path, st in changed:
+            with self._lock:
+                previous = self._entries.get(path)
+            video_id = id_from_filename(path) or (previous.video_id if previous else None)
+            duration = None
+            if self.use_probe:
+                probed_id, duration = probe(path)
+                video_id = video_id or probed_id
+            entries.append(LibraryEntry(path, st.st_size, st.st_mtime, video_id, duration))
+            if len(entries) >= SCAN_BATCH:
+                self._save(entries)
+                entries = []
+        self._save(entries)
+        return added, len(changed) - added, len(removed)
+
+    def _save(self, entries):
+        if not entries:
+            return
+        with self._lock:
+            for entry in entries:
+                self._put(entry)
+            self._db.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)",
+                                 ((e.path, e.size, e.mtime, e.video_id, e.duration) for e in entries))
+            self._db.commit()
+
+    def scan_async(self, folder: str, on_done: Optional[Callable[[tuple], None]] = None):
+        """Escanea en segundo plano; si esa carpeta ya se está escaneando no hace nada."""
+        folder = os.path.abspath(folder)
+        with self._lock:
+            if folder in self._scanning:
+                return
+            self._scanning.add(folder)
+
+        def worker():
+            try:
+                result = self.scan(folder)
+                if on_done:
+                    on_done(result)
+            except Exception as e:
+                print("Error escaneando la biblioteca:", e)
+            finally:
+                with self._lock:
+                    self._scanning.discard(folder)
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    # --- Internos ---
+
+    @staticmethod
+    def _walk(folder: str):
+        stack = [folder]
+        while stack:
+            current = stack.pop()
+            try:
+                with os.scandir(current) as it:
+                    for item in it:
+                        try:
+                            if item.is_dir(follow_symlinks=False):
+                                if not item.name.startswith("."):
+                                    stack.append(item.path)
+                            elif item.is_file() and is_media_file(item.name):
+                                yield item.path, item.stat()
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+
+    def _put(self, entry: LibraryEntry):
+        self._drop(entry.path)
+        self._entries[entry.path] = entry
+        if entry.video_id:
+            self._by_id.setdefault(entry.video_id, set()).add(entry.path)
+
+    def _drop(self, path: str):
+        entry = self._entries.pop(path, None)
+        if entry is not None and entry.video_id:
+            paths = self._by_id.get(entry.video_id)
+            if paths is not None:
+                paths.discard(path)
+                if not paths:
+                    del self._by_id[entry.video_id]
+
+
+_library: Optional[LibraryIndex] = None
+
+
+def get_library() -> Optional[LibraryIndex]:
+    """Índice compartido en la carpeta de datos, o None si está desactivado."""
+    global _library
+    if _library is None and settings.load_settings().get("library_index", True):
+        _library = LibraryIndex.from_settings()
+    return _library
@@ -0,0 +1,214 @@
+# app/metrics.py
+import contextlib
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from . import settings
+
+# Prefijo de las métricas en el archivo de Prometheus
+PROM_PREFIX = "easytube"
+
+
+class JobMetrics:
+    """
+    Tiempos de un trabajo por fase (extracción, descarga, posproceso...),
+    tiempo hasta el primer byte, velocidad media y máxima y bytes escritos.
+
+    hook() es un hook de progreso de yt-dlp; el resto lo llama el planificador.
+    """
+
+    def __init__(self, job_id, url: str, mode: str):
+        self.job_id = job_id
+        self.url = url
+        self.mode = mode
+        self.created = time.time()
+        self.phases: Dict[str, float] = {}
+        self.auth: Dict[str, Dict[str, Optional[float]]] = {}
+        self.ttfb: Optional[float] = None
+        self.peak_speed = 0.0
+        self.bytes_downloaded = 0
+        self.bytes_written = 0
+        self.notes: Dict[str, str] = {}  # decisiones del trabajo (p. ej. por qué no hubo streaming)
+        self._started: Dict[str, float] = {}
+        self._files: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def start(self, phase: str):
+        self._started[phase] = time.perf_counter()
+
+    def stop(self, phase: str):
+        start = self._started.pop(phase, None)
+        if start is not None:
+            self.phases[phase] = self.phases.get(phase, 0.0) + time.perf_counter() - start
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        self.start(name)
+        try:
+            yield
+        finally:
+            self.stop(name)
+
+    def add_auth(self, phase: str, timings: Dict[str, Optional[float]]):
+        """Segundos de cada estrategia de cookies en una fase (ver auth.CredentialManager.run)."""
+        self.auth.setdefault(phase, {}).update(timings)
+
+    def note(self, key: str, value: str):
+        self.notes[key] = value
+
+    def hook(self, d: dict):
+        status = d.get("status")
+        if status not in ("downloading", "finished"):
+            return
+        with self._lock:
+            if self.ttfb is None and d.get("downloaded_bytes") and "download" in self._started:
+                self.ttfb = time.perf_counter() - self._started["download"]
+            filename = d.get("filename") or ""
+            self._files[filename] = max(self._files.get(filename, 0), d.get("downloaded_bytes") or 0)
+            self.bytes_downloaded = sum(self._files.values())
+            speed = d.get("speed")
+            if speed and speed > self.peak_speed:
+                self.peak_speed = speed
+
+    def add_output(self, path: Optional[str]):
+        try:
+            self.bytes_written += os.path.getsize(path) if path else 0
+        except OSError:
+            pass
+
+    @property
+    def avg_speed(self) -> Optional[float]:
+        seconds = self.phases.get("download")
+        return self.bytes_downloaded / seconds if seconds else None
+
+    def record(self, state: Optional[str] = None, error: Optional[str] = None) -> dict:
+        return {
+            "job": self.job_id,
+            "url": self.url,
+            "mode": self.mode,
+            "state": state,
+            "error": error,
+            "created": self.created,
+            "phases": {k: round(v, 4) for k, v in self.phases.items()},
+            "auth": self.auth,
+            "ttfb": self.ttfb,
+            "avg_speed": self.avg_speed,
+            "peak_speed": self.peak_speed or None,
+            "bytes_downloaded": self.bytes_downloaded,
+            "bytes_written": self.bytes_written,
+            "notes": self.notes,
+        }
+
+
+class MetricsRecorder:
+    """
+    Escribe una línea JSON por trabajo terminado y, si se indica
+    `prometheus_path`, mantiene un archivo de texto con contadores
+    acumulados en el formato del textfile collector de node_exporter.
+    """
+
+    def __init__(self, path, prometheus_path: Optional[str] = None):
+        self.path = str(path)
+        self.prometheus_path = prometheus_path or None
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, int] = {}
+        self._phase_seconds: Dict[str, float] = {}
+        self._phase_count: Dict[str, int] = {}
+        self._bytes_downloaded = 0
+        self._bytes_written = 0
+
+    @classmethod
+    def from_settings(cls) -> "MetricsRecorder":
+        conf = settings.load_settings()
+        return cls(settings.get_data_dir() / "metrics.jsonl", conf.get("metrics_prometheus") or None)
+
+    def emit(self, metrics: JobMetrics, state: Optional[str] = None, error: Optional[str] = None):
+        record = metrics.record(state, error)
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+            self._jobs[state] = self._jobs.get(state, 0) + 1
+            for phase, seconds in metrics.phases.items():
+                self._phase_seconds[phase] = self._phase_seconds.get(phase, 0.0) + seconds
+                self._phase_count[phase] = self._phase_count.get(phase, 0) + 1
+            self._bytes_downloaded += metrics.bytes_downloaded
+            self._bytes_written += metrics.bytes_written
+            if self.prometheus_path:
+                self._write_prometheus()
+
+    def _write_prometheus(self):
+        p = PROM_PREFIX
+        lines = [
+            f"# HELP {p}_jobs_total Trabajos terminados por estado.",
+            f"# TYPE {p}_jobs_total counter",
+        ]
+        lines += [f'{p}_jobs_total{{state="{s}"}} {n}' for s, n in sorted(self._jobs.items(), key=str)]
+        lines += [
+            f"# HELP {p}_phase_seconds Segundos acumulados por fase.",
+            f"# TYPE {p}_phase_seconds summary",
+        ]
+        for phase in sorted(self._phase_seconds):
+            lines.append(f'{p}_phase_seconds_sum{{phase="{phase}"}} {self._phase_seconds[phase]:.6f}')
+            lines.append(f'{p}_phase_seconds_count{{phase="{phase}"}} {self._phase_count[phase]}')
+        lines += [
+            f"# TYPE {p}_bytes_downloaded_total counter",
+            f"{p}_bytes_downloaded_total {self._bytes_downloaded}",
+            f"# TYPE {p}_bytes_written_total counter",
+            f"{p}_bytes_written_total {self._bytes_written}",
+        ]
+        # El collector puede leer en cualquier momento: escribir aparte y renombrar
+        tmp = self.prometheus_path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+            os.replace(tmp, self.prometheus_path)
+        except OSError as e:
+            print("Error escribiendo métricas de Prometheus:", e)
+
+
+@contextlib.contextmanager
+def profiled(name: str):
+    """
+    Perfila con cProfile el bloque si 'profile_downloads' está activado y
+    guarda el resultado en <datos>/profiles/<name>-<fecha>.prof (se abre
+    con pstats o snakeviz). Si ya hay otro perfilador activo, no hace nada.
+
+    cProfile solo ve el hilo que lo activa. Por eso no se usa alrededor de
+    una fase entera sino dentro de cada intento de auth.CredentialManager,
+    en el hilo que ejecuta yt-dlp (con la extracción escalonada, cada
+    estrategia en su hilo deja su propio perfil). Lo que corre en hilos
+    que ese intento lanza (segmentos, fragmentos DASH, el volcado a
+    ffmpeg) no aparece en el perfil.
+    """
+    if not settings.load_settings().get("profile_downloads", False):
+        yield
+        return
+    import cProfile
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        yield
+        return
+    try:
+        yield
+    finally:
+        profiler.disable()
+        folder = settings.get_data_dir() / "profiles"
+        folder.mkdir(exist_ok=True)
+        profiler.dump_stats(str(folder / f"{name}-{time.strftime('%Y%m%d-%H%M%S')}.prof"))
+
+
+_recorder: Optional[MetricsRecorder] = None
+
+
+def get_recorder() -> Optional[MetricsRecorder]:
+    """Registro compartido de métricas, o None si está desactivado."""
+    global _recorder
+    if _recorder is None and settings.load_settings().get("metrics_log", True):
+        _recorder = MetricsRecorder.from_settings()
+    return _recorder
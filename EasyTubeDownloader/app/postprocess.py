@@ -0,0 +1,233 @@
+# app/postprocess.py
+import collections
+import contextlib
+import os
+import shutil
+import subprocess
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional
+
+from . import settings
+
+# Códec de salida -> (prefijo del acodec de yt-dlp, codificador de ffmpeg, extensión)
+AUDIO_CODECS = {
+    "mp3": ("mp3", "libmp3lame", "mp3"),
+    "m4a": ("mp4a", "aac", "m4a"),
+    "opus": ("opus", "libopus", "opus"),
+    "vorbis": ("vorbis", "libvorbis", "ogg"),
+    "flac": ("flac", "flac", "flac"),
+}
+
+# Contenedores que ffmpeg puede leer de principio a fin sin volver atrás.
+# MP4/M4A quedan fuera: pueden llevar el índice (moov) al final del archivo.
+STREAMABLE_EXTS = {"webm", "weba", "ogg", "opus", "mp3", "aac", "flac", "wav"}
+STREAM_CHUNK = 64 * 1024
+
+
+class PostProcessError(Exception):
+    pass
+
+
+class StreamUnsupported(PostProcessError):
+    """ffmpeg no pudo leer el formato desde una tubería: hay que usar las dos pasadas."""
+
+
+def find_ffmpeg() -> str:
+    path = shutil.which("ffmpeg")
+    if path is None:
+        raise PostProcessError("No se encontró ffmpeg. Instálalo y agrégalo al PATH.")
+    return path
+
+
+def can_copy(source_acodec: Optional[str], codec: str) -> bool:
+    """True si el audio ya está en el códec de destino y basta con copiarlo."""
+    prefix = AUDIO_CODECS[codec][0]
+    return bool(source_acodec) and source_acodec.startswith(prefix)
+
+
+def audio_command(src: str, dest: str, codec: str, quality: str, copy: bool) -> list:
+    """
+    Línea de ffmpeg para extraer el audio. `quality` sigue el criterio de
+    yt-dlp: de 0 a 10 es calidad VBR, un número mayor son kbps.
+    """
+    cmd = [find_ffmpeg(), "-y", "-loglevel", "error", "-i", src, "-vn", "-map_metadata", "0"]
+    if copy:
+        return cmd + ["-c:a", "copy", dest]
+    cmd += ["-c:a", AUDIO_CODECS[codec][1]]
+    if quality:
+        value = float(quality)
+        if value <= 10 and codec in ("mp3", "vorbis"):
+            cmd += ["-q:a", str(int(value))]
+        elif value > 10:
+            cmd += ["-b:a", f"{int(value)}k"]
+    return cmd + [dest]
+
+
+def extract_audio(src: str, codec: str = "mp3", quality: str = "192", source_acodec: Optional[str] = None,
+                  keep_source: bool = False, cancel_event: Optional[threading.Event] = None) -> str:
+    """
+    Convierte `src` al códec pedido y devuelve la ruta del resultado. Si el
+    audio ya está en ese códec se copia el flujo sin recodificar. Si el
+    destino ya existe (p. ej. al reanudar), no se hace nada.
+    """
+    dest = os.path.splitext(src)[0] + "." + AUDIO_CODECS[codec][2]
+    if os.path.exists(dest):
+        if dest != src and not keep_source and os.path.exists(src):
+            os.remove(src)
+        return dest
+    tmp = os.path.splitext(dest)[0] + ".temp." + AUDIO_CODECS[codec][2]
+    cmd = audio_command(src, tmp, codec, quality, can_copy(source_acodec, codec))
+    proc = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    while True:
+        try:
+            _, stderr = proc.communicate(timeout=0.5)
+            break
+        except subprocess.TimeoutExpired:
+            if cancel_event is not None and cancel_event.is_set():
+                proc.kill()
+                proc.communicate()
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+                raise PostProcessError("Conversión cancelada")
+    if proc.returncode != 0:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        message = stderr.decode("utf-8", "replace").strip().splitlines()
+        raise PostProcessError(f"ffmpeg falló: {message[-1] if message else proc.returncode}")
+    os.replace(tmp, dest)
+    if not keep_source:
+        os.remove(src)
+    return dest
+
+
+def can_stream(fmt: dict) -> bool:
+    """True si el formato es un único archivo HTTP que ffmpeg puede leer en orden."""
+    return (fmt.get("protocol") in ("http", "https") and not fmt.get("fragments")
+            and bool(fmt.get("url")) and fmt.get("ext") in STREAMABLE_EXTS)
+
+
+def stream_audio(source, dest: str, codec: str = "mp3", quality: str = "192",
+                 source_acodec: Optional[str] = None, progress: Optional[Callable[[dict], None]] = None,
+                 throttle: Optional[Callable[[int], None]] = None,
+                 cancel_event: Optional[threading.Event] = None) -> str:
+    """
+    Lee el audio de `source` y lo va pasando a ffmpeg por stdin, así la
+    conversión avanza a la vez que la descarga y en disco solo queda el
+    archivo final. `source` ya tiene la conexión abierta (un error de red se
+    propaga sin lanzar ffmpeg): ofrece read(n), close() y `total` (bytes o
+    None). `progress` recibe dicts como los de los hooks de yt-dlp y
+    `throttle` el tamaño de cada bloque (cuota de ancho de banda).
+
+    Lanza StreamUnsupported si ffmpeg no acepta la entrada (p. ej. porque
+    necesita buscar en el archivo); el llamador puede repetir en dos pasadas.
+    """
+    if os.path.exists(dest):
+        source.close()
+        return dest
+    tmp = os.path.splitext(dest)[0] + ".temp." + AUDIO_CODECS[codec][2]
+    cmd = audio_command("pipe:0", tmp, codec, quality, can_copy(source_acodec, codec))
+    total = source.total
+    proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    # stderr se vacía en otro hilo para que ffmpeg nunca se bloquee escribiendo
+    errors = collections.deque(maxlen=20)
+    reader = threading.Thread(
+        target=lambda: errors.extend(line.decode("utf-8", "replace").strip() for line in proc.stderr),
+        daemon=True,
+    )
+    reader.start()
+    downloaded = 0
+    started = time.monotonic()
+
+    def report(status):
+        elapsed = time.monotonic() - started
+        speed = downloaded / elapsed if elapsed else None
+        progress({
+            "status": status, "filename": dest, "downloaded_bytes": downloaded, "total_bytes": total,
+            "elapsed": elapsed, "speed": speed,
+            "eta": (total - downloaded) / speed if total and speed else None,
+        })
+
+    try:
+        with contextlib.closing(source):
+            while True:
+                if cancel_event is not None and cancel_event.is_set():
+                    raise PostProcessError("Conversión cancelada")
+                chunk = source.read(STREAM_CHUNK)
+                if not chunk:
+                    break
+                if throttle is not None:
+                    throttle(len(chunk))
+                try:
+                    proc.stdin.write(chunk)
+                except BrokenPipeError:
+                    break  # ffmpeg terminó antes de tiempo: se mira su código abajo
+                downloaded += len(chunk)
+                if progress is not None:
+                    report("downloading")
+        try:
+            proc.stdin.close()
+        except BrokenPipeError:
+            pass
+        proc.wait()
+    except BaseException:
+        proc.kill()
+        proc.wait()
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    finally:
+        reader.join(timeout=5)
+    if proc.returncode != 0:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise StreamUnsupported(f"ffmpeg falló: {errors[-1] if errors else proc.returncode}")
+    if total and downloaded < total:
+        os.remove(tmp)
+        raise PostProcessError(f"Descarga incompleta ({downloaded} de {total} bytes)")
+    os.replace(tmp, dest)
+    if progress is not None:
+        report("finished")
+    return dest
+
+
+class PostProcessPool:
+    """
+    Conversiones de audio fuera de los hilos de descarga.
+
+    Cada tarea lanza un proceso de ffmpeg; como mucho `workers` a la vez
+    (por defecto tantos como núcleos), así la conversión usa la CPU en
+    paralelo mientras los hilos del planificador siguen descargando.
+    """
+
+    def __init__(self, workers: Optional[int] = None):
+        self.workers = workers or os.cpu_count() or 2
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="postprocess")
+
+    @classmethod
+    def from_settings(cls) -> "PostProcessPool":
+        return cls(settings.load_settings().get("postprocess_workers", 0) or None)
+
+    def submit(self, src: str, source_acodec: Optional[str] = None,
+               cancel_event: Optional[threading.Event] = None) -> "Future[str]":
+        """Convierte `src` con el códec y la calidad de la configuración."""
+        conf = settings.load_settings()
+        return self._executor.submit(
+            extract_audio, src, conf.get("audio_codec", "mp3"), str(conf.get("audio_quality", "192")),
+            source_acodec, False, cancel_event,
+        )
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+
+_pool: Optional[PostProcessPool] = None
+
+
+def get_pool() -> PostProcessPool:
+    """Pool compartido de conversiones."""
+    global _pool
+    if _pool is None:
+        _pool = PostProcessPool.from_settings()
+    return _pool
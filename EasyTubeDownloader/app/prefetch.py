@@ -0,0 +1,90 @@
+# app/prefetch.py
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional
+
+from . import downloader, settings, utils
+
+
+class Prefetcher:
+    """
+    Extracción especulativa de la URL que se está escribiendo.
+
+    Cada cambio del texto reinicia una espera de `delay` segundos; si al
+    terminarla el texto es un enlace de YouTube de un video que no está en
+    la caché, se extrae en segundo plano y el resultado queda en la caché
+    de metadatos. Cuando el usuario pulsa "Descargar" o "Detectar formatos"
+    la información ya está ahí, o se espera a la extracción en curso en
+    lugar de lanzar otra (ver downloader.get_video_info_timed).
+
+    Un cambio de texto cancela la espera y la extracción si aún no empezó;
+    una extracción ya empezada no se puede interrumpir (yt-dlp no lo
+    permite), pero su resultado sigue siendo útil en la caché.
+    """
+
+    def __init__(self, delay: float = 0.6, workers: int = 2):
+        self.delay = delay
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prefetch")
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        self._future: Optional[Future] = None
+        self._url: Optional[str] = None
+
+    @classmethod
+    def from_settings(cls) -> "Prefetcher":
+        return cls(settings.load_settings().get("prefetch_delay", 0.6))
+
+    def schedule(self, text: str):
+        """Llamar en cada cambio del campo de URL (no bloquea)."""
+        url = (text or "").strip()
+        with self._lock:
+            if url == self._url:
+                return
+            self._url = url
+            self._cancel_pending()
+            if not utils.is_youtube_url(url) or utils.is_playlist_url(url):
+                return  # las listas pueden tener miles de entradas: no se anticipan
+            self._timer = threading.Timer(self.delay, self._start, args=(url,))
+            self._timer.daemon = True
+            self._timer.start()
+
+    def cancel(self):
+        with self._lock:
+            self._url = None
+            self._cancel_pending()
+
+    def _cancel_pending(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._future is not None:
+            self._future.cancel()  # solo surte efecto si aún no empezó
+            self._future = None
+
+    def _start(self, url: str):
+        with self._lock:
+            if url != self._url:
+                return
+            self._timer = None
+            if downloader.extracting(url) or downloader.get_cache().get(url) is not None:
+                return
+            self._future = self._executor.submit(self._fetch, url)
+
+    @staticmethod
+    def _fetch(url: str):
+        try:
+            downloader.get_video_info(url)
+        except Exception as e:
+            # Sin avisar: si el usuario sigue adelante verá el error al pulsar el botón
+            print("Prefetch sin éxito:", e)
+
+
+_prefetcher: Optional[Prefetcher] = None
+
+
+def get_prefetcher() -> Optional[Prefetcher]:
+    """Prefetcher compartido por las ventanas, o None si está desactivado."""
+    global _prefetcher
+    if _prefetcher is None and settings.load_settings().get("prefetch", True):
+        _prefetcher = Prefetcher.from_settings()
+    return _prefetcher
@@ -0,0 +1,150 @@
+# app/progress.py
+import queue
+import time
+from typing import Callable, Dict, Optional
+
+# Peso de la última muestra en la media móvil de la velocidad
+SPEED_SMOOTHING = 0.3
+
+_CALL = object()  # marca de las funciones publicadas con ProgressBus.post
+
+
+class ProgressBus:
+    """
+    Canal entre los hilos de descarga y la interfaz Tk.
+
+    Los hilos solo encolan eventos (una tupla por llamada del hook de
+    yt-dlp) o funciones que deben ejecutarse en el hilo de Tk; nunca tocan
+    widgets. La interfaz los consume con ProgressPump.
+    """
+
+    def __init__(self):
+        self._queue = queue.SimpleQueue()
+
+    def publish(self, job_id, d: dict):
+        """Hook de progreso: solo copia los campos necesarios y encola."""
+        self._queue.put((
+            job_id, d.get("status"), d.get("downloaded_bytes") or 0,
+            d.get("total_bytes") or d.get("total_bytes_estimate"), time.monotonic(),
+        ))
+
+    def hook_for(self, job_id) -> Callable[[dict], None]:
+        return lambda d: self.publish(job_id, d)
+
+    def post(self, callback: Callable, *args):
+        """Pide que callback(*args) se ejecute en el hilo de la interfaz."""
+        self._queue.put((_CALL, callback, args))
+
+    def drain(self):
+        items = []
+        while True:
+            try:
+                items.append(self._queue.get_nowait())
+            except queue.Empty:
+                return items
+
+
+class JobProgress:
+    __slots__ = ("status", "downloaded", "total", "speed", "last_bytes", "last_time")
+
+    def __init__(self):
+        self.status = None
+        self.downloaded = 0
+        self.total = None
+        self.speed = None
+        self.last_bytes = 0
+        self.last_time = None
+
+    @property
+    def fraction(self) -> float:
+        return min(1.0, self.downloaded / self.total) if self.total else 0.0
+
+    @property
+    def eta(self) -> Optional[float]:
+        if not self.total or not self.speed:
+            return None
+        return max(0.0, (self.total - self.downloaded) / self.speed)
+
+
+class ProgressSnapshot:
+    """Progreso agregado de todas las descargas activas."""
+    __slots__ = ("jobs", "downloaded", "total", "speed")
+
+    def __init__(self, jobs: Dict[object, JobProgress]):
+        self.jobs = jobs
+        known = [j for j in jobs.values() if j.total]
+        self.downloaded = sum(j.downloaded for j in known)
+        self.total = sum(j.total for j in known)
+        self.speed = sum(j.speed or 0 for j in jobs.values())
+
+    @property
+    def fraction(self) -> float:
+        return min(1.0, self.downloaded / self.total) if self.total else 0.0
+
+    @property
+    def eta(self) -> Optional[float]:
+        if not self.total or not self.speed:
+            return None
+        return max(0.0, (self.total - self.downloaded) / self.speed)
+
+
+class ProgressPump:
+    """
+    Vacía el ProgressBus desde el hilo de Tk cada `interval_ms` usando
+    after(), se queda solo con el último evento de cada trabajo, calcula la
+    velocidad suavizada y llama a render(snapshot) una vez por ciclo.
+    """
+
+    def __init__(self, widget, bus: ProgressBus, render: Callable[[ProgressSnapshot], None],
+                 interval_ms: int = 150):
+        self.widget = widget
+        self.bus = bus
+        self.render = render
+        self.interval_ms = interval_ms
+        self.jobs: Dict[object, JobProgress] = {}
+        self.widget.after(self.interval_ms, self._tick)
+
+    def forget(self, job_id):
+        self.jobs.pop(job_id, None)
+
+    def _tick(self):
+        try:
+            if not self.widget.winfo_exists():
+                return
+        except Exception:
+            return
+        latest, calls = {}, []
+        for item in self.bus.drain():
+            if item[0] is _CALL:
+                calls.append(item)
+            else:
+                latest[item[0]] = item  # solo cuenta el último evento de cada trabajo
+        for item in latest.values():
+            self._update(*item)
+        if latest:
+            self.render(ProgressSnapshot(self.jobs))
+        # Después del progreso, para que p. ej. forget() no se vea deshecho
+        for _, callback, args in calls:
+            try:
+                callback(*args)
+            except Exception as e:
+                print("Error en callback de la interfaz:", e)
+        self.widget.after(self.interval_ms, self._tick)
+
+    def _update(self, job_id, status, downloaded, total, stamp):
+        job = self.jobs.get(job_id)
+        if job is None:
+            job = self.jobs[job_id] = JobProgress()
+        if downloaded < job.last_bytes:
+            # Empieza otro archivo del mismo trabajo (p. ej. el audio tras el video)
+            job.last_bytes, job.last_time = 0, None
+        if job.last_time is not None and stamp > job.last_time:
+            sample = (downloaded - job.last_bytes) / (stamp - job.last_time)
+            job.speed = sample if job.speed is None else (
+                SPEED_SMOOTHING * sample + (1 - SPEED_SMOOTHING) * job.speed)
+        job.last_bytes, job.last_time = downloaded, stamp
+        job.status = status
+        job.downloaded = downloaded
+        job.total = total or job.total
+        if status == "finished":
+            job.speed = 0
@@ -0,0 +1,393 @@
+# app/scheduler.py
+import itertools
+import queue
+import threading
+from typing import Callable, List, Optional
+
+from . import archive, bandwidth, downloader, journal, library, metrics, postprocess, settings
+
+# Estados de un trabajo
+QUEUED = "queued"
+EXTRACTING = "extracting"
+DOWNLOADING = "downloading"
+POSTPROCESSING = "post-processing"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+SKIPPED = "skipped"
+
+STATE_LABELS = {
+    QUEUED: "En cola",
+    EXTRACTING: "Extrayendo",
+    DOWNLOADING: "Descargando",
+    POSTPROCESSING: "Procesando",
+    DONE: "Completado",
+    FAILED: "Error",
+    CANCELLED: "Cancelado",
+    SKIPPED: "Omitido (ya descargado)",
+}
+
+FINISHED_STATES = (DONE, FAILED, CANCELLED, SKIPPED)
+
+_ids = itertools.count(1)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    """Una descarga pendiente o en curso dentro del planificador."""
+
+    def __init__(self, url: str, mode: str, target_folder: str, selected_format: Optional[str] = None,
+                 info: Optional[dict] = None, priority: int = 0, weight: float = 1.0, force: bool = False,
+                 on_progress: Optional[Callable[[dict], None]] = None,
+                 on_finish: Optional[Callable[["Job"], None]] = None):
+        self.id = next(_ids)
+        self.url = url
+        self.mode = mode
+        self.target_folder = target_folder
+        self.selected_format = selected_format
+        self.info = info
+        self.priority = priority
+        self.weight = weight      # parte del ancho de banda frente a otros trabajos
+        self.force = force        # descargar aunque ya figure en el archivo
+        self.lease = None         # cuota de ancho de banda mientras descarga
+        self.on_progress = on_progress
+        self.on_finish = on_finish
+        self.title = (info or {}).get("title") or url
+        self.state = QUEUED
+        self.progress = 0.0
+        self.error = None
+        self.cancel_event = threading.Event()
+        self.format_spec = None   # expresión de formato resuelta al empezar
+        self.journal_key = None   # clave en el diario de trabajos
+        self.metrics = None       # tiempos por fase (metrics.JobMetrics) desde que empieza
+
+    @classmethod
+    def from_journal(cls, record: dict, **kwargs) -> "Job":
+        """Trabajo que reanuda uno pendiente del diario, con el mismo formato y carpeta."""
+        job = cls(record["url"], record["mode"], record["target_folder"],
+                  selected_format=record.get("selected_format"),
+                  priority=record.get("priority") or 0, weight=record.get("weight") or 1.0, **kwargs)
+        job.format_spec = record.get("format_spec")
+        job.title = record.get("title") or job.title
+        job.journal_key = record["key"]
+        return job
+
+    @property
+    def finished(self) -> bool:
+        return self.state in FINISHED_STATES
+
+
+class Scheduler:
+    """
+    Cola central de descargas con un número limitado de hilos trabajadores.
+
+    Los trabajos se atienden por prioridad (mayor primero) y, a igual
+    prioridad, por orden de llegada. Los listeners reciben el trabajo cada
+    vez que cambia de estado (se llaman desde el hilo trabajador). Si hay
+    diario, cada trabajo queda registrado hasta que termina, para poder
+    reanudarlo si la aplicación se cierra a mitad.
+
+    La conversión a MP3 no ocupa al trabajador: se hace en streaming
+    mientras se descarga o, si el formato no lo permite, se entrega al pool
+    de postprocess y el trabajador pasa al siguiente trabajo de la cola.
+
+    Con archivo de descargas, lo que ya se descargó (mismo video, modo y
+    formato, y su archivo sigue en la carpeta de destino) termina como
+    SKIPPED salvo que el trabajo lleve force: si el ID sale de la URL ni
+    siquiera se extrae, así repetir un lote solo cuesta los elementos nuevos.
+    """
+
+    def __init__(self, workers: int = 2, journal: Optional["journal.JobJournal"] = None,
+                 pool: Optional[postprocess.PostProcessPool] = None,
+                 archive: Optional["archive.DownloadArchive"] = None,
+                 library: Optional["library.LibraryIndex"] = None,
+                 metrics: Optional["metrics.MetricsRecorder"] = None):
+        self.journal = journal
+        self.metrics = metrics
+        self.pool = pool
+        self.archive = archive
+        self.library = library
+        self._queue = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._jobs = {}
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._workers = 0
+        self._target_workers = 0
+        self.set_workers(workers)
+
+    # --- API pública ---
+
+    def submit(self, job: Job) -> Job:
+        self._journal("submit", job)
+        with self._lock:
+            self._jobs[job.id] = job
+        self._enqueue(job)
+        self._notify(job)
+        return job
+
+    def jobs(self) -> List[Job]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def get(self, job_id: int) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: int):
+        job = self.get(job_id)
+        if job is None or job.finished:
+            return
+        job.cancel_event.set()
+        # Si un trabajador ya lo sacó de la cola, él verá el aviso y lo cancelará
+        self._set_state(job, CANCELLED, expect=QUEUED)
+
+    def set_priority(self, job_id: int, priority: int):
+        """Cambia la prioridad de un trabajo que sigue en cola."""
+        job = self.get(job_id)
+        if job is not None and job.state == QUEUED:
+            job.priority = priority
+            self._enqueue(job)  # la entrada anterior se ignora al sacarla
+
+    def set_weight(self, job_id: int, weight: float):
+        """Cambia la parte del ancho de banda de un trabajo, también en plena descarga."""
+        job = self.get(job_id)
+        if job is not None and not job.finished:
+            job.weight = weight
+            if job.lease is not None:
+                job.lease.set_weight(weight)
+
+    def forget(self, job_id: int):
+        """Quita un trabajo terminado de la lista (útil en lotes muy grandes)."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job.finished:
+                del self._jobs[job_id]
+
+    def clear_finished(self):
+        with self._lock:
+            for job_id in [j.id for j in self._jobs.values() if j.finished]:
+                del self._jobs[job_id]
+
+    def add_listener(self, callback: Callable[[Job], None]):
+        self._listeners.append(callback)
+
+    def set_workers(self, count: int):
+        """Ajusta el número de descargas simultáneas (se puede cambiar en caliente)."""
+        count = max(1, int(count))
+        with self._lock:
+            self._target_workers = count
+            missing = count - self._workers
+            self._workers = max(self._workers, count)
+        for _ in range(missing):
+            threading.Thread(target=self._worker, daemon=True).start()
+
+    # --- Internos ---
+
+    def _enqueue(self, job: Job):
+        self._queue.put((-job.priority, next(self._seq), job))
+
+    def _journal(self, method: str, *args, **kwargs):
+        """Escribe en el diario sin que un fallo de disco tumbe al trabajador."""
+        if self.journal is None:
+            return
+        try:
+            getattr(self.journal, method)(*args, **kwargs)
+        except Exception as e:
+            print("Error al escribir en el diario:", e)
+
+    def _notify(self, job: Job):
+        for callback in list(self._listeners):
+            try:
+                callback(job)
+            except Exception as e:
+                print("Error en listener del planificador:", e)
+
+    def _set_state(self, job: Job, state: str, error: Optional[str] = None,
+                   expect: Optional[str] = None) -> bool:
+        """
+        Cambia el estado del trabajo y avisa. Un trabajo terminado ya no
+        cambia (así on_finish se llama una sola vez), y con `expect` solo se
+        cambia si sigue en ese estado. Devuelve False si no se cambió.
+        """
+        with self._lock:
+            if job.finished or (expect is not None and job.state != expect):
+                return False
+            job.state = state
+            job.error = error
+        if job.finished:
+            self._journal("finish", job)
+        if job.finished and self.metrics is not None and job.metrics is not None:
+            try:
+                self.metrics.emit(job.metrics, state, error)
+            except Exception as e:
+                print("Error al registrar métricas:", e)
+        self._notify(job)
+        if job.finished and job.on_finish:
+            try:
+                job.on_finish(job)
+            except Exception as e:
+                print("Error en on_finish del trabajo:", e)
+        return True
+
+    def _worker(self):
+        while True:
+            priority, _, job = self._queue.get()
+            # Entradas obsoletas (cambio de prioridad) o trabajos ya cancelados
+            if job.state != QUEUED or -priority != job.priority:
+                continue
+            try:
+                self._run(job)
+            except Exception as e:
+                # Un error inesperado no debe dejar el trabajo colgado ni matar al hilo
+                print("Error inesperado en el trabajo:", e)
+                if not job.finished:
+                    self._set_state(job, FAILED, str(e))
+            with self._lock:
+                if self._workers > self._target_workers:
+                    self._workers -= 1
+                    return
+
+    def _archived(self, job: Job) -> bool:
+        if self.archive is None or job.force:
+            return False
+        if job.info is None:
+            return self.archive.has_url(job.url, job.mode, job.selected_format, job.target_folder)
+        return self.archive.has_info(job.info, job.mode, job.selected_format, job.target_folder)
+
+    def _run(self, job: Job):
+        stats = job.metrics = metrics.JobMetrics(job.id, job.url, job.mode)
+        # Comprobación sin red: el ID suele estar en la propia URL
+        if self._archived(job):
+            self._set_state(job, SKIPPED)
+            return
+        if not self._set_state(job, EXTRACTING, expect=QUEUED):
+            return  # se canceló mientras salía de la cola
+        try:
+            if job.info is None:
+                with stats.phase("extraction"):
+                    job.info, timings = downloader.get_video_info_timed(job.url, profile=f"extraction-{job.id}")
+                stats.add_auth("extraction", timings)
+            job.title = job.info.get("title") or job.title
+            if self._archived(job):
+                self._set_state(job, SKIPPED)
+                return
+            if job.format_spec is None:
+                # Se fija aquí para que una reanudación pida exactamente los mismos formatos
+                job.format_spec = downloader.build_format_spec(job.info, job.mode, job.selected_format)
+                self._journal("update", job, format_spec=job.format_spec, title=job.title)
+        except Exception as e:
+            self._set_state(job, FAILED, str(e))
+            return
+
+        def hook(d):
+            if job.cancel_event.is_set():
+                raise JobCancelled("Descarga cancelada")
+            stats.hook(d)
+            status = d.get("status")
+            if status == "downloading":
+                if job.state != DOWNLOADING:
+                    self._set_state(job, DOWNLOADING)
+                total = d.get("total_bytes") or d.get("total_bytes_estimate")
+                if total:
+                    job.progress = d.get("downloaded_bytes", 0) / total
+            elif status == "finished":
+                job.progress = 1.0
+                self._set_state(job, POSTPROCESSING)
+            self._journal("progress", job, d)
+            if job.on_progress:
+                try:
+                    job.on_progress(d)
+                except Exception as e:
+                    print("Error en on_progress del trabajo:", e)
+
+        if job.cancel_event.is_set():
+            self._set_state(job, CANCELLED)
+            return
+        self._set_state(job, DOWNLOADING)
+        job.lease = bandwidth.get_governor().lease(job.weight)
+        timings = {}
+        streamed = None
+        try:
+            with stats.phase("download"):
+                if job.mode == "mp3" and settings.load_settings().get("streaming_audio", True):
+                    # Descarga y conversión a la vez, si el formato lo permite
+                    try:
+                        streamed = downloader.stream_audio(
+                            job.url, job.target_folder, selected_format=job.format_spec, progress_callback=hook,
+                            info=job.info, throttle=job.lease, cancel_event=job.cancel_event, timings=timings,
+                            profile=f"download-{job.id}"
+                        )
+                    except postprocess.StreamUnsupported as e:
+                        stats.note("audio", f"dos pasadas: {e}")
+                success, error, result = streamed or downloader.download_file(
+                    job.url, job.mode, job.target_folder,
+                    selected_format=job.format_spec, progress_callback=hook, info=job.info,
+                    throttle=job.lease, timings=timings, profile=f"download-{job.id}"
+                )
+        finally:
+            job.lease.release()
+            job.lease = None
+        stats.add_auth("download", timings)
+        if job.cancel_event.is_set():
+            self._set_state(job, CANCELLED)
+        elif not success:
+            self._set_state(job, FAILED, error)
+        elif job.mode == "mp3" and streamed is None:
+            if job.state != POSTPROCESSING:
+                self._set_state(job, POSTPROCESSING)
+            pool = self.pool or postprocess.get_pool()
+            stats.start("postprocess")  # incluye la espera en la cola del pool
+            future = pool.submit(result["filepath"], result.get("acodec"), job.cancel_event)
+            future.add_done_callback(lambda f: self._postprocessed_safe(job, f))
+        else:
+            self._completed(job, result["filepath"])
+
+    def _postprocessed_safe(self, job: Job, future):
+        try:
+            self._postprocessed(job, future)
+        except Exception as e:
+            print("Error inesperado tras la conversión:", e)
+            if not job.finished:
+                self._set_state(job, FAILED, str(e))
+
+    def _postprocessed(self, job: Job, future):
+        """Final de la conversión (se llama desde el hilo del pool)."""
+        job.metrics.stop("postprocess")
+        if job.cancel_event.is_set():
+            self._set_state(job, CANCELLED)
+        elif future.exception() is not None:
+            self._set_state(job, FAILED, str(future.exception()))
+        else:
+            self._completed(job, future.result())
+
+    def _completed(self, job: Job, filepath: Optional[str]):
+        job.metrics.add_output(filepath)
+        if self.archive is not None:
+            try:
+                self.archive.add(job.info, job.mode, job.selected_format, filepath)
+            except Exception as e:
+                print("Error al registrar la descarga en el archivo:", e)
+        if self.library is not None and filepath:
+            try:
+                self.library.add_file(filepath, job.info.get("id"), job.info.get("duration"))
+            except Exception as e:
+                print("Error al añadir el archivo a la biblioteca:", e)
+        self._set_state(job, DONE)
+
+
+_scheduler = None
+
+
+def get_scheduler() -> Scheduler:
+    """Planificador compartido, con tantos trabajadores como indique la configuración."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = Scheduler(settings.load_settings().get("max_concurrent_downloads", 2),
+                               journal=journal.get_journal(), pool=postprocess.get_pool(),
+                               archive=archive.get_archive(), library=library.get_library(),
+                               metrics=metrics.get_recorder())
+    return _scheduler
@@ -0,0 +1,340 @@
+# app/segmented.py
+import http.client
+import json
+import os
+import ssl
+import threading
+import time
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+from . import settings
+
+CHUNK_SIZE = 256 * 1024
+MAX_REDIRECTS = 5
+# Cada cuánto se informa el progreso al llamador (segundos)
+PROGRESS_INTERVAL = 0.25
+
+
+class SegmentError(Exception):
+    pass
+
+
+class ConnectionPool:
+    """
+    Conexiones HTTP(S) persistentes reutilizables entre segmentos. Cada
+    conexión la usa un solo hilo a la vez; al terminar un segmento vuelve
+    al pool para el siguiente.
+    """
+
+    def __init__(self, timeout: float = 20):
+        self.timeout = timeout
+        self._idle: Dict[Tuple[str, str], List[http.client.HTTPConnection]] = {}
+        self._lock = threading.Lock()
+        self._context = ssl.create_default_context()
+
+    def acquire(self, scheme: str, netloc: str) -> http.client.HTTPConnection:
+        with self._lock:
+            idle = self._idle.get((scheme, netloc))
+            if idle:
+                return idle.pop()
+        if scheme == "https":
+            return http.client.HTTPSConnection(netloc, timeout=self.timeout, context=self._context)
+        return http.client.HTTPConnection(netloc, timeout=self.timeout)
+
+    def release(self, scheme: str, netloc: str, conn: http.client.HTTPConnection):
+        with self._lock:
+            self._idle.setdefault((scheme, netloc), []).append(conn)
+
+    def close(self):
+        with self._lock:
+            for conns in self._idle.values():
+                for conn in conns:
+                    conn.close()
+            self._idle.clear()
+
+
+class SegmentedDownloader:
+    """
+    Descarga un archivo por rangos de bytes en paralelo.
+
+    El archivo se divide en segmentos de `segment_size` bytes que atienden
+    `connections` hilos sobre conexiones persistentes; cada segmento se
+    escribe directamente en su posición del archivo, así que no hace falta
+    reensamblar. Un segmento que falla se reintenta desde el último byte
+    recibido hasta `retries` veces. Los segmentos completos se anotan junto
+    al archivo parcial, así una descarga interrumpida continúa por donde iba
+    (salvo que el archivo remoto haya cambiado de tamaño o de ETag).
+    """
+
+    def __init__(self, connections: int = 4, segment_size: int = 4 * 1024 * 1024,
+                 retries: int = 3, timeout: float = 20,
+                 throttle: Optional[Callable[[int], None]] = None):
+        self.connections = max(1, connections)
+        self.throttle = throttle  # se llama con el tamaño de cada bloque recibido (p. ej. Lease.consume)
+        self.segment_size = max(CHUNK_SIZE, segment_size)
+        self.retries = retries
+        self.pool = ConnectionPool(timeout)
+
+    @classmethod
+    def from_settings(cls) -> "SegmentedDownloader":
+        conf = settings.load_settings()
+        return cls(
+            connections=conf.get("segment_connections", 4),
+            segment_size=int(conf.get("segment_size_mb", 4) * 1024 * 1024),
+            retries=conf.get("segment_retries", 3),
+        )
+
+    # --- HTTP ---
+
+    def _request(self, url: str, headers: dict, start: int, end: int):
+        """GET con Range sobre una conexión del pool. Devuelve (conexión, respuesta)."""
+        parts = urlsplit(url)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        conn = self.pool.acquire(parts.scheme, parts.netloc)
+        try:
+            conn.request("GET", path, headers={**headers, "Range": f"bytes={start}-{end}"})
+            return conn, conn.getresponse()
+        except Exception:
+            conn.close()
+            raise
+
+    def _give_back(self, url: str, conn, resp):
+        if resp.isclosed() and not resp.will_close:
+            parts = urlsplit(url)
+            self.pool.release(parts.scheme, parts.netloc, conn)
+        else:
+            conn.close()
+
+    def probe(self, url: str, headers: dict) -> Tuple[str, Optional[int], Optional[str]]:
+        """
+        Sigue redirecciones y comprueba si el servidor acepta rangos.
+        Devuelve (url_final, tamaño, etag); el tamaño es None si no los acepta.
+        """
+        for _ in range(MAX_REDIRECTS):
+            conn, resp = self._request(url, headers, 0, 0)
+            if resp.status != 206:
+                # Sin leer el cuerpo: con un 200 sería el archivo entero
+                conn.close()
+                location = resp.getheader("Location")
+                if resp.status in (301, 302, 303, 307, 308) and location:
+                    url = urljoin(url, location)
+                    continue
+                return url, None, resp.getheader("ETag")
+            body = resp.read()
+            self._give_back(url, conn, resp)
+            etag = resp.getheader("ETag")
+            content_range = resp.getheader("Content-Range") or ""
+            if len(body) == 1 and "/" in content_range:
+                total = content_range.rsplit("/", 1)[1]
+                return url, int(total) if total.isdigit() else None, etag
+            return url, None, etag
+        raise SegmentError("Demasiadas redirecciones")
+
+    # --- Descarga ---
+
+    def _fetch_segment(self, url: str, headers: dict, path: str, start: int, end: int,
+                       stop: threading.Event, counter: list, lock: threading.Lock):
+        offset, attempt = start, 0
+        while offset <= end:
+            if stop.is_set():
+                return
+            conn = None
+            try:
+                conn, resp = self._request(url, headers, offset, end)
+                if resp.status != 206:
+                    raise SegmentError(f"Respuesta {resp.status} al pedir bytes {offset}-{end}")
+                with open(path, "r+b") as f:
+                    f.seek(offset)
+                    while offset <= end:
+                        if stop.is_set():
+                            conn.close()
+                            return
+                        chunk = resp.read(min(CHUNK_SIZE, end - offset + 1))
+                        if not chunk:
+                            raise SegmentError(f"Conexión cerrada en el byte {offset}")
+                        f.write(chunk)
+                        offset += len(chunk)
+                        with lock:
+                            counter[0] += len(chunk)
+                        if self.throttle:
+                            self.throttle(len(chunk))
+                self._give_back(url, conn, resp)
+            except (OSError, http.client.HTTPException, SegmentError):
+                if conn is not None:
+                    conn.close()
+                attempt += 1
+                if attempt > self.retries:
+                    raise
+                time.sleep(min(0.5 * 2 ** attempt, 5))
+
+    def fetch(self, url: str, dest: str, headers: Optional[dict] = None,
+              progress: Optional[Callable[[int, int], None]] = None) -> int:
+        """
+        Descarga `url` en `dest` y devuelve el número de bytes. `progress`
+        se llama desde el hilo que invoca fetch (así una excepción lanzada
+        en él, p. ej. una cancelación, detiene la descarga); la primera
+        llamada, antes de pedir nada, informa lo recuperado de una descarga
+        anterior.
+        """
+        headers = dict(headers or {})
+        url, size, etag = self.probe(url, headers)
+        part, state_path = dest + ".seg.part", dest + ".seg.json"
+        if not size:
+            state = self._read_state(state_path)
+            if state is not None and self._stale(state, None, etag):
+                self.discard(dest)
+            raise SegmentError("El servidor no acepta descargas por rangos")
+
+        done_starts = self._load_state(part, state_path, size, etag)
+        if not done_starts:
+            with open(part, "wb") as f:
+                f.truncate(size)
+        ranges = [(start, min(start + self.segment_size, size) - 1)
+                  for start in range(0, size, self.segment_size)]
+        stop = threading.Event()
+        counter, lock = [sum(end - start + 1 for start, end in ranges if start in done_starts)], threading.Lock()
+        todo = [(start, end) for start, end in ranges if start not in done_starts]
+        executor = ThreadPoolExecutor(max_workers=max(1, min(self.connections, len(todo))))
+        try:
+            if progress:
+                progress(counter[0], size)
+            futures = {executor.submit(self._fetch_segment, url, headers, part, start, end, stop, counter, lock): start
+                       for start, end in todo}
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, timeout=PROGRESS_INTERVAL, return_when=FIRST_EXCEPTION)
+                for future in done:
+                    future.result()
+                    done_starts.add(futures[future])
+                if done:
+                    self._save_state(state_path, size, etag, done_starts)
+                if progress:
+                    progress(counter[0], size)
+            os.replace(part, dest)
+            if os.path.exists(state_path):
+                os.remove(state_path)
+            return size
+        except BaseException:
+            # El .seg.part y su estado se conservan para reanudar más tarde
+            stop.set()
+            executor.shutdown(wait=True, cancel_futures=True)
+            raise
+        finally:
+            executor.shutdown(wait=False)
+
+    # --- Estado para reanudar ---
+
+    @staticmethod
+    def _read_state(state_path: str) -> Optional[dict]:
+        try:
+            with open(state_path, encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return state if isinstance(state, dict) else None
+
+    @staticmethod
+    def _stale(state: dict, size: Optional[int], etag: Optional[str]) -> bool:
+        """True si el archivo remoto cambió desde que se guardó el estado."""
+        if size is not None and state.get("size") != size:
+            return True
+        return bool(etag and state.get("etag") and state["etag"] != etag)
+
+    def _load_state(self, part: str, state_path: str, size: int, etag: Optional[str]) -> set:
+        """Segmentos ya completos de una descarga anterior del mismo archivo."""
+        state = self._read_state(state_path)
+        try:
+            if (state is not None and not self._stale(state, size, etag)
+                    and state.get("segment_size") == self.segment_size and os.path.getsize(part) == size):
+                return set(state.get("done", []))
+        except OSError:
+            pass
+        return set()
+
+    def _save_state(self, state_path: str, size: int, etag: Optional[str], done_starts: set):
+        tmp = state_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"size": size, "etag": etag, "segment_size": self.segment_size,
+                       "done": sorted(done_starts)}, f)
+        os.replace(tmp, state_path)
+
+    @staticmethod
+    def discard(dest: str):
+        """Borra una descarga por segmentos a medias de `dest`."""
+        for path in (dest + ".seg.part", dest + ".seg.json"):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def close(self):
+        self.pool.close()
+
+
+def _eligible(name: str, info: dict, min_size: int) -> bool:
+    """Solo formatos HTTP de un único archivo y lo bastante grandes."""
+    if name == "-" or info.get("requested_formats") or "\n" in (info.get("url") or ""):
+        return False
+    if info.get("protocol") not in ("http", "https"):
+        return False
+    size = info.get("filesize") or info.get("filesize_approx") or 0
+    return size >= min_size and not os.path.exists(name)
+
+
+def install(ydl, downloader: Optional[SegmentedDownloader] = None, min_size: Optional[int] = None):
+    """
+    Hace que `ydl` descargue por segmentos los formatos HTTP grandes.
+
+    Sustituye el método dl de esta instancia: los formatos que no cumplen
+    las condiciones, o cuyo servidor no acepta rangos, siguen por el
+    descargador normal de yt-dlp. Los hooks de progreso reciben los mismos
+    campos que con yt-dlp, y la fusión y el posprocesado no cambian.
+    """
+    if min_size is None:
+        min_size = int(settings.load_settings().get("segment_min_size_mb", 16) * 1024 * 1024)
+    downloader = downloader or SegmentedDownloader.from_settings()
+    original_dl = ydl.dl
+
+    def dl(name, info, subtitle=False, test=False):
+        if subtitle or test or not _eligible(name, info, min_size):
+            return original_dl(name, info, subtitle=subtitle, test=test)
+        headers = dict(info.get("http_headers") or {})
+        cookies = ydl.cookiejar.get_cookie_header(info["url"])
+        if cookies:
+            headers["Cookie"] = cookies
+        started = time.monotonic()
+        resumed = []  # bytes recuperados de una descarga anterior (primera llamada de fetch)
+
+        def hook(status, downloaded, total):
+            if not resumed:
+                resumed.append(downloaded)
+            elapsed = max(time.monotonic() - started, 1e-6)
+            # La velocidad solo cuenta lo recibido en esta sesión
+            speed = max(downloaded - resumed[0], 0) / elapsed
+            d = {
+                "status": status, "filename": name, "info_dict": info, "segmented": True,
+                "downloaded_bytes": downloaded, "total_bytes": total,
+                "elapsed": elapsed, "speed": speed,
+                "eta": (total - downloaded) / speed if speed else None,
+            }
+            for ph in ydl._progress_hooks:
+                ph(d)
+
+        try:
+            size = downloader.fetch(info["url"], name, headers,
+                                    lambda done, total: hook("downloading", done, total))
+        except (SegmentError, OSError, http.client.HTTPException) as e:
+            # El estado de reanudación se conserva (fetch ya borra el que no vale):
+            # si la descarga normal tampoco termina, la próxima vez se sigue por los segmentos
+            ydl.write_debug(f"Descarga por segmentos no disponible ({e}); se usa la normal")
+            result = original_dl(name, info, subtitle=subtitle, test=test)
+            if result and result[0]:
+                downloader.discard(name)
+            return result
+        hook("finished", size, size)
+        return True, True
+
+    ydl.dl = dl
+    return ydl
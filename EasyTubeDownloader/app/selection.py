@@ -0,0 +1,214 @@
+# app/selection.py
+"""
+Motor de selección de formatos.
+
+Recorre los formatos una sola vez, descarta los que no cumplen las
+restricciones del usuario (tamaño máximo, altura máxima, sin recodificar)
+y puntúa el resto según calidad, códec y contenedor preferidos. El
+resultado es una lista ordenada con los motivos de cada puntuación, que
+usan tanto el modo básico (MP3/MP4) como la columna "Recomendado".
+"""
+from typing import TYPE_CHECKING, List, Optional, Sequence
+
+from . import postprocess, settings
+
+if TYPE_CHECKING:
+    from .formats import FormatRecord
+
+# Códec de audio de cada objetivo (mp3 = se extrae audio, mp4 = video)
+TARGET_ACODEC = {"mp3": "mp3", "mp4": "mp4a"}
+# Contenedores que ffmpeg puede juntar en el destino sin recodificar
+TARGET_CONTAINERS = {"mp3": ("mp3",), "mp4": ("mp4", "m4a")}
+
+
+class NoFormatError(Exception):
+    """Ningún formato cumple las restricciones del usuario (el mensaje dice cuáles)."""
+
+
+class Constraints:
+    """Preferencias y límites del usuario para elegir un formato."""
+    __slots__ = ("target", "max_filesize", "max_height", "vcodecs", "acodecs",
+                 "containers", "no_reencode", "target_acodec")
+
+    def __init__(self, target: str = "mp4", max_filesize: int = 0, max_height: int = 0,
+                 vcodecs: Sequence[str] = ("avc1", "vp9", "av01"),
+                 acodecs: Sequence[str] = ("mp4a", "opus", "vorbis"),
+                 containers: Sequence[str] = ("mp4", "m4a", "webm"),
+                 no_reencode: bool = False, target_acodec: Optional[str] = None):
+        self.target = target
+        self.max_filesize = max_filesize      # bytes, 0 = sin límite
+        self.max_height = max_height          # píxeles, 0 = sin límite
+        self.vcodecs = tuple(vcodecs)
+        self.acodecs = tuple(acodecs)
+        self.containers = tuple(containers)
+        self.no_reencode = no_reencode
+        # Códec de audio que llega al destino sin recodificar
+        self.target_acodec = target_acodec or TARGET_ACODEC[target]
+
+    @classmethod
+    def from_settings(cls, target: str) -> "Constraints":
+        conf = settings.load_settings()
+        return cls(
+            target=target,
+            max_filesize=int(conf.get("max_filesize_mb", 0) * 1024 * 1024),
+            max_height=conf.get("max_height", 0),
+            vcodecs=conf.get("preferred_vcodecs", ("avc1", "vp9", "av01")),
+            acodecs=conf.get("preferred_acodecs", ("mp4a", "opus", "vorbis")),
+            containers=conf.get("preferred_containers", ("mp4", "m4a", "webm")),
+            no_reencode=conf.get("no_reencode", False),
+            target_acodec=(postprocess.AUDIO_CODECS[conf.get("audio_codec", "mp3")][0]
+                           if target == "mp3" else None),
+        )
+
+    @property
+    def limiting(self) -> bool:
+        """True si alguna restricción puede descartar formatos (las preferencias solo ordenan)."""
+        return bool(self.max_filesize or self.max_height or self.no_reencode)
+
+
+class Candidate:
+    """Un formato evaluado: su clave de orden, si se descartó y por qué."""
+    __slots__ = ("record", "key", "rejected", "reasons", "violations")
+
+    def __init__(self, record: "FormatRecord", key: tuple, rejected: bool, reasons: List[str],
+                 violations: Sequence[str] = ()):
+        self.record = record
+        self.key = key
+        self.rejected = rejected
+        self.reasons = reasons
+        self.violations = list(violations)  # restricciones que incumple
+
+    def __repr__(self):
+        return f"Candidate({self.record.format_id!r}, rejected={self.rejected}, {self.reasons})"
+
+
+def _preference(value: str, preferred: Sequence[str]) -> int:
+    """Cuanto antes aparece en la lista de preferencias, mayor el valor (0 si no aparece)."""
+    for index, name in enumerate(preferred):
+        if value.startswith(name):
+            return len(preferred) - index
+    return 0
+
+
+def evaluate(record: "FormatRecord", c: Constraints, kind: Optional[str] = None) -> Candidate:
+    """
+    Evalúa un formato. `kind` es "video" o "audio"; por defecto se deduce
+    del destino (mp3 = audio). Los formatos del tipo contrario no se puntúan.
+    """
+    reasons = []
+    violations = []
+    rejected = False
+    needs_video = (kind or ("audio" if c.target == "mp3" else "video")) == "video"
+
+    if needs_video and not record.is_video:
+        return Candidate(record, (), True, ["sin video"])
+    if not needs_video and not record.has_audio:
+        return Candidate(record, (), True, ["sin audio"])
+
+    if c.max_height and record.height > c.max_height:
+        rejected = True
+        reasons.append(f"{record.height}p supera el máximo de {c.max_height}p")
+        violations.append(f"altura máxima {c.max_height}p")
+    if c.max_filesize and record.filesize > c.max_filesize:
+        rejected = True
+        reasons.append(f"pesa más de {c.max_filesize // (1024 * 1024)} MB")
+        violations.append(f"tamaño máximo {c.max_filesize // (1024 * 1024)} MB")
+    elif not record.filesize:
+        reasons.append("tamaño desconocido")
+
+    # ¿Se puede llegar al destino copiando los flujos, sin recodificar?
+    if needs_video:
+        copyable = record.ext in TARGET_CONTAINERS[c.target]
+    else:
+        copyable = record.acodec.startswith(c.target_acodec)
+    if copyable:
+        reasons.append("no requiere recodificar")
+    elif c.no_reencode:
+        rejected = True
+        reasons.append("requiere recodificar")
+        violations.append(f"sin recodificar a {c.target}")
+
+    if needs_video:
+        codec = _preference(record.vcodec, c.vcodecs)
+        quality = (record.height, record.fps)
+        reasons.append(f"{record.height}p {record.vcodec}")
+    else:
+        codec = _preference(record.acodec, c.acodecs)
+        quality = (0 if record.is_video else 1, record.abr or record.tbr)
+        reasons.append(f"{record.acodec} {record.abr or record.tbr:.0f} kbps")
+    container = _preference(record.ext, c.containers)
+
+    # Orden: primero lo que cumple, luego lo que llega al destino sin
+    # recodificar, y después calidad, códec, contenedor y menor tamaño
+    key = (not rejected, copyable, quality, codec, container, -record.filesize)
+    return Candidate(record, key, rejected, reasons, violations)
+
+
+def rank(records: Sequence["FormatRecord"], constraints: Constraints,
+         kind: Optional[str] = None) -> List[Candidate]:
+    """Evalúa cada formato una vez y los devuelve del mejor al peor."""
+    candidates = [evaluate(r, constraints, kind) for r in records]
+    candidates = [c for c in candidates if c.key]
+    candidates.sort(key=lambda c: c.key, reverse=True)
+    return candidates
+
+
+def best(records: Sequence["FormatRecord"], constraints: Constraints,
+         kind: Optional[str] = None) -> Optional["FormatRecord"]:
+    """El mejor formato que cumple las restricciones, o None."""
+    for candidate in rank(records, constraints, kind):
+        if not candidate.rejected:
+            return candidate.record
+        break
+    return None
+
+
+def format_spec(records: Sequence["FormatRecord"], constraints: Constraints) -> Optional[str]:
+    """
+    Expresión de formato para yt-dlp según el motor. Para video sin audio
+    se combina con el mejor audio compatible con el contenedor destino.
+    Devuelve None si ningún formato cumple las restricciones (ver unmet).
+    """
+    chosen = best(records, constraints)
+    if chosen is None:
+        return None
+    if constraints.target == "mp3" or chosen.has_audio:
+        return chosen.format_id
+    audio_records = [r for r in records if not r.is_video]
+    audio_choice = best(audio_records, _audio_constraints(constraints, chosen), kind="audio")
+    if audio_choice is not None:
+        return f"{chosen.format_id}+{audio_choice.format_id}"
+    if constraints.limiting and rank(audio_records, constraints, kind="audio"):
+        return None  # hay audio, pero ninguno cumple: "bestaudio" se saltaría la restricción
+    return f"{chosen.format_id}+bestaudio/{chosen.format_id}"
+
+
+def _audio_constraints(constraints: Constraints, video: "FormatRecord") -> Constraints:
+    """Restricciones del audio que acompaña a `video`: debe caber en lo que queda del límite."""
+    return Constraints(
+        target=constraints.target, acodecs=constraints.acodecs,
+        containers=constraints.containers, no_reencode=constraints.no_reencode,
+        max_filesize=max(1, constraints.max_filesize - video.filesize) if constraints.max_filesize else 0,
+    )
+
+
+def unmet(records: Sequence["FormatRecord"], constraints: Constraints) -> str:
+    """Explica qué restricciones impiden elegir formato, para el mensaje de error."""
+    candidates = rank(records, constraints)
+    if not candidates:
+        return "No hay formatos de " + ("audio" if constraints.target == "mp3" else "video")
+    renamed = {}
+    if not candidates[0].rejected:
+        # El video cumple: lo que falla es el audio que debe acompañarlo
+        audio = _audio_constraints(constraints, candidates[0].record)
+        candidates = rank([r for r in records if not r.is_video], audio, kind="audio")
+        if not candidates:
+            return "No hay audio que combinar con el video"
+        if audio.max_filesize:
+            # El límite del audio es lo que deja el video: se muestra el del usuario
+            renamed[f"tamaño máximo {audio.max_filesize // (1024 * 1024)} MB"] = (
+                f"tamaño máximo {constraints.max_filesize // (1024 * 1024)} MB (video + audio)")
+    # Lo que incumplen todos los formatos, o si no lo que incumple cada uno
+    common = [v for v in candidates[0].violations if all(v in c.violations for c in candidates)]
+    names = common or sorted({v for c in candidates for v in c.violations})
+    return "Ningún formato cumple las restricciones: " + ", ".join(renamed.get(v, v) for v in names)
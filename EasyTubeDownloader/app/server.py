@@ -0,0 +1,401 @@
+# app/server.py
+"""
+Servidor de trabajos: recibe descargas por HTTP desde otros equipos de la red.
+
+    python -m app.server [--host 0.0.0.0] [--port 8765] [-j 4] [--token SECRETO]
+
+Endpoints (JSON salvo /events):
+    GET    /health              estado del servidor
+    POST   /jobs                {"url" | "urls", "mode", "format", "priority"}
+    GET    /jobs                todos los trabajos
+    GET    /jobs/<id>           un trabajo
+    DELETE /jobs/<id>           cancelarlo
+    GET    /events[?job=<id>]   progreso y cambios de estado (Server-Sent Events)
+
+Las descargas las hace el planificador (sus hilos son el límite de trabajo
+simultáneo); lo que bloquea dentro del servidor (listar una lista de
+reproducción, registrar en el diario) va a un pool acotado, así el bucle de
+asyncio responde aunque haya cientos de trabajos en cola.
+
+Por defecto solo escucha en 127.0.0.1. Para abrirlo a la red conviene
+fijar un token: los clientes lo envían como "Authorization: Bearer <token>".
+
+El servidor lleva su propio diario (<datos>/server-jobs.jsonl): al arrancar
+reanuda lo que quedó a medias y la ventana no ofrece reanudar sus trabajos.
+"""
+import argparse
+import asyncio
+import hmac
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Set
+from urllib.parse import parse_qs, urlsplit
+
+from . import settings
+
+MAX_BODY = 1024 * 1024
+PROGRESS_INTERVAL = 1.0   # segundos mínimos entre eventos de progreso de un mismo trabajo
+CLIENT_QUEUE = 1000       # eventos pendientes por cliente SSE antes de descartar los más viejos
+KEEPALIVE = 15.0          # comentario SSE para que los proxies no cierren la conexión
+COMPACT_EVERY = 50        # trabajos terminados entre dos compactaciones del diario
+
+REASONS = {200: "OK", 202: "Accepted", 400: "Bad Request", 401: "Unauthorized", 404: "Not Found",
+           405: "Method Not Allowed", 413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def job_dict(job) -> dict:
+    return {
+        "id": job.id, "url": job.url, "title": job.title, "mode": job.mode,
+        "format": job.selected_format, "state": job.state, "progress": round(job.progress, 4),
+        "error": job.error, "priority": job.priority, "weight": job.weight,
+    }
+
+
+class JobServer:
+    """Servidor HTTP sobre asyncio que encola trabajos en el planificador."""
+
+    def __init__(self, sched, output: str, host: str = "127.0.0.1", port: int = 8765,
+                 token: Optional[str] = None, workers: int = 4):
+        self.scheduler = sched
+        self.output = output
+        self.host = host
+        self.port = port
+        self.token = token or None
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="server")
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._clients: Set[tuple] = set()   # (cola, id de trabajo o None)
+        self._jobs = {}                     # trabajos enviados por este servidor
+        self._last_progress = {}
+        self._finished_since_compact = 0
+        sched.add_listener(self._on_state)
+
+    # --- Ciclo de vida ---
+
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        for queue, _ in list(self._clients):
+            queue.put_nowait(None)
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    # --- Eventos del planificador (llegan desde sus hilos) ---
+
+    def _publish(self, event: str, job, **extra):
+        if self.loop is None or job.id not in self._jobs:
+            return
+        data = {"event": event, "time": round(time.time(), 3), **job_dict(job), **extra}
+        self.loop.call_soon_threadsafe(self._broadcast, data)
+
+    def resume_pending(self) -> int:
+        """Vuelve a encolar los trabajos del diario que quedaron sin terminar."""
+        from . import scheduler
+
+        diary = self.scheduler.journal
+        if diary is None:
+            return 0
+        pending = diary.pending()  # también compacta el diario
+        for record in pending:
+            self.scheduler.submit(self._watch(scheduler.Job.from_journal(record)))
+        return len(pending)
+
+    def _on_state(self, job):
+        if job.finished and job.id in self._jobs:
+            self._last_progress.pop(job.id, None)
+            self._finished_since_compact += 1
+            # Sin compactar, el diario crecería con cada trabajo mientras el servidor siga en marcha
+            if self._finished_since_compact >= COMPACT_EVERY or not any(
+                    not j.finished for j in list(self._jobs.values())):
+                self._finished_since_compact = 0
+                self.executor.submit(self._compact_journal)
+        self._publish("state", job)
+
+    def _compact_journal(self):
+        try:
+            self.scheduler.journal.compact()
+        except Exception as e:
+            print("Error compactando el diario del servidor:", e)
+
+    def _on_progress(self, job, d: dict):
+        if d.get("status") != "downloading":
+            return
+        now = time.monotonic()
+        if now - self._last_progress.get(job.id, 0) < PROGRESS_INTERVAL:
+            return
+        self._last_progress[job.id] = now
+        self._publish("progress", job, downloaded=d.get("downloaded_bytes"),
+                      total=d.get("total_bytes") or d.get("total_bytes_estimate"),
+                      speed=d.get("speed"), eta=d.get("eta"))
+
+    def _broadcast(self, data: dict):
+        for queue, job_id in list(self._clients):
+            if job_id is not None and job_id != data["id"]:
+                continue
+            if queue.full():
+                queue.get_nowait()  # cliente lento: se pierde el evento más viejo
+            queue.put_nowait(data)
+
+    # --- HTTP ---
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            method, path, headers, body = await self._read_request(reader)
+            self._check_token(headers)
+            url = urlsplit(path)
+            query = parse_qs(url.query)
+            if url.path == "/events" and method == "GET":
+                await self._events(writer, query)
+                return
+            status, payload = await self._route(method, url.path, body)
+        except HttpError as e:
+            status, payload = e.status, {"error": str(e)}
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+            return
+        except Exception as e:
+            print("Error en el servidor de trabajos:", e)
+            status, payload = 500, {"error": str(e)}
+        await self._respond(writer, status, payload)
+
+    async def _read_request(self, reader: asyncio.StreamReader):
+        request_line = (await reader.readline()).decode("latin-1").strip()
+        if not request_line:
+            raise asyncio.IncompleteReadError(b"", None)
+        try:
+            method, path, _ = request_line.split(" ", 2)
+        except ValueError:
+            raise HttpError(400, "Petición mal formada")
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode("latin-1")
+            if line in ("\r\n", "\n", ""):
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get("content-length") or 0)
+        except ValueError:
+            raise HttpError(400, "Content-Length no válido")
+        if length < 0:
+            raise HttpError(400, "Content-Length no válido")
+        if length > MAX_BODY:
+            raise HttpError(413, "Cuerpo demasiado grande")
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), path, headers, body
+
+    def _check_token(self, headers: dict):
+        if not self.token:
+            return
+        given = headers.get("authorization", "").encode("utf-8")
+        if not hmac.compare_digest(given, f"Bearer {self.token}".encode("utf-8")):
+            raise HttpError(401, "Token incorrecto o ausente")
+
+    async def _respond(self, writer: asyncio.StreamWriter, status: int, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+            "Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: close\r\n\r\n".encode("latin-1") + body
+        )
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        writer.close()
+
+    async def _route(self, method: str, path: str, body: bytes):
+        parts = [p for p in path.split("/") if p]
+        if parts == ["health"] and method == "GET":
+            jobs = list(self._jobs.values())
+            return 200, {"status": "ok", "jobs": len(jobs), "active": sum(1 for j in jobs if not j.finished)}
+        if parts == ["jobs"]:
+            if method == "GET":
+                return 200, {"jobs": [job_dict(j) for j in self._jobs.values()]}
+            if method == "POST":
+                return 202, {"jobs": await self._submit(self._parse_json(body))}
+            raise HttpError(405, "Método no permitido")
+        if len(parts) == 2 and parts[0] == "jobs":
+            job = self._jobs.get(int(parts[1])) if parts[1].isdigit() else None
+            if job is None:
+                raise HttpError(404, "Trabajo no encontrado")
+            if method == "GET":
+                return 200, job_dict(job)
+            if method == "DELETE":
+                self.scheduler.cancel(job.id)
+                return 202, job_dict(job)
+            raise HttpError(405, "Método no permitido")
+        raise HttpError(404, "Ruta no encontrada")
+
+    @staticmethod
+    def _parse_json(body: bytes) -> dict:
+        try:
+            data = json.loads(body or b"{}")
+        except ValueError:
+            raise HttpError(400, "El cuerpo no es JSON válido")
+        if not isinstance(data, dict):
+            raise HttpError(400, "Se esperaba un objeto JSON")
+        return data
+
+    async def _submit(self, data: dict) -> list:
+        from . import downloader, utils
+
+        if "urls" in data:
+            urls = data["urls"]
+            if not isinstance(urls, list) or not all(isinstance(u, str) for u in urls):
+                raise HttpError(400, "'urls' debe ser una lista de enlaces (texto)")
+        elif "url" in data:
+            if not isinstance(data["url"], str):
+                raise HttpError(400, "'url' debe ser un enlace (texto)")
+            urls = [data["url"]]
+        else:
+            urls = []
+        urls = [u.strip() for u in urls if u.strip()]
+        if not urls:
+            raise HttpError(400, "Falta 'url' o 'urls'")
+        fmt = data.get("format")
+        if fmt is not None and not isinstance(fmt, str):
+            raise HttpError(400, "'format' debe ser un texto (ID o expresión de formato de yt-dlp)")
+        mode = data.get("mode") or settings.load_settings().get("default_format", "mp3")
+        if mode not in ("mp3", "mp4"):
+            raise HttpError(400, "'mode' debe ser 'mp3' o 'mp4'")
+        bad = [u for u in urls if not utils.is_youtube_url(u)]
+        if bad:
+            raise HttpError(400, f"No son enlaces de YouTube: {', '.join(bad)}")
+        try:
+            priority = int(data.get("priority") or 0)
+        except (TypeError, ValueError):
+            raise HttpError(400, "'priority' debe ser un entero")
+
+        expanded = []
+        for url in urls:
+            if utils.is_playlist_url(url):
+                # Listar la lista es una petición a YouTube: fuera del bucle
+                try:
+                    _, entries = await self.loop.run_in_executor(self.executor, downloader.list_entries, url)
+                except Exception as e:
+                    raise HttpError(400, f"No se pudo leer la lista: {e}")
+                expanded += [entry["url"] for entry in entries]
+            else:
+                expanded.append(url)
+        jobs = [self._make_job(url, mode, fmt or None, priority) for url in expanded]
+        # submit registra en el diario (fsync): también fuera del bucle
+        await self.loop.run_in_executor(self.executor, lambda: [self.scheduler.submit(j) for j in jobs])
+        return [job_dict(j) for j in jobs]
+
+    def _make_job(self, url: str, mode: str, fmt: Optional[str], priority: int):
+        from . import scheduler
+
+        return self._watch(scheduler.Job(url, mode, self.output, selected_format=fmt, priority=priority))
+
+    def _watch(self, job):
+        job.on_progress = lambda d, job=job: self._on_progress(job, d)
+        self._jobs[job.id] = job
+        return job
+
+    async def _events(self, writer: asyncio.StreamWriter, query: dict):
+        job_id = query.get("job", [None])[0]
+        job_id = int(job_id) if job_id and job_id.isdigit() else None
+        queue = asyncio.Queue(maxsize=CLIENT_QUEUE)
+        client = (queue, job_id)
+        self._clients.add(client)
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+            b"Cache-Control: no-cache\r\nConnection: keep-alive\r\n\r\n"
+        )
+        # Estado actual de entrada, así el cliente no depende de cuándo se conectó
+        for job in self._jobs.values():
+            if job_id is None or job.id == job_id:
+                self._write_event(writer, {"event": "state", "time": round(time.time(), 3), **job_dict(job)})
+        try:
+            await writer.drain()
+            while True:
+                try:
+                    data = await asyncio.wait_for(queue.get(), KEEPALIVE)
+                except asyncio.TimeoutError:
+                    writer.write(b": keepalive\n\n")
+                    await writer.drain()
+                    continue
+                if data is None:
+                    break
+                self._write_event(writer, data)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self._clients.discard(client)
+            writer.close()
+
+    @staticmethod
+    def _write_event(writer: asyncio.StreamWriter, data: dict):
+        writer.write(f"event: {data['event']}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8"))
+
+
+def parse_args(argv=None):
+    conf = settings.load_settings()
+    parser = argparse.ArgumentParser(prog="python -m app.server", description="Servidor de trabajos de EasyTube.")
+    parser.add_argument("--host", default=conf.get("server_host", "127.0.0.1"),
+                        help="Dirección en la que escuchar (0.0.0.0 para toda la red).")
+    parser.add_argument("--port", type=int, default=conf.get("server_port", 8765))
+    parser.add_argument("-j", "--concurrency", type=int, default=conf.get("max_concurrent_downloads", 2),
+                        help="Descargas simultáneas.")
+    parser.add_argument("-o", "--output", help="Carpeta de destino (por defecto la de la configuración).")
+    parser.add_argument("--token", default=conf.get("server_token") or None,
+                        help="Token que deben enviar los clientes (Authorization: Bearer ...).")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    from . import archive, journal, library, metrics, postprocess, scheduler
+
+    diary = None
+    if settings.load_settings().get("job_journal", True):
+        diary = journal.JobJournal(settings.get_data_dir() / "server-jobs.jsonl")
+    sched = scheduler.Scheduler(args.concurrency, journal=diary, pool=postprocess.get_pool(),
+                                archive=archive.get_archive(), library=library.get_library(),
+                                metrics=metrics.get_recorder())
+    server = JobServer(sched, args.output or settings.get_download_path(), args.host, args.port, args.token)
+    resumed = server.resume_pending()
+    if resumed:
+        print(f"Reanudando {resumed} trabajos pendientes", file=sys.stderr)
+
+    async def run():
+        await server.start()
+        print(f"Servidor de trabajos en http://{args.host}:{server.port}", file=sys.stderr)
+        if args.host not in ("127.0.0.1", "localhost") and not args.token:
+            print("Aviso: el servidor está abierto a la red sin token.", file=sys.stderr)
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await server.stop()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
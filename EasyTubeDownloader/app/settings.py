@@ -6,10 +6,63 @@ from pathlib import Path
 DEFAULTS = {
     "download_path": "",        # si está vacío usamos la carpeta Descargas del sistema
     "default_format": "mp3",    # 'mp3' o 'mp4'
-    "last_mode": "basic"        # 'basic' o 'advanced'
+    "last_mode": "basic",       # 'basic' o 'advanced'
+    "cache_ttl": 3600,          # segundos que una entrada de metadatos se considera válida
+    "cache_memory_entries": 64, # máximo de videos en la caché en memoria
+    "cache_disk_entries": 1000, # máximo de videos en la caché en disco
+    "hedged_extraction": True,  # probar estrategias de cookies en paralelo escalonado
+    "hedge_delay": 4.0,         # segundos mínimos antes de lanzar la siguiente estrategia
+    "max_concurrent_downloads": 2, # descargas simultáneas en la cola
+    "playlist_workers": 4,      # extracciones simultáneas al resolver listas
+    "ydl_pool": True,           # reutilizar instancias de yt-dlp (conexiones y extractores)
+    "ydl_pool_size": 4,         # instancias paradas por juego de opciones
+    "ydl_pool_max_uses": 50,    # usos antes de sustituir una instancia
+    "ydl_pool_idle_timeout": 300, # segundos parada antes de cerrarla
+    # Restricciones del motor de selección de formatos (0 = sin límite)
+    "max_height": 0,            # altura máxima del video en píxeles
+    "max_filesize_mb": 0,       # tamaño máximo por formato en MB
+    "preferred_vcodecs": ["avc1", "vp9", "av01"],
+    "preferred_acodecs": ["mp4a", "opus", "vorbis"],
+    "preferred_containers": ["mp4", "m4a", "webm"],
+    "no_reencode": False,       # descartar formatos que habría que recodificar
+    # Descarga por segmentos (rangos HTTP en paralelo)
+    "segmented_download": True,
+    "segment_connections": 4,   # conexiones simultáneas por archivo
+    "segment_size_mb": 4,       # tamaño de cada rango
+    "segment_min_size_mb": 16,  # archivos más pequeños van por una sola conexión
+    "segment_retries": 3,       # reintentos por segmento
+    "fragment_concurrency": 4,  # fragmentos simultáneos en DASH/HLS
+    "job_journal": True,        # registrar los trabajos para reanudarlos tras un cierre
+    "download_archive": True,   # no repetir lo ya descargado (mismo video, modo y formato)
+    "library_index": True,      # indexar lo que ya hay en la carpeta de descargas
+    "library_probe": True,      # leer ID y duración con ffprobe (solo archivos nuevos)
+    "metrics_log": True,        # tiempos de cada trabajo en <datos>/metrics.jsonl
+    "metrics_prometheus": "",   # ruta de un textfile de Prometheus ("" = no escribirlo)
+    "profile_downloads": False, # perfilar con cProfile extracción y descarga
+    "prefetch": True,           # extraer el enlace en cuanto se pega, antes de pulsar el botón
+    "prefetch_delay": 0.6,      # segundos sin cambios en el texto antes de empezar
+    "thumbnails": True,         # miniaturas en el modo avanzado (necesita Pillow)
+    "thumbnail_workers": 4,     # descargas/decodificaciones simultáneas
+    "thumbnail_memory_entries": 256,
+    "thumbnail_disk_entries": 5000,
+    # Ancho de banda total para todas las descargas, en KB/s (0 = sin límite)
+    "bandwidth_limit_kb": 0,
+    # Franjas horarias con otro límite, p. ej.
+    # [{"start": "09:00", "end": "18:00", "limit_kb": 512}]
+    "bandwidth_schedule": [],
+    # Conversión de audio del modo MP3 (en streaming o en el pool de posproceso)
+    "audio_codec": "mp3",       # mp3, m4a, opus, vorbis o flac
+    "audio_quality": "192",     # kbps, o de 0 a 10 para calidad VBR
+    "streaming_audio": True,    # convertir mientras se descarga cuando el formato lo permite
+    "postprocess_workers": 0,   # conversiones simultáneas (0 = una por núcleo)
+    # Servidor de trabajos (python -m app.server)
+    "server_host": "127.0.0.1", # 0.0.0.0 para aceptar trabajos de toda la red
+    "server_port": 8765,
+    "server_token": ""          # si no está vacío, los clientes deben enviarlo
 }
 
 CONFIG_FILE = Path.home() / ".easytube_settings.json"
+DATA_DIR = Path.home() / ".easytube"
 
 def load_settings():
     if CONFIG_FILE.exists():
@@ -32,6 +85,11 @@ def save_settings(settings: dict):
     except Exception as e:
         print("Error saving settings:", e)
 
+def get_data_dir() -> Path:
+    """Carpeta para cachés e índices de la aplicación (se crea si no existe)."""
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
+    return DATA_DIR
+
 def get_download_path():
     settings = load_settings()
     path = settings.get("download_path") or ""
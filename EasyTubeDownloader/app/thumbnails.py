@@ -0,0 +1,206 @@
+# app/thumbnails.py
+import hashlib
+import io
+import os
+import threading
+import urllib.request
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from . import settings, utils
+
+# Vista previa del video detectado y miniatura de cada fila de una lista
+PREVIEW_SIZE = (192, 108)
+ROW_SIZE = (64, 36)
+FETCH_TIMEOUT = 10
+JPEG_QUALITY = 85
+PRUNE_SLACK = 0.1  # margen sobre disk_entries antes de volver a limpiar el disco
+
+Size = Tuple[int, int]
+
+
+def available() -> bool:
+    """True si Pillow está instalado (sin él no hay miniaturas)."""
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def thumbnail_url(info: dict, width: int = 0) -> Optional[str]:
+    """
+    URL de la miniatura más pequeña que llegue a `width` px de ancho. Las
+    entradas de una lista rápida no traen miniaturas: se usa la de i.ytimg.com.
+    """
+    candidates = [t for t in info.get("thumbnails") or [] if t.get("url") and t.get("width")]
+    wide = sorted((t for t in candidates if t["width"] >= width), key=lambda t: t["width"])
+    if wide:
+        return wide[0]["url"]
+    if info.get("thumbnail"):
+        return info["thumbnail"]
+    video_id = info.get("id") or utils.extract_video_id(info.get("url") or "")
+    return f"https://i.ytimg.com/vi/{video_id}/mqdefault.jpg" if video_id else None
+
+
+class ThumbnailPipeline:
+    """
+    Miniaturas descargadas, decodificadas y reducidas fuera del hilo de Tk.
+
+    - Memoria: LRU acotado de imágenes ya reducidas (PIL.Image).
+    - Disco: un JPEG por URL y tamaño en <datos>/thumbnails, acotado por
+      número de archivos (se borran los menos usados). Se limpia al
+      arrancar y cada vez que las escrituras superan el límite con un
+      margen (PRUNE_SLACK), para no recorrer la carpeta en cada miniatura.
+    - Una misma miniatura pedida varias veces mientras se descarga se
+      descarga una sola vez; todos los que la pidieron reciben el resultado.
+
+    El callback recibe la imagen (o None si falló) desde un hilo del pool:
+    la interfaz debe pasarla a su hilo (ProgressBus.post) y crear allí el
+    PhotoImage, que es lo único que queda por hacer.
+    """
+
+    def __init__(self, folder, memory_entries: int = 256, disk_entries: int = 5000, workers: int = 4):
+        self.folder = str(folder)
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        os.makedirs(self.folder, exist_ok=True)
+        self._memory = OrderedDict()
+        self._pending: Dict[str, List[Callable]] = {}
+        self._disk_count: Optional[int] = None  # se conoce tras la primera limpieza
+        self._pruning = True
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="thumbnails")
+        self._executor.submit(self._prune)
+
+    @classmethod
+    def from_settings(cls) -> "ThumbnailPipeline":
+        conf = settings.load_settings()
+        return cls(
+            settings.get_data_dir() / "thumbnails",
+            memory_entries=conf.get("thumbnail_memory_entries", 256),
+            disk_entries=conf.get("thumbnail_disk_entries", 5000),
+            workers=conf.get("thumbnail_workers", 4),
+        )
+
+    def get(self, url: Optional[str], size: Size, callback: Callable) -> bool:
+        """
+        Pide la miniatura de `url` reducida a `size`. Si ya está en memoria,
+        el callback se llama enseguida en este hilo y devuelve True.
+        """
+        if not url:
+            callback(None)
+            return True
+        key = self._key(url, size)
+        with self._lock:
+            image = self._memory.get(key)
+            if image is not None:
+                self._memory.move_to_end(key)
+            elif key in self._pending:
+                self._pending[key].append(callback)
+                return False
+            else:
+                self._pending[key] = [callback]
+        if image is not None:
+            callback(image)
+            return True
+        self._executor.submit(self._load, key, url, size)
+        return False
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    # --- Internos ---
+
+    @staticmethod
+    def _key(url: str, size: Size) -> str:
+        return f"{hashlib.sha1(url.encode('utf-8')).hexdigest()}_{size[0]}x{size[1]}"
+
+    def _load(self, key: str, url: str, size: Size):
+        image = None
+        try:
+            image = self._from_disk(key) or self._fetch(key, url, size)
+        except Exception as e:
+            print("Error cargando miniatura:", e)
+        with self._lock:
+            callbacks = self._pending.pop(key, [])
+            if image is not None:
+                self._memory[key] = image
+                while len(self._memory) > self.memory_entries:
+                    self._memory.popitem(last=False)
+        for callback in callbacks:
+            try:
+                callback(image)
+            except Exception as e:
+                print("Error en callback de miniatura:", e)
+
+    def _from_disk(self, key: str):
+        from PIL import Image
+        path = os.path.join(self.folder, key + ".jpg")
+        if not os.path.exists(path):
+            return None
+        with Image.open(path) as img:
+            img.load()
+            image = img.copy()
+        os.utime(path)  # la limpieza borra primero las que no se usan
+        return image
+
+    def _fetch(self, key: str, url: str, size: Size):
+        from PIL import Image, ImageOps
+        from .downloader import HTTP_HEADERS
+        request = urllib.request.Request(url, headers=HTTP_HEADERS)
+        with urllib.request.urlopen(request, timeout=FETCH_TIMEOUT) as resp:
+            data = resp.read()
+        with Image.open(io.BytesIO(data)) as img:
+            # En JPEG, draft() decodifica directamente a una escala reducida
+            img.draft("RGB", (size[0] * 2, size[1] * 2))
+            thumb = ImageOps.fit(img.convert("RGB"), size, Image.LANCZOS)
+        path = os.path.join(self.folder, key + ".jpg")
+        tmp = path + ".tmp"
+        thumb.save(tmp, "JPEG", quality=JPEG_QUALITY)
+        exists = os.path.exists(path)
+        os.replace(tmp, path)
+        if not exists:
+            self._wrote()
+        return thumb
+
+    def _wrote(self):
+        with self._lock:
+            if self._disk_count is None:
+                return
+            self._disk_count += 1
+            limit = self.disk_entries + max(1, int(self.disk_entries * PRUNE_SLACK))
+            if self._pruning or self._disk_count <= limit:
+                return
+            self._pruning = True
+        self._executor.submit(self._prune)
+
+    def _prune(self):
+        """Deja en disco como mucho `disk_entries` miniaturas (las usadas más recientemente)."""
+        count = None
+        try:
+            files = [e for e in os.scandir(self.folder) if e.name.endswith(".jpg")]
+            count = len(files)
+            if count > self.disk_entries:
+                files.sort(key=lambda e: e.stat().st_mtime)
+                for entry in files[:count - self.disk_entries]:
+                    os.remove(entry.path)
+                    count -= 1
+        except OSError as e:
+            print("Error limpiando miniaturas:", e)
+        with self._lock:
+            if count is not None:
+                self._disk_count = count
+            self._pruning = False
+
+
+_pipeline: Optional[ThumbnailPipeline] = None
+
+
+def get_pipeline() -> Optional[ThumbnailPipeline]:
+    """Pipeline compartido, o None si está desactivado o falta Pillow."""
+    global _pipeline
+    if _pipeline is None and settings.load_settings().get("thumbnails", True) and available():
+        _pipeline = ThumbnailPipeline.from_settings()
+    return _pipeline
@@ -1,7 +1,7 @@
 import customtkinter as ctk
 from tkinter import filedialog, messagebox, ttk
 import threading
-from . import downloader, settings, utils
+from . import downloader, formats, prefetch, progress, scheduler, settings, thumbnails, utils
 
 class AdvancedWindow(ctk.CTkToplevel):
     def __init__(self, parent=None):
@@ -14,25 +14,41 @@ class AdvancedWindow(ctk.CTkToplevel):
         # Variables
         self.url_var = ctk.StringVar()
         self.download_folder = settings.load_settings().get("last_download_path", settings.get_download_path())
-        self.formats_video = []
-        self.formats_audio = []
-        self.filtered_video = []
-        self.filtered_audio = []
+        self.table_video = formats.FormatTable("video", [])
+        self.table_audio = formats.FormatTable("audio", [])
         self.selected_format_id = None
+        self.video_info = None
+        self.playlist_entries = []
+        self.playlist_infos = {}
+        self.playlist_failed = set()  # índices cuya extracción falló
+        self.playlist_cancel = threading.Event()
+        self.thumbs = thumbnails.get_pipeline()
+        self.row_images = {}        # iid -> PhotoImage (Tk no guarda la referencia)
+        self.row_requested = set()  # filas cuya miniatura ya se pidió
+        self._thumbs_scheduled = False
 
         # --- Entrada de enlace ---
         ctk.CTkLabel(self, text="Enlace de YouTube:").pack(anchor="w", padx=12, pady=(12, 4))
         entry = ctk.CTkEntry(self, textvariable=self.url_var, width=640)
         entry.pack(padx=12, pady=(0, 8))
+        # Extracción anticipada: al pulsar "Detectar formatos" ya suele estar en la caché
+        prefetcher = prefetch.get_prefetcher()
+        if prefetcher is not None:
+            self.url_var.trace_add("write", lambda *_: prefetcher.schedule(self.url_var.get()))
 
         btn_frame = ctk.CTkFrame(self)
         btn_frame.pack(fill="x", padx=12, pady=(0, 8))
         ctk.CTkButton(btn_frame, text="Detectar formatos", command=self.on_detect).grid(row=0, column=0, padx=6, pady=6)
         ctk.CTkButton(btn_frame, text="Cambiar carpeta destino", command=self.change_folder).grid(row=0, column=1, padx=6, pady=6)
+        ctk.CTkButton(btn_frame, text="Recargar (sin caché)", command=lambda: self.on_detect(refresh=True)).grid(row=0, column=2, padx=6, pady=6)
 
         self.label_folder = ctk.CTkLabel(self, text=f"Destino: {self.download_folder}", anchor="w")
         self.label_folder.pack(fill="x", padx=12, pady=(0, 6))
 
+        # --- Vista previa del video detectado ---
+        self.label_preview = ctk.CTkLabel(self, text="", anchor="w", compound="left", padx=8)
+        self.label_preview.pack(fill="x", padx=12, pady=(0, 6))
+
         # --- Tabs (Video / Audio) ---
         self.tabview = ctk.CTkTabview(self, width=880, height=460)
         self.tabview.pack(padx=12, pady=10, fill="both", expand=True)
@@ -54,6 +70,10 @@ class AdvancedWindow(ctk.CTkToplevel):
         self.tree_audio = self._create_tree(self.tab_audio)
         self.tree_audio.bind("<<TreeviewSelect>>", self.on_select_format_audio)
 
+        # TAB LISTA / CANAL
+        self.tab_playlist = self.tabview.add("Lista / Canal")
+        self._create_playlist_section(self.tab_playlist)
+
         # --- Parte inferior ---  
         frame_bottom = ctk.CTkFrame(self)
         frame_bottom.pack(fill="x", padx=12, pady=(6, 12))
@@ -67,6 +87,10 @@ class AdvancedWindow(ctk.CTkToplevel):
         )
         self.btn_download.pack(side="left", padx=6, pady=4)
 
+        # Ignorar el archivo de descargas en esta ventana (formato y lista)
+        self.force_var = ctk.BooleanVar(value=False)
+        ctk.CTkCheckBox(frame_bottom, text="Descargar de nuevo", variable=self.force_var).pack(side="left", padx=6, pady=4)
+
         # Etiqueta de estado
         self.label_status = ctk.CTkLabel(frame_bottom, text="Listo", width=200)
         self.label_status.pack(side="right", padx=6, pady=4)
@@ -82,6 +106,10 @@ class AdvancedWindow(ctk.CTkToplevel):
         self.progress_bar.set(0)
         self.progress_bar.pack(fill="x", padx=6, pady=(4, 0))
 
+        # Los hilos de trabajo nunca tocan widgets: publican en el bus
+        self.bus = progress.ProgressBus()
+        self.pump = progress.ProgressPump(self, self.bus, self.render_progress)
+
     # ---------------------------
     # Construcción de interfaz
     # ---------------------------
@@ -98,7 +126,7 @@ class AdvancedWindow(ctk.CTkToplevel):
 
         tree = ttk.Treeview(
             container,
-            columns=("ID", "Tipo", "Resolución", "Códecs", "Tamaño", "Recomendado"),
+            columns=formats.COLUMNS,
             show="headings"
         )
         vsb = ttk.Scrollbar(container, orient="vertical", command=tree.yview)
@@ -106,12 +134,45 @@ class AdvancedWindow(ctk.CTkToplevel):
         vsb.pack(side="right", fill="y")
         tree.pack(fill="both", expand=True)
 
-        for col in ("ID", "Tipo", "Resolución", "Códecs", "Tamaño", "Recomendado"):
+        for col in formats.COLUMNS:
             tree.heading(col, text=col, command=lambda c=col, t=tree: self.sort_by(t, c, False))
             tree.column(col, width=130, anchor="center")
 
         return tree
 
+    def _create_playlist_section(self, parent):
+        frame = ctk.CTkFrame(parent)
+        frame.pack(fill="x", padx=12, pady=(4, 0))
+        ctk.CTkLabel(frame, text="Descargar como:").pack(side="left", padx=(6, 4))
+        self.playlist_mode_var = ctk.StringVar(value="mp4")
+        ctk.CTkOptionMenu(frame, values=["mp4", "mp3"], variable=self.playlist_mode_var).pack(side="left", padx=(0, 6))
+        ctk.CTkButton(frame, text="Seleccionar todo", command=self.select_all_entries).pack(side="left", padx=6)
+        ctk.CTkButton(frame, text="Descargar seleccionados", command=self.on_download_entries).pack(side="left", padx=6)
+
+        container = ctk.CTkFrame(parent)
+        container.pack(fill="both", expand=True, padx=6, pady=6)
+        columns = ("#", "Título", "Duración", "Mejor calidad", "Estado")
+        # La columna del árbol (#0) lleva la miniatura de cada entrada
+        show = "tree headings" if self.thumbs is not None else "headings"
+        if self.thumbs is not None:
+            ttk.Style(self).configure("Thumbs.Treeview", rowheight=thumbnails.ROW_SIZE[1] + 4)
+        self.tree_playlist = ttk.Treeview(container, columns=columns, show=show, selectmode="extended",
+                                          style="Thumbs.Treeview" if self.thumbs is not None else "Treeview")
+        self.tree_playlist.column("#0", width=thumbnails.ROW_SIZE[0] + 16, stretch=False)
+        vsb = ttk.Scrollbar(container, orient="vertical", command=self.tree_playlist.yview)
+
+        def on_scroll(first, last):
+            vsb.set(first, last)
+            self.schedule_row_thumbnails()
+
+        self.tree_playlist.configure(yscrollcommand=on_scroll)
+        vsb.pack(side="right", fill="y")
+        self.tree_playlist.pack(fill="both", expand=True)
+        for col, width in zip(columns, (50, 420, 90, 110, 110)):
+            self.tree_playlist.heading(col, text=col)
+            self.tree_playlist.column(col, width=width, anchor="w" if col == "Título" else "center")
+        self.tree_playlist.bind("<<TreeviewSelect>>", self.on_select_entry)
+
     # ---------------------------
     # Funciones principales
     # ---------------------------
@@ -125,23 +186,7 @@ class AdvancedWindow(ctk.CTkToplevel):
             s["last_download_path"] = folder
             settings.save_settings(s)
 
-    def get_recommendation(self, res, size):
-        try:
-            if "x" in res:
-                w, h = map(int, res.split("x"))
-            else:
-                h = 0
-            mb = utils.size_to_mb(size)
-            if h >= 1080 and mb <= 150:
-                return "Alta"
-            elif h >= 720 and mb <= 100:
-                return "Media"
-            else:
-                return "Baja"
-        except:
-            return "Baja"
-
-    def on_detect(self):
+    def on_detect(self, refresh=False):
         url = self.url_var.get().strip()
         if not url or not utils.is_youtube_url(url):
             messagebox.showerror("Error", "Pega un enlace de YouTube válido.")
@@ -150,70 +195,227 @@ class AdvancedWindow(ctk.CTkToplevel):
         self.label_status.configure(text="Obteniendo formatos...")
 
         for tree in (self.tree_video, self.tree_audio):
-            for item in tree.get_children():
-                tree.delete(item)
+            tree.delete(*tree.get_children())
+
+        if utils.is_playlist_url(url):
+            self.detect_playlist(url, refresh)
+            return
 
         def worker():
             try:
-                all_formats = downloader.get_formats(url)
-                self.formats_video = [f for f in all_formats if f["vcodec"] != "none"]
-                self.formats_audio = [f for f in all_formats if f["vcodec"] == "none"]
-                self.filtered_video = self.formats_video.copy()
-                self.filtered_audio = self.formats_audio.copy()
-                self.refresh_trees()
-                total = len(self.formats_video) + len(self.formats_audio)
-                self.label_status.configure(text=f"Formatos detectados: {total}")
+                info = downloader.get_video_info(url, refresh=refresh)
+                # Las filas se calculan aquí, fuera del hilo de la interfaz
+                tables = formats.build_tables(downloader.formats_from_info(info))
             except Exception as e:
-                messagebox.showerror("Error", f"No se pudo obtener formatos:\n{e}")
-                self.label_status.configure(text="Error")
+                self.bus.post(self.show_error, f"No se pudo obtener formatos:\n{e}")
+                return
+            self.bus.post(self.on_detected, info, tables)
 
         threading.Thread(target=worker, daemon=True).start()
 
+    def on_detected(self, info, tables):
+        self.show_formats(info, tables)
+        total = len(self.table_video) + len(self.table_audio)
+        self.label_status.configure(text=f"Formatos detectados: {total}")
+
+    def show_error(self, message):
+        messagebox.showerror("Error", message)
+        self.label_status.configure(text="Error")
+
+    def show_formats(self, info, tables=None):
+        """Carga en las pestañas de video y audio los formatos de un video ya extraído."""
+        if tables is None:
+            tables = formats.build_tables(downloader.formats_from_info(info))
+        self.video_info = info
+        self.selected_format_id = None
+        self.show_preview(info)
+        self.table_video, self.table_audio = tables
+        self.table_video.filter = self.filter_var_video.get()
+        self.table_audio.filter = self.filter_var_audio.get()
+        self.refresh_trees()
+
+    def detect_playlist(self, url, refresh=False):
+        """
+        Lista rápida de la lista/canal y resolución de cada entrada en
+        paralelo; las filas se completan a medida que llegan los resultados.
+        """
+        self.playlist_cancel.set()
+        self.playlist_cancel = cancel = threading.Event()
+        self.playlist_entries = []
+        self.playlist_infos = {}
+        self.playlist_failed = set()
+        self.row_images = {}
+        self.row_requested = set()
+        for item in self.tree_playlist.get_children():
+            self.tree_playlist.delete(item)
+        self.tabview.set("Lista / Canal")
+
+        def worker():
+            try:
+                playlist, entries = downloader.list_entries(url)
+            except Exception as e:
+                self.bus.post(self.show_error, f"No se pudo leer la lista:\n{e}")
+                return
+            if cancel.is_set():
+                return
+            self.bus.post(self.show_entries, playlist, entries, cancel)
+            if refresh:
+                for entry in entries:
+                    downloader.invalidate_cache(entry["url"])
+            workers = settings.load_settings().get("playlist_workers", 4)
+            downloader.resolve_entries(
+                entries, lambda index, info, error: self.bus.post(self.show_entry, index, info, cancel),
+                workers=workers, cancel_event=cancel
+            )
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def show_entries(self, playlist, entries, cancel):
+        if cancel.is_set():
+            return
+        self.playlist_entries = entries
+        for index, entry in enumerate(entries):
+            duration = utils.human_duration(entry["duration"]) if entry.get("duration") else "-"
+            self.tree_playlist.insert("", "end", iid=str(index),
+                                      values=(index + 1, entry["title"], duration, "-", "Pendiente"))
+        title = playlist.get("title") or playlist.get("webpage_url")
+        self.label_status.configure(text=f"{title}: {len(entries)} entradas")
+        self.schedule_row_thumbnails()
+
+    def show_entry(self, index, info, cancel):
+        """Completa la fila de una entrada cuando termina su extracción."""
+        if cancel.is_set():
+            return
+        if info is None:
+            self.playlist_failed.add(index)
+        else:
+            self.playlist_infos[index] = info
+            heights = [f.get("height") or 0 for f in info.get("formats", [])]
+            best = f"{max(heights)}p" if any(heights) else "Audio"
+            self.tree_playlist.set(str(index), "Mejor calidad", best)
+        self.tree_playlist.set(str(index), "Estado", "Listo" if info is not None else "Error")
+        done = len(self.playlist_infos) + len(self.playlist_failed)
+        text = f"Entradas resueltas: {done}/{len(self.playlist_entries)}"
+        if self.playlist_failed:
+            text += f" ({len(self.playlist_failed)} con error)"
+        self.label_status.configure(text=text)
+
+    # ---------------------------
+    # Miniaturas
+    # ---------------------------
+
+    def show_preview(self, info):
+        """Título y miniatura del video detectado (la imagen llega después)."""
+        self.label_preview.configure(text=info.get("title") or "", image=None)
+        if self.thumbs is None:
+            return
+        video_id = info.get("id")
+        self.thumbs.get(
+            thumbnails.thumbnail_url(info, thumbnails.PREVIEW_SIZE[0]), thumbnails.PREVIEW_SIZE,
+            lambda image: self.bus.post(self.set_preview_image, video_id, image),
+        )
+
+    def set_preview_image(self, video_id, image):
+        if image is None or self.video_info is None or self.video_info.get("id") != video_id:
+            return  # mientras tanto se detectó otro video
+        self.label_preview.configure(
+            image=ctk.CTkImage(light_image=image, dark_image=image, size=thumbnails.PREVIEW_SIZE)
+        )
+
+    def schedule_row_thumbnails(self):
+        """Agrupa los eventos de scroll: se piden las miniaturas una vez por ciclo de Tk."""
+        if self.thumbs is None or self._thumbs_scheduled:
+            return
+        self._thumbs_scheduled = True
+        self.after_idle(self.load_row_thumbnails)
+
+    def load_row_thumbnails(self):
+        """Pide solo las miniaturas de las filas visibles (y una pantalla más)."""
+        self._thumbs_scheduled = False
+        total = len(self.playlist_entries)
+        if not total:
+            return
+        first, last = self.tree_playlist.yview()
+        start, end = int(first * total), int(last * total) + 1
+        end = min(total, end + (end - start))
+        cancel = self.playlist_cancel
+        for index in range(start, end):
+            iid = str(index)
+            if iid in self.row_requested:
+                continue
+            self.row_requested.add(iid)
+            self.thumbs.get(
+                thumbnails.thumbnail_url(self.playlist_entries[index], thumbnails.ROW_SIZE[0]),
+                thumbnails.ROW_SIZE,
+                lambda image, iid=iid: self.bus.post(self.set_row_image, iid, image, cancel),
+            )
+
+    def set_row_image(self, iid, image, cancel):
+        if image is None or cancel.is_set() or not self.tree_playlist.exists(iid):
+            return
+        from PIL import ImageTk
+        photo = ImageTk.PhotoImage(image)
+        self.row_images[iid] = photo
+        self.tree_playlist.item(iid, image=photo)
+
+    def on_select_entry(self, event):
+        """Al elegir una sola entrada ya resuelta se muestran sus formatos."""
+        selection = self.tree_playlist.selection()
+        if len(selection) != 1:
+            return
+        info = self.playlist_infos.get(int(selection[0]))
+        if info is not None:
+            self.show_formats(info)
+            self.label_status.configure(text=f"Formatos de: {info.get('title')}")
+
+    def select_all_entries(self):
+        self.tree_playlist.selection_set(self.tree_playlist.get_children())
+
+    def on_download_entries(self):
+        selection = self.tree_playlist.selection()
+        if not selection:
+            messagebox.showerror("Error", "Selecciona al menos una entrada de la lista.")
+            return
+        mode = self.playlist_mode_var.get()
+        sched = scheduler.get_scheduler()
+        for iid in selection:
+            index = int(iid)
+            entry = self.playlist_entries[index]
+            sched.submit(scheduler.Job(
+                entry["url"], mode, self.download_folder, info=self.playlist_infos.get(index),
+                force=self.force_var.get()
+            ))
+        self.label_status.configure(text=f"{len(selection)} entradas añadidas a la cola")
+
     def refresh_trees(self):
-        for tree, formats in ((self.tree_video, self.filtered_video), (self.tree_audio, self.filtered_audio)):
-            for item in tree.get_children():
-                tree.delete(item)
-
-            for f in formats:
-                tipo = "Video" if f in self.formats_video else "Audio"
-                resol = f.get("resolution") or "-"
-                codecs = f"{f.get('vcodec', '-')}/{f.get('acodec', '-')}" if tipo == "Video" else f.get('acodec', '-')
-                size = utils.human_size(f["filesize"]) if f.get("filesize") else "Desconocido"
-                recom = self.get_recommendation(resol, size) if tipo == "Video" else ("Alta" if "m4a" in f["ext"] or "opus" in codecs else "Media")
-                tree.insert("", "end", values=(f["format_id"], tipo, resol, codecs, size, recom))
+        """Inserta todas las filas una vez; los filtros luego solo las ocultan o muestran."""
+        for tree, table in ((self.tree_video, self.table_video), (self.tree_audio, self.table_audio)):
+            tree.delete(*tree.get_children())
+            for row in table.rows:
+                tree.insert("", "end", iid=row.iid, values=row.values)
+            self.apply_view(tree, table)
+
+    def apply_view(self, tree, table):
+        """Separa las filas que no pasan el filtro y reengancha las visibles en orden."""
+        visible = table.visible()
+        hidden = set(table.order).difference(visible)
+        if hidden:
+            tree.detach(*hidden)
+        for idx, iid in enumerate(visible):
+            tree.move(iid, "", idx)
 
     def apply_filter_video(self, selection):
-        if selection == "Todos":
-            self.filtered_video = self.formats_video.copy()
-        else:
-            self.filtered_video = [f for f in self.formats_video if self.get_recommendation(f.get("resolution","-"), utils.human_size(f.get("filesize",0))) == selection]
-        self.refresh_trees()
+        self.table_video.filter = selection
+        self.apply_view(self.tree_video, self.table_video)
 
     def apply_filter_audio(self, selection):
-        if selection == "Todos":
-            self.filtered_audio = self.formats_audio.copy()
-        else:
-            self.filtered_audio = [f for f in self.formats_audio if ("m4a" in f["ext"] or "opus" in f.get("acodec","")) and selection=="Alta"]
-        self.refresh_trees()
+        self.table_audio.filter = selection
+        self.apply_view(self.tree_audio, self.table_audio)
 
     def sort_by(self, tree, col, descending):
-        data = [(tree.set(child, col), child) for child in tree.get_children('')]
-        if col in ("Resolución", "Tamaño"):
-            def key_func(v):
-                try:
-                    if col == "Resolución":
-                        parts = v[0].split('x')
-                        return int(parts[1]) if len(parts) > 1 else 0
-                    elif col == "Tamaño":
-                        return utils.size_to_mb(v[0])
-                except:
-                    return 0
-            data.sort(key=key_func, reverse=descending)
-        else:
-            data.sort(reverse=descending)
-
-        for idx, item in enumerate(data):
-            tree.move(item[1], '', idx)
+        table = self.table_video if tree is self.tree_video else self.table_audio
+        table.sort(col, descending)
+        self.apply_view(tree, table)
         tree.heading(col, command=lambda: self.sort_by(tree, col, not descending))
 
     # ---------------------------
@@ -227,7 +429,9 @@ class AdvancedWindow(ctk.CTkToplevel):
             if values:
                 self.selected_format_id = values[0]
                 self.selected_type = "video"
-                self.label_status.configure(text=f"Seleccionado formato VIDEO ID: {self.selected_format_id}")
+                row = self.table_video.by_iid.get(selected)
+                reasons = f" ({', '.join(row.reasons)})" if row and row.reasons else ""
+                self.label_status.configure(text=f"Seleccionado formato VIDEO ID: {self.selected_format_id}{reasons}")
 
     def on_select_format_audio(self, event):
         selected = self.tree_audio.focus()
@@ -236,7 +440,9 @@ class AdvancedWindow(ctk.CTkToplevel):
             if values:
                 self.selected_format_id = values[0]
                 self.selected_type = "audio"
-                self.label_status.configure(text=f"Seleccionado formato AUDIO ID: {self.selected_format_id}")
+                row = self.table_audio.by_iid.get(selected)
+                reasons = f" ({', '.join(row.reasons)})" if row and row.reasons else ""
+                self.label_status.configure(text=f"Seleccionado formato AUDIO ID: {self.selected_format_id}{reasons}")
 
     # ---------------------------
     # DESCARGA CON PROGRESO
@@ -252,52 +458,57 @@ class AdvancedWindow(ctk.CTkToplevel):
             messagebox.showerror("Error", "Pega un enlace de YouTube válido.")
             return
 
-        self.btn_download.configure(state="disabled")
-        self.label_status.configure(text="Descargando...")
+        self.label_status.configure(text="En cola...")
         self.progress_bar.set(0)
         self.progress_label.configure(text="Progreso: 0%")
 
-        def progress_hook(d):
-            if d.get("status") == "downloading":
-                downloaded = d.get("downloaded_bytes", 0)
-                total = d.get("total_bytes", 0)
-                percent = (downloaded / total) if total > 0 else 0
-
-                speed = d.get("speed", 0)
-                eta = d.get("eta", 0)
-
-                self.progress_bar.set(percent)
-                percent_text = f"{percent * 100:.1f}%"
-                speed_text = utils.human_size(speed) + "/s" if speed else "-"
-                eta_text = f"{eta:.0f}s restantes" if eta else "calculando..."
-                self.progress_label.configure(
-                    text=f"Progreso: {percent_text} | Vel: {speed_text} | ETA: {eta_text}"
-                )
+        mode = "mp3" if self.selected_type == "audio" else "mp4"
+        # El formato elegido pertenece al video detectado: descargar ese video
+        # reutilizando su información (también si viene de una lista)
+        info = self.video_info
+        if info:
+            url = info.get("webpage_url") or url
 
-            elif d.get("status") == "finished":
-                self.progress_bar.set(1.0)
-                self.progress_label.configure(text="Progreso: 100% - Completado ✅")
-                self.label_status.configure(text="Descarga terminada")
+        job = scheduler.Job(
+            url, mode, self.download_folder,
+            selected_format=self.selected_format_id, info=info, force=self.force_var.get()
+        )
+        job.on_progress = self.bus.hook_for(job.id)
+        job.on_finish = lambda j: self.bus.post(self.on_job_finished, j)
+        scheduler.get_scheduler().submit(job)
 
-        def worker():
-            formats = self.formats_video if self.selected_type == "video" else self.formats_audio
-            tipo = next((f for f in formats if f["format_id"] == self.selected_format_id), None)
-            mode = "mp3" if self.selected_type == "audio" else "mp4"
-
-            success, error = downloader.download(
-                url, mode, self.download_folder,
-                selected_format=self.selected_format_id,
-                progress_callback=progress_hook
+    def render_progress(self, snapshot):
+        """Pinta el progreso agregado de las descargas lanzadas desde esta ventana."""
+        if not snapshot.jobs:
+            return
+        if all(j.status == "finished" for j in snapshot.jobs.values()):
+            self.progress_bar.set(1.0)
+            self.progress_label.configure(text="Progreso: 100% - Completado ✅")
+            self.label_status.configure(text="Descarga terminada")
+            return
+        self.progress_bar.set(snapshot.fraction)
+        percent_text = f"{snapshot.fraction * 100:.1f}%"
+        speed_text = utils.human_size(snapshot.speed) + "/s" if snapshot.speed else "-"
+        eta_text = f"{snapshot.eta:.0f}s restantes" if snapshot.eta is not None else "calculando..."
+        text = f"Progreso: {percent_text} | Vel: {speed_text} | ETA: {eta_text}"
+        if len(snapshot.jobs) > 1:
+            text += f" | {len(snapshot.jobs)} descargas"
+        self.progress_label.configure(text=text)
+
+    def on_job_finished(self, job):
+        self.pump.forget(job.id)
+        if job.state == scheduler.DONE:
+            messagebox.showinfo("Completado", f"Descarga finalizada.\nArchivos en:\n{job.target_folder}")
+        elif job.state == scheduler.FAILED:
+            messagebox.showerror("Error", job.error)
+        elif job.state == scheduler.SKIPPED:
+            messagebox.showinfo(
+                "Ya descargado",
+                f"Este video ya se había descargado:\n{job.title}\n\n"
+                "Marca \"Descargar de nuevo\" para repetirlo."
             )
 
-            if success:
-                messagebox.showinfo("Completado", f"Descarga finalizada.\nArchivos en:\n{self.download_folder}")
-            else:
-                messagebox.showerror("Error", error)
-
-            self.btn_download.configure(state="normal")
+        if not self.pump.jobs:
             self.label_status.configure(text="Listo")
             self.progress_label.configure(text="Progreso: 0%")
             self.progress_bar.set(0)
-
-        threading.Thread(target=worker, daemon=True).start()
@@ -0,0 +1,79 @@
+# app/ui_library.py
+import os
+import customtkinter as ctk
+from tkinter import messagebox, ttk
+from . import library, progress, utils
+
+
+class LibraryWindow(ctk.CTkToplevel):
+    """Búsqueda en lo que ya hay en la carpeta de descargas."""
+
+    SEARCH_DELAY_MS = 250
+
+    def __init__(self, parent=None, folder=None):
+        super().__init__(parent)
+        self.title("Biblioteca - EasyTube")
+        self.geometry("760x420")
+        self.folder = folder
+        self.index = library.get_library()
+        self._search_job = None
+
+        frame_search = ctk.CTkFrame(self)
+        frame_search.pack(fill="x", padx=12, pady=(12, 6))
+        self.entry_search = ctk.CTkEntry(frame_search, placeholder_text="Buscar por nombre o ID de video...")
+        self.entry_search.pack(side="left", fill="x", expand=True, padx=6, pady=6)
+        self.entry_search.bind("<KeyRelease>", self.on_search_changed)
+        ctk.CTkButton(frame_search, text="Volver a escanear", command=self.on_rescan).pack(side="left", padx=6)
+
+        container = ctk.CTkFrame(self)
+        container.pack(fill="both", expand=True, padx=12, pady=(0, 6))
+        columns = ("Nombre", "ID", "Duración", "Tamaño", "Carpeta")
+        self.tree = ttk.Treeview(container, columns=columns, show="headings")
+        vsb = ttk.Scrollbar(container, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=vsb.set)
+        vsb.pack(side="right", fill="y")
+        self.tree.pack(fill="both", expand=True)
+        for col, width in zip(columns, (300, 100, 70, 80, 200)):
+            self.tree.heading(col, text=col)
+            self.tree.column(col, width=width, anchor="w" if col in ("Nombre", "Carpeta") else "center")
+
+        self.label_status = ctk.CTkLabel(self, text="")
+        self.label_status.pack(fill="x", padx=12, pady=(0, 12))
+
+        # El escaneo corre en otro hilo: avisa por el bus, nunca toca widgets
+        self.bus = progress.ProgressBus()
+        self.pump = progress.ProgressPump(self, self.bus, lambda _snapshot: None)
+
+        if self.index is None:
+            self.label_status.configure(text="El índice de la biblioteca está desactivado en la configuración.")
+        else:
+            self.refresh()
+
+    def on_search_changed(self, _event=None):
+        # Esperar a que el usuario deje de escribir antes de buscar
+        if self._search_job is not None:
+            self.after_cancel(self._search_job)
+        self._search_job = self.after(self.SEARCH_DELAY_MS, self.refresh)
+
+    def refresh(self):
+        self._search_job = None
+        if self.index is None or not self.winfo_exists():
+            return
+        results = self.index.search(self.entry_search.get(), folder=self.folder)
+        self.tree.delete(*self.tree.get_children())
+        for entry in results:
+            self.tree.insert("", "end", values=(
+                os.path.basename(entry.path), entry.video_id or "-",
+                utils.human_duration(entry.duration) if entry.duration else "-",
+                utils.human_size(entry.size), os.path.dirname(entry.path),
+            ))
+        self.label_status.configure(text=f"{len(results)} resultados ({len(self.index)} archivos indexados)")
+
+    def on_rescan(self):
+        if self.index is None:
+            return
+        if not self.folder:
+            messagebox.showerror("Error", "No hay carpeta de descargas para escanear.")
+            return
+        self.label_status.configure(text="Escaneando...")
+        self.index.scan_async(self.folder, on_done=lambda _result: self.bus.post(self.refresh))
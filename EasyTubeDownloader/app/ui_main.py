@@ -2,7 +2,7 @@
 import customtkinter as ctk
 import threading
 import os
-from . import downloader, utils, settings
+from . import downloader, journal, library, prefetch, progress, scheduler, utils, settings
 from tkinter import messagebox, filedialog
 
 ctk.set_appearance_mode("System")
@@ -13,7 +13,7 @@ class MainWindow:
         self.settings = settings.load_settings()
         self.root = ctk.CTk()
         self.root.title("Miko Downloader")
-        self.root.geometry("520x320")
+        self.root.geometry("520x360")
         self.root.resizable(False, False)
 
         # --- Widgets principales ---
@@ -27,6 +27,11 @@ class MainWindow:
             self.root, placeholder_text="Pega el enlace de YouTube aquí..."
         )
         self.entry_url.pack(fill="x", padx=24, pady=(6,6))
+        # Extracción anticipada mientras se escribe o pega el enlace
+        self.prefetcher = prefetch.get_prefetcher()
+        if self.prefetcher is not None:
+            for event in ("<KeyRelease>", "<<Paste>>"):
+                self.entry_url.bind(event, self.on_url_changed, add="+")
 
         # --- Selección de formato ---
         self.frame_options = ctk.CTkFrame(self.root)
@@ -45,6 +50,12 @@ class MainWindow:
         )
         self.radio_mp3.grid(row=0, column=0, padx=8, pady=8)
         self.radio_mp4.grid(row=0, column=1, padx=8, pady=8)
+        # Ignorar el archivo de descargas (p. ej. para repetir algo ya descargado)
+        self.force_var = ctk.BooleanVar(value=False)
+        self.check_force = ctk.CTkCheckBox(
+            self.frame_options, text="Descargar de nuevo", variable=self.force_var
+        )
+        self.check_force.grid(row=0, column=2, padx=8, pady=8)
 
         # --- Carpeta de destino ---
         # Si hay una carpeta guardada, usarla; sino, la predeterminada (Descargas)
@@ -74,6 +85,16 @@ class MainWindow:
         )
         self.btn_advanced.grid(row=0, column=1, padx=6)
 
+        self.btn_queue = ctk.CTkButton(
+            self.frame_buttons, text="Cola de descargas", command=self.open_queue
+        )
+        self.btn_queue.grid(row=0, column=2, padx=6)
+
+        self.btn_library = ctk.CTkButton(
+            self.frame_buttons, text="Biblioteca", command=self.open_library
+        )
+        self.btn_library.grid(row=1, column=0, columnspan=3, pady=(6, 0))
+
         # --- Progreso y estado ---
         self.progress = ctk.CTkProgressBar(self.root)
         self.progress.set(0.0)
@@ -82,8 +103,16 @@ class MainWindow:
         self.label_status = ctk.CTkLabel(self.root, text="Listo")
         self.label_status.pack(pady=(2,12))
 
+        # Los hilos de descarga solo encolan eventos; la UI los pinta cada 150 ms
+        self.bus = progress.ProgressBus()
+        self.pump = progress.ProgressPump(self.root, self.bus, self.render_progress)
+
     # --- Métodos de funcionalidad ---
 
+    def on_url_changed(self, _event=None):
+        # Tras <<Paste>> el texto aún no está en el campo: leerlo en el siguiente ciclo
+        self.root.after_idle(lambda: self.prefetcher.schedule(self.entry_url.get()))
+
     def change_folder(self):
         folder = filedialog.askdirectory(initialdir=self.download_path)
         if folder:
@@ -92,33 +121,96 @@ class MainWindow:
             # guardar la carpeta elegida para recordarla después
             self.settings["last_download_path"] = folder
             settings.save_settings(self.settings)
+            self.scan_library()
 
     def run(self):
+        # yt-dlp se carga en segundo plano cuando la ventana ya está visible
+        self.root.after(200, self.warm_up)
+        self.root.after(300, self.scan_library)
+        self.root.after(400, self.check_pending)
         self.root.mainloop()
 
+    def check_pending(self):
+        """Ofrece reanudar las descargas que quedaron a medias en la sesión anterior."""
+        diary = journal.get_journal()
+        pending = diary.pending() if diary is not None else []
+        if not pending:
+            return
+        listed = "\n".join(f"• {journal.describe(r)}" for r in pending[:10])
+        if len(pending) > 10:
+            listed += f"\n... y {len(pending) - 10} más"
+        if not messagebox.askyesno(
+            "Descargas sin terminar",
+            f"Hay {len(pending)} descargas que no terminaron:\n{listed}\n\n¿Reanudarlas desde donde quedaron?"
+        ):
+            diary.discard(r["key"] for r in pending)
+            return
+        sched = scheduler.get_scheduler()
+        for record in pending:
+            sched.submit(self.watch(scheduler.Job.from_journal(record), notify=False))
+        self.set_status(f"Reanudando {len(pending)} descargas...")
+
+    def scan_library(self):
+        """Pone al día el índice de la carpeta de destino (en segundo plano)."""
+        index = library.get_library()
+        if index is not None:
+            index.scan_async(self.download_path)
+
+    def confirm_repeat(self, url):
+        """
+        Si el video ya está en la carpeta de destino, pregunta antes de
+        repetirlo. Devuelve None si el usuario no quiere, o si hay que
+        forzar la descarga (True) o no (False).
+        """
+        index = library.get_library()
+        found = index.find(utils.extract_video_id(url), self.download_path) if index is not None else []
+        if not found:
+            return False
+        if not messagebox.askyesno(
+            "Ya está en la carpeta",
+            f"Este video ya está en la carpeta de destino:\n{os.path.basename(found[0].path)}\n\n"
+            "¿Descargarlo de todos modos?"
+        ):
+            return None
+        return True
+
+    def warm_up(self):
+        def worker():
+            try:
+                downloader.warm_up()
+            except Exception as e:
+                print("Error precargando yt-dlp:", e)
+
+        threading.Thread(target=worker, daemon=True).start()
+
     def set_status(self, text: str):
         self.label_status.configure(text=text)
 
-    def progress_hook(self, d):
-        """Actualiza la UI según el progreso del downloader"""
-        status = d.get('status')
-        if status == 'downloading':
-            downloaded = d.get('downloaded_bytes', 0)
-            total = d.get('total_bytes') or d.get('total_bytes_estimate')
-            if total:
-                try:
-                    fraction = downloaded / total
-                except Exception:
-                    fraction = 0.0
-                self.progress.set(fraction)
-                self.set_status(f"Descargando... {int(fraction*100)}%")
-            else:
-                self.set_status(f"Descargando... {utils.human_size(downloaded)}")
-        elif status == 'finished':
-            self.progress.set(1.0)
-            self.set_status("Descarga completada")
-        elif status == 'error':
-            self.set_status("Error durante la descarga")
+    def render_progress(self, snapshot):
+        """Pinta el progreso agregado de todas las descargas de esta ventana."""
+        if not snapshot.jobs:
+            return
+        if snapshot.total:
+            self.progress.set(snapshot.fraction)
+            text = f"Descargando... {int(snapshot.fraction * 100)}%"
+        else:
+            text = f"Descargando... {utils.human_size(snapshot.downloaded)}"
+        if snapshot.speed:
+            text += f" | {utils.human_size(snapshot.speed)}/s"
+        if snapshot.eta is not None:
+            text += f" | ETA {utils.human_duration(snapshot.eta)}"
+        if len(snapshot.jobs) > 1:
+            text += f" ({len(snapshot.jobs)} descargas)"
+        self.set_status(text)
+
+    def make_job(self, url, mode, notify=True, force=False):
+        """Trabajo cuyo progreso y final llegan a la UI a través del bus."""
+        return self.watch(scheduler.Job(url, mode, self.download_path, force=force), notify)
+
+    def watch(self, job, notify=True):
+        job.on_progress = self.bus.hook_for(job.id)
+        job.on_finish = lambda j: self.bus.post(self.on_job_finished, j, notify)
+        return job
 
     def on_download_click(self):
         url = self.entry_url.get().strip()
@@ -130,29 +222,64 @@ class MainWindow:
             return
 
         mode = self.format_var.get()  # 'mp3' o 'mp4'
-        self.btn_download.configure(state="disabled")
-        self.set_status("Preparando descarga...")
+        force = self.force_var.get()
+        if not force and not utils.is_playlist_url(url):
+            force = self.confirm_repeat(url)
+            if force is None:
+                return
+        self.set_status("En cola...")
         self.progress.set(0.0)
 
-        # Descargar en hilo separado (no bloquea interfaz)
+        if utils.is_playlist_url(url):
+            self.enqueue_playlist(url, mode, force)
+            return
+
+        # La descarga la ejecuta el planificador (no bloquea interfaz)
+        scheduler.get_scheduler().submit(self.make_job(url, mode, force=force))
+
+    def enqueue_playlist(self, url, mode, force=False):
+        """Lista rápida de la lista/canal y un trabajo en la cola por cada entrada."""
         def worker():
-            success, error = downloader.download(
-                url, mode, self.download_path,
-                selected_format=None, progress_callback=self.progress_hook
+            try:
+                playlist, entries = downloader.list_entries(url)
+            except Exception as e:
+                self.bus.post(messagebox.showerror, "Error", f"No se pudo leer la lista:\n{e}")
+                self.bus.post(self.set_status, "Listo")
+                return
+            sched = scheduler.get_scheduler()
+            for entry in entries:
+                sched.submit(self.make_job(entry["url"], mode, notify=False, force=force))
+            self.bus.post(self.set_status, f"{len(entries)} videos de '{playlist.get('title') or url}' en cola")
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def on_job_finished(self, job, notify=True):
+        self.pump.forget(job.id)
+        if notify and job.state == scheduler.DONE:
+            messagebox.showinfo(
+                "Completado",
+                f"Descarga finalizada.\nArchivo guardado en: {job.target_folder}"
             )
-            if success:
-                messagebox.showinfo(
-                    "Completado",
-                    f"Descarga finalizada.\nArchivo guardado en: {self.download_path}"
-                )
-            else:
-                messagebox.showerror("Error", f"Ocurrió un error:\n{error}")
-            self.btn_download.configure(state="normal")
+        elif notify and job.state == scheduler.FAILED:
+            messagebox.showerror("Error", f"Ocurrió un error:\n{job.error}")
+        elif notify and job.state == scheduler.SKIPPED:
+            messagebox.showinfo(
+                "Ya descargado",
+                f"Este video ya se había descargado:\n{job.title}\n\n"
+                "Marca \"Descargar de nuevo\" para repetirlo."
+            )
+        if not self.pump.jobs:
             self.set_status("Listo")
             self.progress.set(0.0)
 
-        threading.Thread(target=worker, daemon=True).start()
-
     def open_advanced(self):
         from .ui_advanced import AdvancedWindow
         AdvancedWindow(parent=self.root)
+
+    def open_queue(self):
+        from .ui_queue import QueueWindow
+        QueueWindow(parent=self.root)
+
+    def open_library(self):
+        from .ui_library import LibraryWindow
+        LibraryWindow(parent=self.root, folder=self.download_path)
@@ -0,0 +1,116 @@
+# app/ui_queue.py
+import customtkinter as ctk
+from tkinter import messagebox, ttk
+from . import bandwidth, scheduler, settings
+
+
+class QueueWindow(ctk.CTkToplevel):
+    """Vista de la cola de descargas: estado, progreso, prioridad y cancelación."""
+
+    REFRESH_MS = 500
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.title("Cola de descargas - EasyTube")
+        self.geometry("760x420")
+        self.scheduler = scheduler.get_scheduler()
+
+        container = ctk.CTkFrame(self)
+        container.pack(fill="both", expand=True, padx=12, pady=(12, 6))
+
+        columns = ("ID", "Título", "Modo", "Prioridad", "Peso", "Estado", "Progreso")
+        self.tree = ttk.Treeview(container, columns=columns, show="headings")
+        vsb = ttk.Scrollbar(container, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=vsb.set)
+        vsb.pack(side="right", fill="y")
+        self.tree.pack(fill="both", expand=True)
+        for col, width in zip(columns, (50, 280, 60, 70, 50, 110, 80)):
+            self.tree.heading(col, text=col)
+            self.tree.column(col, width=width, anchor="w" if col == "Título" else "center")
+
+        frame_buttons = ctk.CTkFrame(self)
+        frame_buttons.pack(fill="x", padx=12, pady=(0, 12))
+        ctk.CTkButton(frame_buttons, text="Cancelar", command=self.on_cancel).pack(side="left", padx=6, pady=6)
+        ctk.CTkButton(frame_buttons, text="Subir prioridad", command=self.on_priority_up).pack(side="left", padx=6, pady=6)
+        ctk.CTkButton(frame_buttons, text="Más ancho de banda", command=self.on_weight_up).pack(side="left", padx=6, pady=6)
+        ctk.CTkButton(frame_buttons, text="Limpiar terminados", command=self.on_clear).pack(side="left", padx=6, pady=6)
+
+        self.label_summary = ctk.CTkLabel(frame_buttons, text="")
+        self.label_summary.pack(side="right", padx=6)
+
+        # --- Límite de ancho de banda (se aplica en caliente) ---
+        self.governor = bandwidth.get_governor()
+        frame_limit = ctk.CTkFrame(self)
+        frame_limit.pack(fill="x", padx=12, pady=(0, 12))
+        ctk.CTkLabel(frame_limit, text="Límite total (KB/s, 0 = sin límite):").pack(side="left", padx=6)
+        self.entry_limit = ctk.CTkEntry(frame_limit, width=90)
+        self.entry_limit.insert(0, str(settings.load_settings().get("bandwidth_limit_kb", 0)))
+        self.entry_limit.pack(side="left", padx=6, pady=6)
+        ctk.CTkButton(frame_limit, text="Aplicar", width=80, command=self.on_apply_limit).pack(side="left", padx=6)
+        self.label_limit = ctk.CTkLabel(frame_limit, text="")
+        self.label_limit.pack(side="right", padx=6)
+
+        self.refresh()
+
+    def selected_ids(self):
+        return [int(item) for item in self.tree.selection()]
+
+    def refresh(self):
+        """Sincroniza la tabla con el planificador (se reprograma con after)."""
+        if not self.winfo_exists():
+            return
+        jobs = self.scheduler.jobs()
+        present = set(self.tree.get_children())
+        for job in jobs:
+            values = (
+                job.id, job.title, job.mode, job.priority, f"{job.weight:g}",
+                scheduler.STATE_LABELS.get(job.state, job.state),
+                f"{job.progress * 100:.0f}%",
+            )
+            iid = str(job.id)
+            if iid in present:
+                self.tree.item(iid, values=values)
+                present.discard(iid)
+            else:
+                self.tree.insert("", "end", iid=iid, values=values)
+        for iid in present:
+            self.tree.delete(iid)
+
+        active = sum(1 for j in jobs if not j.finished)
+        self.label_summary.configure(text=f"Activos: {active} / Total: {len(jobs)}")
+        limit = self.governor.limit
+        self.label_limit.configure(
+            text=f"Vigente: {limit // 1024} KB/s" if limit else "Vigente: sin límite"
+        )
+        self.after(self.REFRESH_MS, self.refresh)
+
+    def on_cancel(self):
+        for job_id in self.selected_ids():
+            self.scheduler.cancel(job_id)
+
+    def on_priority_up(self):
+        for job_id in self.selected_ids():
+            job = self.scheduler.get(job_id)
+            if job is not None:
+                self.scheduler.set_priority(job_id, job.priority + 1)
+
+    def on_weight_up(self):
+        """Duplica la parte del ancho de banda de los trabajos seleccionados."""
+        for job_id in self.selected_ids():
+            job = self.scheduler.get(job_id)
+            if job is not None:
+                self.scheduler.set_weight(job_id, job.weight * 2)
+
+    def on_apply_limit(self):
+        try:
+            limit_kb = max(0, int(self.entry_limit.get().strip() or 0))
+        except ValueError:
+            messagebox.showerror("Error", "El límite debe ser un número entero de KB/s.")
+            return
+        conf = settings.load_settings()
+        conf["bandwidth_limit_kb"] = limit_kb
+        settings.save_settings(conf)
+        self.governor.apply_settings()
+
+    def on_clear(self):
+        self.scheduler.clear_finished()
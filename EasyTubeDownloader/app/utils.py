@@ -12,6 +12,49 @@ def is_youtube_url(url: str) -> bool:
     """Verifica si una URL es válida de YouTube."""
     return bool(url and YOUTUBE_REGEX.match(url.strip()))
 
+VIDEO_ID_REGEX = re.compile(
+    r'(?:v=|youtu\.be/|/shorts/|/embed/|/live/|/v/)([0-9A-Za-z_-]{11})'
+)
+PLAYLIST_ID_REGEX = re.compile(r'[?&]list=([0-9A-Za-z_-]+)')
+
+CHANNEL_REGEX = re.compile(r'youtube\.com/(@[^/?#]+|channel/|c/|user/)')
+# Raíz de un canal (o su portada): yt-dlp lista sus pestañas, no sus videos
+CHANNEL_ROOT_REGEX = re.compile(
+    r'^((?:https?://)?(?:www\.|m\.)?youtube\.com/(?:@[^/?#]+|(?:channel|c|user)/[^/?#]+))'
+    r'/?(?:featured/?)?(?:[?#].*)?$'
+)
+
+def is_playlist_url(url: str) -> bool:
+    """Indica si el enlace es una lista de reproducción o un canal (varios videos)."""
+    url = (url or "").strip()
+    return bool(PLAYLIST_ID_REGEX.search(url) or CHANNEL_REGEX.search(url))
+
+def channel_videos_url(url: str) -> str:
+    """Cambia la raíz de un canal por su pestaña de videos; el resto de enlaces no cambia."""
+    match = CHANNEL_ROOT_REGEX.match((url or "").strip())
+    return f"{match.group(1)}/videos" if match else url
+
+def extract_video_id(url: str):
+    """Devuelve el ID de 11 caracteres del video, o None si la URL no lo contiene."""
+    match = VIDEO_ID_REGEX.search(url or "")
+    return match.group(1) if match else None
+
+def canonical_key(url: str) -> str:
+    """
+    Clave normalizada para una URL de YouTube.
+    Distintas formas del mismo enlace (youtu.be, watch?v=, shorts, con
+    parámetros de tiempo, etc.) producen la misma clave.
+    """
+    url = (url or "").strip()
+    playlist = PLAYLIST_ID_REGEX.search(url)
+    if playlist:
+        # yt-dlp extrae la lista completa cuando hay 'list=' en el enlace
+        return f"youtube:playlist:{playlist.group(1)}"
+    video_id = extract_video_id(url)
+    if video_id:
+        return f"youtube:{video_id}"
+    return "url:" + re.sub(r'^(https?://)?(www\.)?', '', url).rstrip('/')
+
 def ensure_folder(path: str):
     """Crea una carpeta si no existe."""
     try:
@@ -56,3 +99,13 @@ def size_to_mb(size_str: str) -> float:
             return float(size_str)  # Si no hay unidad, intenta parsear directo
     except ValueError:
         return 0.0
+
+def human_duration(seconds) -> str:
+    """Convierte segundos a 'm:ss' o 'h:mm:ss'."""
+    try:
+        seconds = int(seconds)
+    except (TypeError, ValueError):
+        return "-"
+    h, rest = divmod(seconds, 3600)
+    m, s = divmod(rest, 60)
+    return f"{h}:{m:02d}:{s:02d}" if h else f"{m}:{s:02d}"
@@ -0,0 +1,237 @@
+# app/ydl_pool.py
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional
+
+from . import settings
+
+if TYPE_CHECKING:
+    import yt_dlp
+
+# Opciones que yt-dlp lee en cada llamada (o que checkout vuelve a aplicar):
+# pueden cambiar de un uso a otro sin crear otra instancia. El resto
+# (cabeceras, proxy...) forma parte de la clave del pool.
+PER_USE_OPTS = frozenset({
+    'format', 'outtmpl', 'progress_hooks', 'final_ext', 'quiet', 'no_warnings', 'extract_flat',
+    'concurrent_fragment_downloads', 'continuedl', 'nopostoverwrites', 'ratelimit',
+})
+
+# Atributos internos de YoutubeDL que _configure y _reset leen o reinician.
+# No son API pública: si una versión de yt-dlp los quita o renombra, el pool
+# deja de reutilizar instancias en lugar de arrastrar hooks o contadores.
+PRIVATE_ATTRS = (
+    '_out_files', '_progress_hooks', 'format_selector', '_parse_outtmpl', '_download_retcode',
+    '_num_downloads', '_num_videos', '_playlist_level', '_playlist_urls',
+)
+
+
+def supports_reuse(ydl) -> bool:
+    """True si la instancia tiene todo lo que el pool necesita para reutilizarla."""
+    return all(hasattr(ydl, name) for name in PRIVATE_ATTRS) and all(
+        hasattr(ydl._out_files, name) for name in ('screen', 'out'))
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def pool_key(strategy: str, opts: dict) -> tuple:
+    """Clave de las instancias intercambiables: estrategia de cookies y opciones de sesión."""
+    return strategy, _freeze({k: v for k, v in opts.items() if k not in PER_USE_OPTS})
+
+
+class _Pooled:
+    __slots__ = ("ydl", "base", "jar", "uses", "idle_since")
+
+    def __init__(self, ydl, jar):
+        self.ydl = ydl
+        self.base = dict(ydl.params)  # opciones ya normalizadas por YoutubeDL.__init__
+        self.jar = jar
+        self.uses = 0
+        self.idle_since = 0.0
+
+
+class YdlPool:
+    """
+    Instancias de YoutubeDL que se reutilizan entre extracciones y descargas.
+
+    Crear un YoutubeDL cuesta: normaliza las opciones, instancia los
+    extractores y abre su propio gestor de peticiones, así que con una
+    instancia por llamada no se aprovechaban las conexiones keep-alive (con
+    el manejador requests de yt-dlp) ni el estado ya calentado de los
+    extractores (reproductor de YouTube, cookies de consentimiento...).
+
+    Las instancias se agrupan por estrategia de cookies y opciones de sesión
+    (ver pool_key). checkout presta una en exclusiva y le aplica las
+    opciones de ese uso; al devolverla se restauran sus opciones, hooks y
+    contadores. Si el uso terminó con un error, o la instancia ya se usó
+    `max_uses` veces, se cierra en lugar de volver al pool. Las que llevan
+    más de `idle_timeout` segundos paradas se cierran (el servidor ya habrá
+    cortado sus conexiones), igual que las que usan un cookie jar que
+    CredentialManager ya descartó.
+
+    Si la versión instalada de yt-dlp no tiene los atributos internos que
+    hay que reiniciar (ver PRIVATE_ATTRS), cada uso recibe una instancia
+    nueva que se cierra al devolverla.
+    """
+
+    def __init__(self, max_idle: int = 4, max_uses: int = 50, idle_timeout: float = 300.0):
+        self.max_idle = max_idle
+        self.max_uses = max_uses
+        self.idle_timeout = idle_timeout
+        self.created = 0
+        self.reused = 0
+        self.reusable: Optional[bool] = None  # se comprueba con la primera instancia creada
+        self._idle: Dict[tuple, List[_Pooled]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls) -> "YdlPool":
+        conf = settings.load_settings()
+        return cls(
+            max_idle=conf.get("ydl_pool_size", 4),
+            max_uses=conf.get("ydl_pool_max_uses", 50),
+            idle_timeout=conf.get("ydl_pool_idle_timeout", 300),
+        )
+
+    @contextmanager
+    def checkout(self, strategy: str, opts: dict, jar=None) -> Iterator["yt_dlp.YoutubeDL"]:
+        """Presta un YoutubeDL con las opciones `opts` y el cookie jar `jar` (None = el suyo)."""
+        key = pool_key(strategy, opts)
+        entry = None
+        if self.reusable is not False:
+            entry = self._take(key, jar) or self._create(opts, jar)
+        if not self.reusable:
+            if entry is not None:
+                self._close(entry)
+            fresh = self._create(opts, jar, per_use=True)
+            try:
+                yield fresh.ydl
+            finally:
+                self._close(fresh)
+            return
+        self._configure(entry, opts)
+        ok = False
+        try:
+            yield entry.ydl
+            ok = True
+        finally:
+            self._release(key, entry, ok)
+
+    def discard(self, strategy: Optional[str] = None):
+        """Cierra las instancias paradas de una estrategia (o todas)."""
+        with self._lock:
+            keys = [k for k in self._idle if strategy is None or k[0] == strategy]
+            entries = [e for k in keys for e in self._idle.pop(k)]
+        for entry in entries:
+            self._close(entry)
+
+    def idle_count(self) -> int:
+        with self._lock:
+            return sum(len(entries) for entries in self._idle.values())
+
+    # --- Internos ---
+
+    def _take(self, key: tuple, jar) -> Optional[_Pooled]:
+        now = time.monotonic()
+        with self._lock:
+            idle = self._idle.get(key) or []
+            stale = [e for e in idle if now - e.idle_since > self.idle_timeout or e.jar is not jar]
+            idle[:] = [e for e in idle if e not in stale]
+            # La última devuelta es la que tiene las conexiones más recientes
+            entry = idle.pop() if idle else None
+            if entry is not None:
+                self.reused += 1
+        for old in stale:
+            self._close(old)
+        return entry
+
+    def _create(self, opts: dict, jar, per_use: bool = False) -> _Pooled:
+        import yt_dlp
+        ydl = yt_dlp.YoutubeDL(dict(opts) if per_use else
+                               {k: v for k, v in opts.items() if k not in PER_USE_OPTS})
+        if jar is not None:
+            # 'cookiejar' es una cached_property: asignarla evita que yt-dlp relea las cookies
+            ydl.cookiejar = jar
+        with self._lock:
+            self.created += 1
+            if self.reusable is None:
+                self.reusable = supports_reuse(ydl)
+                if not self.reusable:
+                    print(f"Aviso: yt-dlp {yt_dlp.version.__version__} no es compatible con el pool; "
+                          "se creará una instancia por uso")
+        return _Pooled(ydl, jar)
+
+    @staticmethod
+    def _configure(entry: _Pooled, opts: dict):
+        ydl = entry.ydl
+        params = dict(entry.base)
+        params['outtmpl'] = dict(entry.base['outtmpl'])
+        params.update({k: v for k, v in opts.items() if k in PER_USE_OPTS})
+        params['progress_hooks'] = list(opts.get('progress_hooks') or [])
+        ydl.params = params
+        if opts.get('outtmpl'):
+            outtmpl = opts['outtmpl']
+            params['outtmpl'] = dict(outtmpl) if isinstance(outtmpl, dict) else {'default': outtmpl}
+            ydl._parse_outtmpl()
+        fmt = params.get('format')
+        # Lo mismo que hace YoutubeDL.__init__ con 'format' y 'progress_hooks'
+        ydl.format_selector = fmt if fmt in (None, '-') or callable(fmt) else ydl.build_format_selector(fmt)
+        ydl._progress_hooks = list(params['progress_hooks'])
+        # 'quiet' solo se consulta en __init__ para elegir a dónde van los mensajes
+        ydl._out_files.screen = sys.stderr if params.get('quiet') else ydl._out_files.out
+
+    @staticmethod
+    def _reset(entry: _Pooled):
+        ydl = entry.ydl
+        # Un dict nuevo: una cuota de ancho de banda que aún apunte al anterior
+        # (bandwidth.Lease.bind) ya no afecta al siguiente uso
+        ydl.params = dict(entry.base)
+        ydl._progress_hooks = []
+        ydl.format_selector = None
+        ydl.__dict__.pop('dl', None)  # segmented.install sustituye dl en la instancia
+        ydl._download_retcode = 0
+        ydl._num_downloads = 0
+        ydl._num_videos = 0
+        ydl._playlist_level = 0
+        ydl._playlist_urls.clear()
+
+    def _release(self, key: tuple, entry: _Pooled, ok: bool):
+        entry.uses += 1
+        try:
+            self._reset(entry)
+        except Exception as e:
+            print("Error reiniciando instancia de yt-dlp:", e)
+            ok = False
+        if ok and entry.uses < self.max_uses:
+            with self._lock:
+                idle = self._idle.setdefault(key, [])
+                if len(idle) < self.max_idle:
+                    entry.idle_since = time.monotonic()
+                    idle.append(entry)
+                    return
+        self._close(entry)
+
+    @staticmethod
+    def _close(entry: _Pooled):
+        try:
+            entry.ydl.close()
+        except Exception as e:
+            print("Error cerrando instancia de yt-dlp:", e)
+
+
+_pool: Optional[YdlPool] = None
+
+
+def get_pool() -> Optional[YdlPool]:
+    """Pool compartido de instancias de YoutubeDL, o None si está desactivado."""
+    global _pool
+    if _pool is None and settings.load_settings().get("ydl_pool", True):
+        _pool = YdlPool.from_settings()
+    return _pool
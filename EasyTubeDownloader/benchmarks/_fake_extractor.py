@@ -0,0 +1,127 @@
+# benchmarks/_fake_extractor.py
+"""
+Extractor sustituto para los benchmarks: devuelve informaciones sintéticas
+con la forma de las de YouTube (cientos de formatos de video, audio y
+combinados) cuyas URLs apuntan a un MediaServer local, así todo el camino
+de downloader y yt-dlp se ejecuta sin red.
+
+    site = FakeSite(server, formats=300)
+    url = site.add("AAAAAAAAAAA", "Título", media="video.mp4")
+    with site.installed():
+        downloader.get_video_info(url)   # sale de site, no de YouTube
+"""
+import contextlib
+import random
+import threading
+import time
+import zlib
+from typing import Dict, Optional
+
+HEIGHTS = (144, 240, 360, 480, 720, 1080, 1440, 2160)
+VIDEO_CODECS = (("avc1.64001F", "mp4"), ("vp9", "webm"), ("av01.0.08M.08", "mp4"))
+AUDIO_CODECS = (("mp4a.40.2", "m4a"), ("opus", "webm"))
+# ID del formato combinado (video + audio en un archivo) que sirve el contenido real
+MEDIA_FORMAT_ID = "18"
+
+
+def fake_formats(media_url: str, media_size: int, count: int = 300, seed: int = 0) -> list:
+    """
+    `count` formatos variados. El combinado MEDIA_FORMAT_ID apunta a
+    `media_url` con su tamaño real; el resto tiene tamaños sintéticos y
+    también apunta ahí (solo se descargan si se eligen a propósito).
+    """
+    rng = random.Random(seed)
+    formats = [{
+        "format_id": MEDIA_FORMAT_ID, "url": media_url, "protocol": "http", "ext": "mp4",
+        "vcodec": "avc1.42001E", "acodec": "mp4a.40.2", "width": 640, "height": 360, "fps": 30,
+        "tbr": 500, "filesize": media_size, "format_note": "360p",
+    }]
+    index = 0
+    while len(formats) < count:
+        index += 1
+        if index % 4 == 0:
+            acodec, ext = rng.choice(AUDIO_CODECS)
+            abr = rng.choice((48, 64, 128, 160, 256))
+            formats.append({
+                "format_id": f"a{index}", "url": media_url, "protocol": "http", "ext": ext,
+                "vcodec": "none", "acodec": acodec, "abr": abr, "tbr": abr,
+                "filesize": abr * 1000 // 8 * 240, "format_note": f"{abr}k",
+            })
+            continue
+        height = rng.choice(HEIGHTS)
+        vcodec, ext = rng.choice(VIDEO_CODECS)
+        fps = rng.choice((24, 30, 60))
+        tbr = height * rng.uniform(1.5, 4.0) * (fps / 30)
+        formats.append({
+            "format_id": f"v{index}", "url": media_url, "protocol": "http", "ext": ext,
+            "vcodec": vcodec, "acodec": "none", "width": height * 16 // 9, "height": height, "fps": fps,
+            "tbr": round(tbr, 1), "filesize": int(tbr * 1000 / 8 * 240) if rng.random() > 0.1 else None,
+            "format_note": f"{height}p",
+        })
+    return formats
+
+
+def fake_info(video_id: str, title: str, media_url: str, media_size: int, formats: int = 300) -> dict:
+    return {
+        "id": video_id,
+        "title": title,
+        "duration": 240,
+        "uploader": "EasyTube Bench",
+        "thumbnail": None,
+        "extractor": "youtube",
+        "extractor_key": "Youtube",
+        "webpage_url": f"https://www.youtube.com/watch?v={video_id}",
+        "formats": fake_formats(media_url, media_size, formats, seed=zlib.crc32(video_id.encode())),
+    }
+
+
+class FakeSite:
+    """
+    Conjunto de videos sintéticos servidos por un MediaServer. Con
+    installed() sustituye la extracción de downloader por la de este sitio
+    (con `latency` segundos de espera, como una extracción real) y hace que
+    las descargas no intenten cargar cookies de Firefox.
+    """
+
+    def __init__(self, server, formats: int = 300, latency: float = 0.0):
+        self.server = server
+        self.formats = formats
+        self.latency = latency
+        self.infos: Dict[str, dict] = {}
+        self.extractions = 0
+        self._lock = threading.Lock()
+
+    def add(self, video_id: str, title: str, media: str) -> str:
+        """Registra un video cuyo contenido es el archivo `media` del servidor. Devuelve su URL."""
+        info = fake_info(video_id, title, self.server.url(media), len(self.server.httpd.files[media]),
+                         self.formats)
+        self.infos[video_id] = info
+        return info["webpage_url"]
+
+    def extract(self, url: str, timings: Optional[dict] = None, profile: Optional[str] = None) -> dict:
+        from app import utils
+        started = time.perf_counter()
+        info = self.infos.get(utils.extract_video_id(url))
+        if info is None:
+            raise Exception(f"Video desconocido: {url}")
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.extractions += 1
+        if timings is not None:
+            timings["fake"] = time.perf_counter() - started
+        return {**info, "formats": [dict(f) for f in info["formats"]]}
+
+    @contextlib.contextmanager
+    def installed(self):
+        from app import downloader
+        original = downloader._extract_info
+        credentials = downloader.get_credentials()
+        preferred = credentials.preferred
+        downloader._extract_info = self.extract
+        credentials.preferred = "none"
+        try:
+            yield self
+        finally:
+            downloader._extract_info = original
+            credentials.preferred = preferred
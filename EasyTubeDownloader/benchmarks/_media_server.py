@@ -0,0 +1,115 @@
+# benchmarks/_media_server.py
+"""
+Servidor HTTP local para los benchmarks: sirve contenidos generados en
+memoria con soporte de Range y conexiones persistentes, y puede simular
+latencia por petición y un ancho de banda máximo por conexión (lo que
+limita a una descarga de un solo flujo en enlaces con mucha latencia).
+"""
+import hashlib
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+RANGE_REGEX = re.compile(r"bytes=(\d+)-(\d*)")
+WRITE_CHUNK = 64 * 1024
+
+
+def payload(size: int, seed: int = 0) -> bytes:
+    """Bytes pseudoaleatorios reproducibles (no comprimibles)."""
+    block = hashlib.sha256(str(seed).encode()).digest() * 2048  # 64 KiB
+    return (block * (size // len(block) + 1))[:size]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        body = server.files.get(self.path.split("?", 1)[0].lstrip("/"))
+        if body is None:
+            self.send_error(404)
+            return
+        server.requests += 1
+        if server.latency:
+            time.sleep(server.latency)
+        start, end = 0, len(body) - 1
+        match = RANGE_REGEX.fullmatch(self.headers.get("Range") or "")
+        if match and server.ranges:
+            start = int(match.group(1))
+            end = min(int(match.group(2)), end) if match.group(2) else end
+            if start > end:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(body)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(body)}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Accept-Ranges", "bytes" if server.ranges else "none")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+        self._send(memoryview(body)[start:end + 1])
+
+    def _send(self, data: memoryview):
+        bandwidth = self.server.bandwidth
+        started = time.monotonic()
+        sent = 0
+        try:
+            while sent < len(data):
+                chunk = data[sent:sent + WRITE_CHUNK]
+                self.wfile.write(chunk)
+                sent += len(chunk)
+                if bandwidth:
+                    ahead = sent / bandwidth - (time.monotonic() - started)
+                    if ahead > 0:
+                        time.sleep(ahead)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+class MediaServer:
+    """
+    Uso:
+        with MediaServer({"video.mp4": payload(32 << 20)}, latency=0.05, bandwidth=4 << 20) as srv:
+            url = srv.url("video.mp4")
+    """
+
+    def __init__(self, files: dict, latency: float = 0.0, bandwidth: int = 0, ranges: bool = True,
+                 port: int = 0):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.files = files
+        self.httpd.latency = latency          # segundos antes de cada respuesta
+        self.httpd.bandwidth = bandwidth      # bytes/s por conexión, 0 = sin límite
+        self.httpd.ranges = ranges
+        self.httpd.requests = 0
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def requests(self) -> int:
+        return self.httpd.requests
+
+    def url(self, name: str) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/{name}"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
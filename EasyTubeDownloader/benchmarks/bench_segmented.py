@@ -0,0 +1,126 @@
+# benchmarks/bench_segmented.py
+"""
+Rendimiento de la descarga por segmentos frente a un solo flujo.
+
+    cd EasyTubeDownloader
+    python benchmarks/bench_segmented.py [--size-mb 32] [--latency 0.05]
+        [--bandwidth-mb 4] [--connections 1 2 4 8] [--yt-dlp] [--json resultado.json]
+
+Levanta un servidor local con soporte de Range que limita el ancho de banda
+de cada conexión (como un enlace con mucha latencia) y descarga el mismo
+archivo con un solo flujo HTTP y con app.segmented usando distinto número
+de conexiones. Comprueba que el archivo reensamblado es idéntico.
+
+Con --yt-dlp además mide una descarga completa con yt-dlp, con y sin
+segmented.install, a partir de una información sintética.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from _media_server import MediaServer, payload  # noqa: E402
+from app import segmented  # noqa: E402
+
+MB = 1024 * 1024
+
+
+def digest(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def single_stream(url: str, dest: str):
+    with urllib.request.urlopen(url) as resp, open(dest, "wb") as f:
+        while True:
+            chunk = resp.read(segmented.CHUNK_SIZE)
+            if not chunk:
+                break
+            f.write(chunk)
+
+
+def timed(fn, *args) -> float:
+    started = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - started
+
+
+def bench_yt_dlp(url: str, size: int, folder: str, connections: int) -> dict:
+    import yt_dlp
+
+    info = {"id": "bench", "title": "bench", "ext": "mp4", "url": url,
+            "protocol": "http", "filesize": size, "extractor": "generic",
+            "extractor_key": "Generic", "webpage_url": url}
+    results = {}
+    for label, segments in (("yt-dlp", None), ("yt-dlp + segmentos", connections)):
+        outtmpl = os.path.join(folder, f"ytdlp-{segments or 1}.%(ext)s")
+        with yt_dlp.YoutubeDL({"outtmpl": outtmpl, "quiet": True, "noprogress": True}) as ydl:
+            if segments:
+                segmented.install(ydl, segmented.SegmentedDownloader(connections=segments), min_size=0)
+            seconds = timed(ydl.process_ie_result, dict(info), True)
+        results[label] = seconds
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=float, default=32)
+    parser.add_argument("--latency", type=float, default=0.05, help="Segundos por petición.")
+    parser.add_argument("--bandwidth-mb", type=float, default=4, help="MB/s por conexión (0 = sin límite).")
+    parser.add_argument("--connections", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--segment-mb", type=float, default=4)
+    parser.add_argument("--yt-dlp", action="store_true", help="Medir también una descarga completa con yt-dlp.")
+    parser.add_argument("--json", help="Guardar los resultados en este archivo.")
+    args = parser.parse_args(argv)
+
+    size = int(args.size_mb * MB)
+    data = payload(size)
+    expected = hashlib.sha256(data).hexdigest()
+    results = {"size_mb": args.size_mb, "latency": args.latency, "bandwidth_mb": args.bandwidth_mb, "runs": {}}
+    failures = []
+
+    with MediaServer({"video.mp4": data}, latency=args.latency,
+                     bandwidth=int(args.bandwidth_mb * MB)) as server, tempfile.TemporaryDirectory() as folder:
+        url = server.url("video.mp4")
+        runs = [("1 flujo", lambda dest: single_stream(url, dest))]
+        for n in args.connections:
+            downloader = segmented.SegmentedDownloader(connections=n, segment_size=int(args.segment_mb * MB))
+            runs.append((f"{n} conexiones", lambda dest, d=downloader: d.fetch(url, dest)))
+
+        baseline = None
+        print(f"{'modo':<16}{'segundos':>10}{'MB/s':>10}{'x':>7}")
+        for label, fn in runs:
+            dest = os.path.join(folder, label.replace(" ", "_"))
+            seconds = timed(fn, dest)
+            if digest(dest) != expected:
+                failures.append(f"{label}: el archivo no coincide")
+            os.remove(dest)
+            baseline = baseline or seconds
+            results["runs"][label] = seconds
+            print(f"{label:<16}{seconds:>10.2f}{args.size_mb / seconds:>10.1f}{baseline / seconds:>7.2f}")
+
+        if args.yt_dlp:
+            for label, seconds in bench_yt_dlp(url, size, folder, max(args.connections)).items():
+                results["runs"][label] = seconds
+                print(f"{label:<16}{seconds:>10.2f}{args.size_mb / seconds:>10.1f}{baseline / seconds:>7.2f}")
+            for name in os.listdir(folder):
+                if digest(os.path.join(folder, name)) != expected:
+                    failures.append(f"{name}: el archivo no coincide")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({**results, "failures": failures}, f, indent=2)
+    for failure in failures:
+        print("ERROR:", failure)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
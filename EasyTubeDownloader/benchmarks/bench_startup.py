@@ -0,0 +1,151 @@
+# benchmarks/bench_startup.py
+"""
+Presupuesto de arranque en frío de la interfaz.
+
+    cd EasyTubeDownloader
+    python benchmarks/bench_startup.py [--runs 5] [--json resultado.json]
+
+Cada medición se hace en un proceso nuevo:
+  1. Importación de app.main, con el desglose por módulo de `python -X importtime`.
+  2. Tiempo hasta el primer pintado de MainWindow (necesita pantalla).
+
+Termina con código 1 si se supera el presupuesto o si yt_dlp se importa
+antes de que la ventana esté visible, y con código 2 si falta alguna
+medición (sin pantalla, o la interfaz no se pudo importar o mostrar): en
+ese caso no se ha comprobado el presupuesto.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Códigos de salida
+EXIT_OVER_BUDGET = 1
+EXIT_SKIPPED = 2
+
+# Presupuesto en milisegundos (medianas)
+BUDGET_IMPORT_MS = 600
+BUDGET_FIRST_PAINT_MS = 1500
+
+# Módulos cuyo tiempo acumulado interesa vigilar
+WATCHED_MODULES = (
+    "app.main", "app.ui_main", "customtkinter", "tkinter",
+    "app.downloader", "app.scheduler", "app.cache", "app.auth", "app.cli", "yt_dlp",
+)
+
+FIRST_PAINT_SCRIPT = r"""
+import json, sys, time
+t0 = time.perf_counter()
+import app.main
+from app.ui_main import MainWindow
+t1 = time.perf_counter()
+try:
+    window = MainWindow()
+    window.root.update()
+except Exception as e:
+    print(json.dumps({"import_ms": (t1 - t0) * 1000, "error": str(e),
+                      "yt_dlp_loaded": "yt_dlp" in sys.modules}))
+    sys.exit(0)
+t2 = time.perf_counter()
+print(json.dumps({
+    "import_ms": (t1 - t0) * 1000,
+    "first_paint_ms": (t2 - t0) * 1000,
+    "yt_dlp_loaded": "yt_dlp" in sys.modules,
+}))
+window.root.destroy()
+"""
+
+
+def run_python(args):
+    return subprocess.run(
+        [sys.executable] + args, cwd=PROJECT_DIR, capture_output=True, text=True
+    )
+
+
+def import_breakdown() -> dict:
+    """
+    Tiempo acumulado (ms) de cada módulo vigilado. El núcleo sin interfaz
+    se importa primero para que aparezca en el desglose aunque falte Tk.
+    """
+    proc = run_python(["-X", "importtime", "-c", "import app.scheduler, app.cli; import app.main"])
+    result = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = [p.strip() for p in line[len("import time:"):].split("|")]
+        if len(parts) != 3 or not parts[1].isdigit():
+            continue
+        name = parts[2]
+        if name in WATCHED_MODULES:
+            result[name] = int(parts[1]) / 1000
+    return result
+
+
+def first_paint() -> dict:
+    proc = run_python(["-c", FIRST_PAINT_SCRIPT])
+    if proc.returncode != 0:
+        return {"error": proc.stderr.strip().splitlines()[-1] if proc.stderr else "fallo desconocido"}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--json", help="Guardar los resultados en este archivo.")
+    args = parser.parse_args(argv)
+
+    breakdowns = [import_breakdown() for _ in range(args.runs)]
+    paints = [first_paint() for _ in range(args.runs)]
+
+    modules = {
+        name: statistics.median(b.get(name, 0.0) for b in breakdowns)
+        for name in WATCHED_MODULES
+    }
+    import_values = [p["import_ms"] for p in paints if "import_ms" in p]
+    import_ms = statistics.median(import_values) if import_values else None
+    paint_values = [p["first_paint_ms"] for p in paints if "first_paint_ms" in p]
+    paint_ms = statistics.median(paint_values) if paint_values else None
+    yt_dlp_loaded = any(p.get("yt_dlp_loaded") for p in paints)
+
+    print("Desglose de importación (ms acumulados, mediana):")
+    for name, ms in sorted(modules.items(), key=lambda kv: -kv[1]):
+        print(f"  {name:<16} {ms:8.1f}")
+    print(f"Importación de app.main: {import_ms:.1f} ms" if import_ms is not None else "Importación: error")
+    if paint_ms is not None:
+        print(f"Primer pintado de MainWindow: {paint_ms:.1f} ms")
+    else:
+        errors = {p.get("error") for p in paints if p.get("error")}
+        print(f"Primer pintado omitido: {'; '.join(errors) or 'sin datos'}")
+
+    failures = []
+    if yt_dlp_loaded or modules.get("yt_dlp"):
+        failures.append("yt_dlp se importa antes de mostrar la ventana")
+    if import_ms is not None and import_ms > BUDGET_IMPORT_MS:
+        failures.append(f"importación {import_ms:.0f} ms > {BUDGET_IMPORT_MS} ms")
+    if paint_ms is not None and paint_ms > BUDGET_FIRST_PAINT_MS:
+        failures.append(f"primer pintado {paint_ms:.0f} ms > {BUDGET_FIRST_PAINT_MS} ms")
+    skipped = [name for name, value in (("importación", import_ms), ("primer pintado", paint_ms))
+               if value is None]
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"modules_ms": modules, "import_ms": import_ms, "first_paint_ms": paint_ms,
+                       "yt_dlp_loaded": yt_dlp_loaded, "failures": failures, "skipped": skipped},
+                      f, indent=2)
+
+    for failure in failures:
+        print("PRESUPUESTO SUPERADO:", failure)
+    if failures:
+        return EXIT_OVER_BUDGET
+    if skipped:
+        print("OMITIDO: sin medición de", ", ".join(skipped))
+        return EXIT_SKIPPED
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,286 @@
+# benchmarks/bench_suite.py
+"""
+Suite de rendimiento sin red.
+
+    cd EasyTubeDownloader
+    python benchmarks/bench_suite.py [--only throughput scaling formats cache]
+        [--size-mb 16] [--jobs 8] [--workers 1 2 4] [--formats 300 1000]
+        [--latency 0.02] [--bandwidth-mb 8] [--compare results/suite-....json]
+
+Usa un extractor sustituto (_fake_extractor) y un MediaServer local, así
+que todo el camino de downloader/scheduler/yt-dlp se ejecuta sin tocar
+YouTube. Mide:
+
+  throughput  descarga completa de un trabajo a través del planificador
+  scaling     N trabajos con 1, 2, 4... trabajadores
+  formats     construcción, orden y filtro de las tablas de formatos de
+              AdvancedWindow (y su inserción en un Treeview si hay pantalla)
+  cache       latencia de la caché de metadatos (memoria, disco, fallo)
+
+Los resultados se guardan en benchmarks/results/suite-<fecha>.json; con
+--compare se muestran las diferencias frente a una ejecución anterior.
+La configuración y los datos de la aplicación van a una carpeta temporal.
+"""
+import argparse
+import hashlib
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+# Antes de importar app: settings calcula sus rutas a partir de HOME
+_home = tempfile.mkdtemp(prefix="easytube-bench-")
+os.environ["HOME"] = os.environ["USERPROFILE"] = _home
+
+from _fake_extractor import MEDIA_FORMAT_ID, FakeSite, fake_info  # noqa: E402
+from _media_server import MediaServer, payload  # noqa: E402
+
+MB = 1024 * 1024
+SECTIONS = ("throughput", "scaling", "formats", "cache")
+
+
+def digest(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def video_id(n: int) -> str:
+    return f"bench{n:06d}"
+
+
+def run_jobs(urls, folder: str, workers: int) -> dict:
+    """Descarga `urls` con un planificador de `workers` hilos y espera a que acaben."""
+    from app import scheduler
+
+    sched = scheduler.Scheduler(workers)
+    done = threading.Semaphore(0)
+    jobs = [scheduler.Job(url, "mp4", folder, selected_format=MEDIA_FORMAT_ID, on_finish=lambda j: done.release())
+            for url in urls]
+    started = time.perf_counter()
+    for job in jobs:
+        sched.submit(job)
+    for _ in jobs:
+        done.acquire()
+    seconds = time.perf_counter() - started
+    return {"seconds": seconds, "failed": [j.error for j in jobs if j.state != scheduler.DONE]}
+
+
+def bench_throughput(args, server, site, expected) -> dict:
+    url = site.add(video_id(0), "throughput", "video.mp4")
+    with tempfile.TemporaryDirectory() as folder:
+        run = run_jobs([url], folder, 1)
+        files = os.listdir(folder)
+        ok = len(files) == 1 and digest(os.path.join(folder, files[0])) == expected
+    result = {"seconds": run["seconds"], "mb_s": args.size_mb / run["seconds"], "ok": ok and not run["failed"]}
+    print(f"throughput: {result['seconds']:.2f} s, {result['mb_s']:.1f} MB/s")
+    return result
+
+
+def bench_scaling(args, server, site, expected) -> dict:
+    results = {}
+    baseline = None
+    print(f"{'trabajadores':<14}{'segundos':>10}{'MB/s':>10}{'x':>7}")
+    for workers in args.workers:
+        urls = [site.add(video_id(1000 * workers + i), f"scaling {workers}-{i}", "video.mp4")
+                for i in range(args.jobs)]
+        with tempfile.TemporaryDirectory() as folder:
+            run = run_jobs(urls, folder, workers)
+            ok = all(digest(os.path.join(folder, name)) == expected for name in os.listdir(folder))
+        seconds = run["seconds"]
+        baseline = baseline or seconds
+        results[str(workers)] = {"seconds": seconds, "mb_s": args.size_mb * args.jobs / seconds,
+                                 "ok": ok and not run["failed"]}
+        print(f"{workers:<14}{seconds:>10.2f}{args.size_mb * args.jobs / seconds:>10.1f}{baseline / seconds:>7.2f}")
+    return results
+
+
+def _tk_tree():
+    """Treeview oculto para medir la inserción, o None si no hay pantalla."""
+    try:
+        import tkinter
+        from tkinter import ttk
+        root = tkinter.Tk()
+        root.withdraw()
+    except Exception:
+        return None, None
+    from app import formats
+    return root, ttk.Treeview(root, columns=formats.COLUMNS, show="headings")
+
+
+def bench_formats(args, *_unused) -> dict:
+    from app import downloader, formats
+
+    results = {}
+    root, tree = _tk_tree()
+    for count in args.formats:
+        info = fake_info(video_id(count), "formats", "http://127.0.0.1/video.mp4", MB, formats=count)
+        build, sort, view, insert = [], [], [], []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            video, audio = formats.build_tables(downloader.formats_from_info(info))
+            build.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            for table in (video, audio):
+                for col in formats.COLUMNS:
+                    table.sort(col, False)
+                    table.sort(col, True)
+            sort.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            for table in (video, audio):
+                for quality in ("Todos", "Alta", "Media", "Baja"):
+                    table.filter = quality
+                    table.visible()
+            view.append(time.perf_counter() - started)
+
+            if tree is not None:
+                # Lo mismo que AdvancedWindow.refresh_trees
+                started = time.perf_counter()
+                tree.delete(*tree.get_children())
+                for row in video.rows:
+                    tree.insert("", "end", iid=row.iid, values=row.values)
+                root.update_idletasks()
+                insert.append(time.perf_counter() - started)
+        entry = {
+            "rows": len(video) + len(audio),
+            "build_ms": statistics.median(build) * 1000,
+            "sort_all_columns_ms": statistics.median(sort) * 1000,
+            "filter_ms": statistics.median(view) * 1000,
+        }
+        if insert:
+            entry["treeview_insert_ms"] = statistics.median(insert) * 1000
+        results[str(count)] = entry
+        print(f"formats {count}: " + ", ".join(f"{k} {v:.2f}" for k, v in entry.items() if k != "rows"))
+    if root is not None:
+        root.destroy()
+    return results
+
+
+def bench_cache(args, *_unused) -> dict:
+    from app import cache, settings
+
+    db = settings.get_data_dir() / "bench_cache.sqlite3"
+    urls = [f"https://www.youtube.com/watch?v={video_id(i)}" for i in range(args.cache_entries)]
+    infos = [fake_info(video_id(i), f"cache {i}", "http://127.0.0.1/video.mp4", MB, formats=args.formats[0])
+             for i in range(args.cache_entries)]
+    store = cache.MetadataCache(db, memory_entries=args.cache_entries, disk_entries=args.cache_entries * 2)
+
+    def timed_gets(c, keys):
+        samples = []
+        for url in keys:
+            started = time.perf_counter()
+            c.get(url)
+            samples.append(time.perf_counter() - started)
+        return statistics.median(samples) * 1e6
+
+    started = time.perf_counter()
+    for url, info in zip(urls, infos):
+        store.put(url, info)
+    put_us = (time.perf_counter() - started) / len(urls) * 1e6
+    memory_us = timed_gets(store, urls)
+    cold = cache.MetadataCache(db, memory_entries=args.cache_entries, disk_entries=args.cache_entries * 2)
+    disk_us = timed_gets(cold, urls)
+    miss_us = timed_gets(cold, [f"https://youtu.be/{video_id(i + 10 ** 5)}" for i in range(len(urls))])
+    result = {"put_us": put_us, "memory_hit_us": memory_us, "disk_hit_us": disk_us, "miss_us": miss_us}
+    print("cache: " + ", ".join(f"{k} {v:.0f}" for k, v in result.items()))
+    return result
+
+
+BENCHES = {
+    "throughput": bench_throughput,
+    "scaling": bench_scaling,
+    "formats": bench_formats,
+    "cache": bench_cache,
+}
+
+
+def flatten(data, prefix=""):
+    """{'a': {'b': 1}} -> {'a.b': 1}, solo los valores numéricos."""
+    flat = {}
+    for key, value in data.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def failed_checks(data, prefix=""):
+    """Rutas de los resultados con "ok": False (descarga fallida o archivo distinto)."""
+    failed = []
+    for key, value in data.items():
+        if isinstance(value, dict):
+            if value.get("ok") is False:
+                failed.append(f"{prefix}{key}")
+            failed += failed_checks(value, f"{prefix}{key}.")
+    return failed
+
+
+def compare(current: dict, previous_path: str):
+    with open(previous_path, encoding="utf-8") as f:
+        previous = flatten(json.load(f).get("results", {}))
+    print(f"\nComparación con {os.path.basename(previous_path)}:")
+    for name, value in flatten(current).items():
+        old = previous.get(name)
+        if old:
+            print(f"  {name:<42}{old:>12.3f}{value:>12.3f}{(value - old) / old * 100:>+9.1f}%")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", nargs="+", choices=SECTIONS, default=list(SECTIONS))
+    parser.add_argument("--size-mb", type=float, default=16, help="Tamaño de cada descarga.")
+    parser.add_argument("--jobs", type=int, default=8, help="Trabajos en la prueba de escalado.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--formats", type=int, nargs="+", default=[300, 1000], help="Formatos por video.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--cache-entries", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.02, help="Segundos por petición HTTP.")
+    parser.add_argument("--bandwidth-mb", type=float, default=8, help="MB/s por conexión (0 = sin límite).")
+    parser.add_argument("--extract-latency", type=float, default=0.2, help="Segundos por extracción.")
+    parser.add_argument("--output", help="Archivo de resultados (por defecto benchmarks/results/suite-<fecha>.json).")
+    parser.add_argument("--compare", help="Resultados anteriores con los que comparar.")
+    args = parser.parse_args(argv)
+
+    data = payload(int(args.size_mb * MB))
+    expected = hashlib.sha256(data).hexdigest()
+    results = {}
+    with MediaServer({"video.mp4": data}, latency=args.latency, bandwidth=int(args.bandwidth_mb * MB)) as server:
+        site = FakeSite(server, formats=args.formats[0], latency=args.extract_latency)
+        with site.installed():
+            for name in SECTIONS:
+                if name in args.only:
+                    results[name] = BENCHES[name](args, server, site, expected)
+
+    failures = failed_checks(results)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"suite-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({
+            "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "python": sys.version.split()[0],
+            "args": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+            "results": results,
+            "failures": failures,
+        }, f, indent=2)
+    print(f"\nResultados en {output}")
+    if args.compare:
+        compare(results, args.compare)
+    for failure in failures:
+        print("ERROR:", failure)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())